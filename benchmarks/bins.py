@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Compare the bin classification engines with the legacy implementation.
+
+A STATS_RESPONSE message with a random set of samples is built and parsed
+with the struct codec, the samples are then classified using the legacy
+loops (sort plus one scan of the bins per sample), the pure-Python engine
+and the NumPy engine.
+
+Usage: python3 benchmarks/bins.py [iterations]
+"""
+
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from construct import Container
+
+from empower.core.codec import compile_parser
+from empower.lvapp.bin_counter.bin_counter import STATS_RESPONSE
+from empower.lvapp.common import bins as engine
+from empower.lvapp.common.bins import BinClassifier
+
+DEFAULT_ITERATIONS = 1000
+
+BINS = [128, 512, 1514, 8192]
+
+SAMPLES = [10, 100, 1000]
+
+
+def legacy(bins, data):
+    """The legacy implementation (bytes and packets)."""
+
+    samples = sorted(data, key=lambda entry: entry[0])
+    out_bytes = [0] * len(bins)
+    out_packets = [0] * len(bins)
+
+    for entry in samples:
+        if not entry:
+            continue
+        size = entry[0]
+        count = entry[1]
+        for i in range(0, len(bins)):
+            if size <= bins[i]:
+                out_bytes[i] = out_bytes[i] + size * count
+                out_packets[i] = out_packets[i] + count
+                break
+
+    return out_bytes, out_packets
+
+
+def main(iterations):
+    """Run the benchmark."""
+
+    codec = compile_parser(STATS_RESPONSE)
+
+    print("%-10s %10s %10s %10s %8s %8s" %
+          ("samples", "legacy", "python", "numpy", "speedup", "speedup"))
+
+    for nb_samples in SAMPLES:
+
+        stats = [[random.randint(60, 2000), random.randint(0, 100000)]
+                 for _ in range(nb_samples)]
+
+        msg = Container(version=0, type=0x19, length=0, seq=0, module_id=0,
+                        wtp=bytes(6), sta=bytes(6), nb_tx=nb_samples,
+                        nb_rx=0, stats=stats)
+
+        response = codec.parse(codec.build(msg))
+
+        python = BinClassifier(BINS, use_numpy=False)
+        tests = [lambda: legacy(BINS, response.stats),
+                 lambda: python.classify(response.stats)]
+
+        expected = legacy(BINS, response.stats)
+        assert python.classify(response.stats) == expected
+
+        if engine.numpy:
+            vectorized = BinClassifier(BINS, use_numpy=True)
+            assert vectorized.classify(response.stats) == expected
+            tests.append(lambda: vectorized.classify(response.stats))
+
+        results = []
+
+        for func in tests:
+            secs = min(timeit.repeat(func, number=iterations, repeat=3))
+            results.append(1e6 * secs / iterations)
+
+        if len(results) == 2:
+            print("%-10u %8.2fus %8.2fus %10s %7.1fx" %
+                  (nb_samples, results[0], results[1], "-",
+                   results[0] / results[1]))
+            continue
+
+        print("%-10u %8.2fus %8.2fus %8.2fus %7.1fx %7.1fx" %
+              (nb_samples, results[0], results[1], results[2],
+               results[0] / results[1], results[0] / results[2]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS)
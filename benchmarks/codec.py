@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Compare the construct and struct codecs for every LVAPP message type.
+
+For each message type a sample message is generated and then parsed and
+built using both codecs. The script also checks that the two codecs agree
+on the wire format.
+
+Usage: python3 benchmarks/codec.py [iterations]
+"""
+
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from construct import Container
+from construct import Struct
+from construct import Sequence
+from construct.core import FormatField
+from construct.core import StaticField
+from construct.core import Buffered
+from construct.core import MetaArray
+from construct.core import Range
+from construct.core import Reconfig
+from construct.adapters import BitIntegerAdapter
+
+from empower.core.codec import Codec
+from empower.core.codec import compile_parser
+from empower.lvapp import PT_TYPES
+
+DEFAULT_ITERATIONS = 10000
+
+# number of elements generated for each array/range
+NB_ELEMENTS = 4
+
+
+def sample(subcon, ctx=None):
+    """Return a random value for the specified construct."""
+
+    if isinstance(subcon, Reconfig):
+        subcon = subcon.subcon
+
+    if isinstance(subcon, FormatField):
+        if subcon.name and subcon.name.startswith("nb_"):
+            return NB_ELEMENTS
+        bits = 8 * subcon.packer.size
+        if subcon.packer.format[-1].islower():
+            return random.randint(-(1 << (bits - 1)), (1 << (bits - 1)) - 1)
+        return random.randint(0, (1 << bits) - 1)
+
+    if isinstance(subcon, StaticField):
+        return bytes(random.getrandbits(8) for _ in range(subcon.length))
+
+    if isinstance(subcon, Buffered):
+        return Container(**{s.name: random.getrandbits(s.width)
+                            for s in subcon.subcon.subcons
+                            if isinstance(s, BitIntegerAdapter)})
+
+    if isinstance(subcon, MetaArray):
+        return [sample(subcon.subcon) for _ in range(subcon.countfunc(ctx))]
+
+    if isinstance(subcon, Range):
+        return [sample(subcon.subcon) for _ in range(NB_ELEMENTS)]
+
+    if isinstance(subcon, Sequence):
+        return [sample(s) for s in subcon.subcons if s.name]
+
+    if isinstance(subcon, Struct):
+        out = Container()
+        for sub in subcon.subcons:
+            if sub.name:
+                out[sub.name] = sample(sub, out)
+        return out
+
+    raise ValueError("Unsupported construct %s" % subcon)
+
+
+def main(iterations):
+    """Run the benchmark."""
+
+    print("%-40s %10s %10s %8s %10s %10s %8s" %
+          ("message", "parse(c)", "parse(s)", "speedup",
+           "build(c)", "build(s)", "speedup"))
+
+    for parser in PT_TYPES.values():
+
+        if not parser:
+            continue
+
+        codec = compile_parser(parser)
+
+        if not isinstance(codec, Codec):
+            print("%-40s not supported" % parser.name)
+            continue
+
+        msg = sample(parser)
+        data = parser.build(msg)
+
+        if codec.build(msg) != data or codec.build(codec.parse(data)) != data:
+            print("%-40s codecs disagree" % parser.name)
+            continue
+
+        results = []
+
+        for func in (lambda: parser.parse(data),
+                     lambda: codec.parse(data),
+                     lambda: parser.build(msg),
+                     lambda: codec.build(msg)):
+            secs = min(timeit.repeat(func, number=iterations, repeat=3))
+            results.append(1e6 * secs / iterations)
+
+        print("%-40s %8.2fus %8.2fus %7.1fx %8.2fus %8.2fus %7.1fx" %
+              (parser.name,
+               results[0], results[1], results[0] / results[1],
+               results[2], results[3], results[2] / results[3]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS)
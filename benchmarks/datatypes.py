@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the most common operations on the EmPOWER datatypes.
+
+Usage: python3 benchmarks/datatypes.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.datatypes.etheraddress import INTERN_MAXSIZE
+from empower.datatypes.dpid import DPID
+from empower.datatypes.ssid import SSID
+from empower.datatypes.plmnid import PLMNID
+
+DEFAULT_ITERATIONS = 100000
+
+RAW = bytes.fromhex("000DB9303E04")
+STR = "00:0D:B9:30:3E:04"
+ADDR = EtherAddress(RAW)
+OTHER = EtherAddress("00:0D:B9:30:3E:05")
+TABLE = {EtherAddress(i.to_bytes(6, 'big')): i for i in range(1000)}
+
+# addresses that are never interned (the table is cycled through)
+UNIQUE = [(i + 1 << 24).to_bytes(6, 'big')
+          for i in range(2 * INTERN_MAXSIZE)]
+
+
+def unique_raw():
+    """Build an address that is not in the intern table."""
+
+    unique_raw.idx = (unique_raw.idx + 1) % len(UNIQUE)
+    return EtherAddress(UNIQUE[unique_raw.idx])
+
+
+unique_raw.idx = 0
+
+
+TESTS = [
+    ("EtherAddress(raw)", lambda: EtherAddress(RAW)),
+    ("EtherAddress(raw) not interned", unique_raw),
+    ("EtherAddress(str)", lambda: EtherAddress(STR)),
+    ("EtherAddress(EtherAddress)", lambda: EtherAddress(ADDR)),
+    ("EtherAddress == EtherAddress", lambda: ADDR == OTHER),
+    ("EtherAddress == bytes", lambda: ADDR == RAW),
+    ("EtherAddress == str", lambda: ADDR == STR),
+    ("EtherAddress in dict", lambda: ADDR in TABLE),
+    ("EtherAddress.to_str()", ADDR.to_str),
+    ("EtherAddress.to_raw()", ADDR.to_raw),
+    ("EtherAddress.match()", lambda: ADDR.match(OTHER)),
+    ("DPID(str)", lambda: DPID("00:00:00:0D:B9:30:3E:04")),
+    ("SSID(str)", lambda: SSID("EmPOWER")),
+    ("PLMNID(str)", lambda: PLMNID("222f93")),
+]
+
+
+def main(iterations):
+    """Run the benchmark."""
+
+    for name, func in TESTS:
+        secs = min(timeit.repeat(func, number=iterations, repeat=3))
+        print("%-40s %8.3fus" % (name, 1e6 * secs / iterations))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS)
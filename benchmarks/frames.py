@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Compare the list and columnar decoding of WiFiStats and Summary batches.
+
+Usage: python3 benchmarks/frames.py [iterations]
+"""
+
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from construct import Container
+
+from empower.core.codec import compile_parser
+from empower.lvapp.wifi_stats.wifi_stats import WIFI_STATS_RESPONSE
+from empower.lvapp.wifi_stats.wifi_stats import WIFI_STATS_RESPONSE_CODEC
+from empower.lvapp.wifi_stats.wifi_stats import WiFiStatsSamples
+from empower.lvapp.summary.summary import SUMMARY_TRIGGER
+from empower.lvapp.summary.summary import SUMMARY_TRIGGER_CODEC
+from empower.lvapp.summary.summary import SummaryFrames
+
+DEFAULT_ITERATIONS = 1000
+
+# number of frames in a summary batch
+NB_FRAMES = 500
+
+
+def wifi_stats_message():
+    """Return a WIFI_STATS_RESPONSE message with 300 entries."""
+
+    entries = [[random.randint(0, 3), random.randint(0, 1 << 20),
+                random.randint(0, 180)] for _ in range(300)]
+
+    return WIFI_STATS_RESPONSE.build(
+        Container(version=0, type=0, length=0, seq=0, module_id=0,
+                  wtp=b"\x00" * 6, nb_entries=len(entries),
+                  entries=entries))
+
+
+def summary_message():
+    """Return a SUMMARY message with NB_FRAMES frames."""
+
+    frames = [[os.urandom(6), os.urandom(6), random.getrandbits(64),
+               Container(mcs=random.randint(0, 1)),
+               random.getrandbits(16), random.randint(-90, -20),
+               random.choice([2, 4, 11, 22, 7]),
+               random.choice([0x00, 0x04, 0x08]),
+               random.choice([0x00, 0x40, 0x80, 0xC0]),
+               random.getrandbits(12)] for _ in range(NB_FRAMES)]
+
+    return SUMMARY_TRIGGER.build(
+        Container(version=0, type=0, length=0, seq=0, module_id=0,
+                  wtp=b"\x00" * 6, nb_entries=len(frames), frames=frames))
+
+
+def wifi_stats(codec, data):
+    """Decode a WiFiStats batch and compute the per-second averages."""
+
+    samples = WiFiStatsSamples(codec.parse(data).entries)
+
+    for stats_type in samples.TYPES:
+        samples.average(stats_type, 0)
+        samples.last(stats_type)
+
+
+def summary(codec, data):
+    """Decode a Summary batch and compute its columns."""
+
+    SummaryFrames(codec.parse(data).frames)
+
+
+def main(iterations):
+    """Run the benchmark."""
+
+    tests = [("wifi_stats", wifi_stats, WIFI_STATS_RESPONSE,
+              WIFI_STATS_RESPONSE_CODEC, wifi_stats_message()),
+             ("summary", summary, SUMMARY_TRIGGER,
+              SUMMARY_TRIGGER_CODEC, summary_message())]
+
+    print("%-20s %10s %10s %8s" % ("message", "list", "columnar", "speedup"))
+
+    for name, func, parser, columnar, data in tests:
+
+        results = []
+
+        for codec in (compile_parser(parser), columnar):
+            secs = min(timeit.repeat(lambda: func(codec, data),
+                                     number=iterations, repeat=3))
+            results.append(1e6 * secs / iterations)
+
+        print("%-20s %8.1fus %8.1fus %7.1fx" %
+              (name, results[0], results[1], results[0] / results[1]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS)
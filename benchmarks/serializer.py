@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the serialization of a large deployment.
+
+A number of WTPs each with two resource blocks fully populated with ucqm,
+ncqm and tx policies is generated and then serialized using the legacy
+encoder and the serialization engine (pretty and compact modes).
+
+Usage: python3 benchmarks/serializer.py [iterations] [wtps] [clients]
+"""
+
+import os
+import sys
+import json
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from empower.datatypes.etheraddress import EtherAddress
+from empower.core.wtp import WTP
+from empower.core.resourcepool import ResourceBlock
+from empower.core.resourcepool import BT_L20
+from empower.core.resourcepool import BT_HT20
+from empower.core import jsonserializer
+from empower.core.jsonserializer import EmpowerEncoder
+from empower.core.jsonserializer import dumps
+
+DEFAULT_ITERATIONS = 10
+DEFAULT_WTPS = 100
+DEFAULT_CLIENTS = 50
+
+
+def random_addr():
+    """Return a random EtherAddress."""
+
+    return EtherAddress(random.getrandbits(48).to_bytes(6, 'big'))
+
+
+def cqm(addrs):
+    """Return a channel quality map for the specified addresses."""
+
+    return {addr: {'addr': addr,
+                   'last_rssi_std': random.random(),
+                   'last_rssi_avg': random.randint(-90, -30),
+                   'last_packets': random.randint(0, 1000),
+                   'hist_packets': random.randint(0, 100000),
+                   'mov_rssi': random.random()} for addr in addrs}
+
+
+def build(nb_wtps, nb_clients):
+    """Build the deployment."""
+
+    clients = [random_addr() for _ in range(nb_clients)]
+    wtps = {}
+
+    for i in range(nb_wtps):
+
+        wtp = WTP(random_addr(), "WTP %u" % i)
+
+        for channel, band in ((1, BT_HT20), (36, BT_L20)):
+            block = ResourceBlock(wtp, random_addr(), channel, band)
+            block.supports = [6, 9, 12, 18, 24, 36, 48, 54]
+            if band == BT_HT20:
+                block.ht_supports = list(range(16))
+            block.ucqm = cqm(clients)
+            block.ncqm = cqm(clients[:nb_clients // 4])
+            # tx policies are created with their defaults on first access
+            for client in clients:
+                block.tx_policies.__getitem__(client)
+            wtp.supports.add(block)
+
+        wtps[wtp.addr] = wtp
+
+    return wtps
+
+
+def legacy(value):
+    """Serialize using the json module and the encoder."""
+
+    return json.dumps(value, sort_keys=True, indent=4, cls=EmpowerEncoder)
+
+
+def main(iterations, nb_wtps, nb_clients):
+    """Run the benchmark."""
+
+    wtps = list(build(nb_wtps, nb_clients).values())
+    size = len(legacy(wtps))
+
+    print("%u wtps, %u clients, %u bytes" % (nb_wtps, nb_clients, size))
+
+    tests = [("json (indent=4)", lambda: legacy(wtps))]
+
+    if jsonserializer.orjson:
+        tests.append(("orjson (pretty)", lambda: dumps(wtps)))
+        tests.append(("orjson (compact)",
+                      lambda: dumps(wtps, compact=True)))
+
+    backend = jsonserializer.orjson
+    jsonserializer.orjson = None
+
+    tests.append(("json+converters (pretty)", lambda: dumps(wtps)))
+    tests.append(("json+converters (compact)",
+                  lambda: dumps(wtps, compact=True)))
+
+    baseline = None
+
+    try:
+        for name, func in tests:
+            if name.startswith("orjson"):
+                jsonserializer.orjson = backend
+            secs = min(timeit.repeat(func, number=iterations, repeat=3))
+            jsonserializer.orjson = None
+            baseline = baseline or secs
+            print("%-30s %10.2fms %7.1fx" %
+                  (name, 1e3 * secs / iterations, baseline / secs))
+    finally:
+        jsonserializer.orjson = backend
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS,
+         int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WTPS,
+         int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CLIENTS)
@@ -17,7 +17,8 @@
 
 """EmPOWER Account Class."""
 
-from empower.persistence import Session
+from empower.persistence import PERSISTENCE
+from empower.persistence.writebehind import update
 from empower.persistence.persistence import TblAccount
 
 ROLE_ADMIN = "admin"
@@ -78,48 +79,32 @@ class Account:
     def password(self, password):
         """Set name."""
 
-        session = Session()
-        account = session.query(TblAccount) \
-                         .filter(TblAccount.username == self.username) \
-                         .first()
-        account.password = password
-        session.commit()
+        PERSISTENCE.submit(update(TblAccount, {'username': self.username},
+                                  password=password))
         self._password = password
 
     @name.setter
     def name(self, name):
         """Set name."""
 
-        session = Session()
-        account = session.query(TblAccount) \
-                         .filter(TblAccount.username == self.username) \
-                         .first()
-        account.name = name
-        session.commit()
+        PERSISTENCE.submit(update(TblAccount, {'username': self.username},
+                                  name=name))
         self._name = name
 
     @surname.setter
     def surname(self, surname):
         """Set surname."""
 
-        session = Session()
-        account = Session().query(TblAccount) \
-                           .filter(TblAccount.username == self.username) \
-                           .first()
-        account.surname = surname
-        session.commit()
+        PERSISTENCE.submit(update(TblAccount, {'username': self.username},
+                                  surname=surname))
         self._surname = surname
 
     @email.setter
     def email(self, email):
         """Set email."""
 
-        session = Session()
-        account = Session().query(TblAccount) \
-                           .filter(TblAccount.username == self.username) \
-                           .first()
-        account.email = email
-        session.commit()
+        PERSISTENCE.submit(update(TblAccount, {'username': self.username},
+                                  email=email))
         self._email = email
 
     def __str__(self):
@@ -17,10 +17,10 @@
 
 """EmPOWER base app class."""
 
-import tornado.ioloop
 import empower.logger
 
 from empower.core.resourcepool import ResourcePool
+from empower.core.timerwheel import PeriodicTimer
 from empower.core.cellpool import CellPool
 from empower.lvapp.lvappserver import LVAPPServer
 from empower.lvapp import PT_LVAP_JOIN
@@ -155,8 +155,7 @@ class EmpowerApp:
     def start(self):
         """Start control loop."""
 
-        self.worker = \
-            tornado.ioloop.PeriodicCallback(self.loop, self.every)
+        self.worker = PeriodicTimer(self.loop, self.every)
         self.worker.start()
 
     def stop(self):
@@ -194,12 +193,13 @@ class EmpowerApp:
         if self.tenant_id not in RUNTIME.tenants:
             return None
 
-        lvaps = RUNTIME.tenants[self.tenant_id].lvaps.values()
+        lvaps = RUNTIME.tenants[self.tenant_id].lvaps
 
         if not block:
-            return lvaps
+            return lvaps.values()
 
-        return [x for x in lvaps if x.blocks[0] == block]
+        return [x for x in RUNTIME.find_lvaps_by_block(block)
+                if x.blocks[0] == block and lvaps.get(x.addr) is x]
 
     def lvap(self, addr):
         """Return a particular LVAP in this tenant."""
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER BSSID map.
+
+Stations authenticate and associate using either the BSSID of a shared
+tenant VAP or the BSSID generated for them by a unique tenant. The map
+resolves a BSSID into the networks it belongs to with a couple of
+dictionary lookups.
+"""
+
+from empower.core.tenant import T_TYPE_UNIQUE
+from empower.core.tenant import BSSID_TENANT_MASK
+from empower.core.tenant import BSSID_STATION_MASK
+
+
+class BSSIDMap:
+    """Map BSSIDs to tenants and VAPs.
+
+    Attributes:
+        vaps: VAPs indexed by BSSID
+        tenants: unique tenants indexed by the tenant part of their BSSIDs
+            (see Tenant.bssid_base) and then by tenant id
+    """
+
+    def __init__(self):
+
+        self.vaps = {}
+        self.tenants = {}
+
+    def add_tenant(self, tenant):
+        """Add a tenant (only unique tenants are mapped)."""
+
+        if tenant.bssid_type != T_TYPE_UNIQUE:
+            return
+
+        self.tenants.setdefault(tenant.bssid_base, {})[tenant.tenant_id] = \
+            tenant
+
+    def remove_tenant(self, tenant):
+        """Remove a tenant."""
+
+        tenants = self.tenants.get(tenant.bssid_base)
+
+        if not tenants or tenant.tenant_id not in tenants:
+            return
+
+        del tenants[tenant.tenant_id]
+
+        if not tenants:
+            del self.tenants[tenant.bssid_base]
+
+    def add_vap(self, vap):
+        """Add a VAP."""
+
+        self.vaps[vap.bssid] = vap
+
+    def remove_vap(self, vap):
+        """Remove a VAP."""
+
+        if self.vaps.get(vap.bssid) is vap:
+            del self.vaps[vap.bssid]
+
+    def find(self, bssid, sta):
+        """Find the networks a station can reach using the specified BSSID.
+
+        Returns:
+            A list of (tenant, vap) tuples, vap is None for unique tenants.
+        """
+
+        out = []
+
+        value = bssid.to_int()
+
+        if value & BSSID_STATION_MASK == sta.to_int() & BSSID_STATION_MASK:
+            tenants = self.tenants.get(value & BSSID_TENANT_MASK, {})
+            out += [(tenant, None) for tenant in tenants.values()]
+
+        vap = self.vaps.get(bssid)
+
+        if vap:
+            out.append((vap.tenant, vap))
+
+        return out
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER remote callbacks delivery.
+
+Remote callbacks are [url, method] pairs pointing to an XML-RPC server.
+Events are queued per endpoint in a bounded queue and are delivered by a
+small pool of threads, so that slow consumers never block the IOLoop.
+
+Events are encoded only when they are about to be sent. Events queued with
+a key replace the pending event with the same key (merge), e.g. only the
+most recent statistics of a module are delivered, and their to_dict() is
+called only when they are sent. The to_dict() of the other events is called
+when they are queued, since the same object can be queued again with a
+different state before the batch is sent. When the queue is full the oldest
+event is dropped.
+
+All the events queued during an IOLoop iteration (or while the previous
+batch was in flight) are sent as a single batch using an XML-RPC multicall
+over a persistent HTTP connection. Endpoints not supporting multicall get
+one call per event.
+"""
+
+import time
+import http.client
+import xmlrpc.client
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tornado.ioloop import IOLoop
+
+import empower.logger
+
+from empower.core.jsonserializer import dumps
+from empower.core.histogram import Histogram
+
+# number of delivery threads (shared by all the endpoints)
+DEFAULT_WORKERS = 10
+
+# maximum number of pending events per endpoint
+DEFAULT_QUEUE_SIZE = 1024
+
+# maximum number of events per batch
+DEFAULT_BATCH = 64
+
+# timeout (in seconds) of a single delivery
+DEFAULT_TIMEOUT = 10
+
+
+class Transport(xmlrpc.client.Transport):
+    """XML-RPC transport with a connection timeout."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, **kwargs):
+
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+
+        return conn
+
+
+class SafeTransport(xmlrpc.client.SafeTransport):
+    """XML-RPC over HTTPS transport with a connection timeout."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, **kwargs):
+
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def make_connection(self, host):
+
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+
+        return conn
+
+
+class Endpoint:
+    """A remote callback endpoint.
+
+    Attributes:
+        url: the URL of the XML-RPC server
+        method: the remote method
+        maxsize: the maximum number of pending events
+        batch: the maximum number of events per batch
+        multicall: False if the server does not support multicall
+        queued: the number of events queued
+        delivered: the number of events delivered
+        dropped: the number of events dropped because the queue was full
+        merged: the number of events replaced by a more recent one
+        failed: the number of events whose delivery failed
+        batches: the number of batches sent
+        latency: histogram of the queue to delivery time of the batches
+            sent successfully (ms)
+    """
+
+    def __init__(self, url, method, executor, maxsize=DEFAULT_QUEUE_SIZE,
+                 batch=DEFAULT_BATCH):
+
+        self.url = url
+        self.method = method
+        self.maxsize = maxsize
+        self.batch = batch
+        self.multicall = True
+
+        self.queued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.merged = 0
+        self.failed = 0
+        self.batches = 0
+        self.latency = Histogram()
+
+        self.log = empower.logger.get_logger()
+
+        self.__executor = executor
+        self.__pending = OrderedDict()
+        self.__seq = 0
+        self.__scheduled = False
+        self.__inflight = False
+        self.__proxy = None
+
+    def __len__(self):
+        return len(self.__pending)
+
+    def put(self, serializable, key=None):
+        """Queue an event (IOLoop thread only).
+
+        Args:
+            serializable: an object implementing the to_dict() method
+            key: events with the same key are merged (optional)
+        """
+
+        self.queued += 1
+
+        snapshot = None
+
+        if key is None:
+
+            # snapshot the current state, the object may change before
+            # the batch is sent
+            try:
+                snapshot = serializable.to_dict()
+            except Exception as ex:
+                self.failed += 1
+                self.log.exception(ex)
+                return
+
+        if key is not None and key in self.__pending:
+            self.merged += 1
+            del self.__pending[key]
+
+        elif len(self.__pending) >= self.maxsize:
+            self.dropped += 1
+            self.__pending.popitem(last=False)
+
+        if key is None:
+            self.__seq += 1
+            key = (None, self.__seq)
+
+        self.__pending[key] = (serializable, snapshot, time.time())
+
+        self.__schedule()
+
+    def __schedule(self):
+        """Schedule a flush at the next IOLoop iteration."""
+
+        if self.__scheduled or self.__inflight:
+            return
+
+        self.__scheduled = True
+        IOLoop.current().add_callback(self.__flush)
+
+    def __flush(self):
+        """Serialize a batch and hand it to the delivery threads."""
+
+        self.__scheduled = False
+
+        if not self.__pending or self.__inflight:
+            return
+
+        payloads = []
+        stamps = []
+
+        while self.__pending and len(payloads) < self.batch:
+
+            _, (serializable, snapshot, stamp) = \
+                self.__pending.popitem(last=False)
+
+            try:
+                if snapshot is None:
+                    snapshot = serializable.to_dict()
+                payloads.append(dumps(snapshot, compact=True).decode())
+                stamps.append(stamp)
+            except Exception as ex:
+                self.failed += 1
+                self.log.exception(ex)
+
+        if not payloads:
+            return
+
+        self.__inflight = True
+        self.batches += 1
+
+        future = self.__executor.submit(self.__send, payloads)
+        loop = IOLoop.current()
+
+        future.add_done_callback(
+            lambda f: loop.add_callback(self.__done, f, stamps))
+
+    def __done(self, future, stamps):
+        """Update the metrics once a batch has been sent."""
+
+        self.__inflight = False
+
+        if future.exception():
+            failed = len(stamps)
+            self.log.warning("Unable to deliver %u events to %s: %s",
+                             len(stamps), self.url, future.exception())
+        else:
+            failed = future.result()
+
+        self.failed += failed
+        self.delivered += len(stamps) - failed
+
+        if not future.exception():
+            now = time.time()
+            for stamp in stamps:
+                self.latency.add((now - stamp) * 1000.0)
+
+        if self.__pending:
+            self.__schedule()
+
+    def __get_proxy(self):
+        """Return the server proxy (delivery threads only)."""
+
+        if not self.__proxy:
+
+            if self.url.startswith("https"):
+                transport = SafeTransport()
+            else:
+                transport = Transport()
+
+            self.__proxy = xmlrpc.client.ServerProxy(self.url,
+                                                     transport=transport,
+                                                     allow_none=True)
+
+        return self.__proxy
+
+    def __send(self, payloads):
+        """Send a batch and return the number of failed events.
+
+        Only one batch per endpoint is in flight at any time, so the proxy
+        (and its persistent connection) is never used concurrently.
+        """
+
+        proxy = self.__get_proxy()
+
+        try:
+
+            if len(payloads) > 1 and self.multicall:
+
+                multi = xmlrpc.client.MultiCall(proxy)
+
+                for payload in payloads:
+                    getattr(multi, self.method)(payload)
+
+                try:
+                    results = multi()
+                except xmlrpc.client.Fault:
+                    # system.multicall not supported, fall back
+                    self.multicall = False
+                else:
+                    return self.__failures(results, len(payloads))
+
+            failed = 0
+
+            for payload in payloads:
+                try:
+                    getattr(proxy, self.method)(payload)
+                except xmlrpc.client.Fault:
+                    failed += 1
+
+            return failed
+
+        except (OSError, http.client.HTTPException,
+                xmlrpc.client.ProtocolError):
+
+            # drop the connection, a new one is opened with the next batch
+            self.__proxy("close")()
+            self.__proxy = None
+            raise
+
+    @classmethod
+    def __failures(cls, results, count):
+        """Return the number of faults in a multicall result."""
+
+        failed = 0
+
+        for idx in range(count):
+            try:
+                results[idx]
+            except xmlrpc.client.Fault:
+                failed += 1
+
+        return failed
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'url': self.url,
+                'method': self.method,
+                'pending': len(self.__pending),
+                'inflight': self.__inflight,
+                'multicall': self.multicall,
+                'queued': self.queued,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'merged': self.merged,
+                'failed': self.failed,
+                'batches': self.batches,
+                'latency': self.latency.to_dict()}
+
+
+class CallbackDispatcher:
+    """Delivers events to remote callbacks.
+
+    Attributes:
+        endpoints: the endpoints indexed by (url, method)
+        workers: the number of delivery threads
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+
+        self.endpoints = {}
+        self.workers = workers
+
+        self.__executor = None
+
+    def deliver(self, callback, serializable, key=None):
+        """Queue an event for a [url, method] remote callback."""
+
+        url, method = callback
+
+        if (url, method) not in self.endpoints:
+
+            if not self.__executor:
+                self.__executor = ThreadPoolExecutor(self.workers)
+
+            self.endpoints[(url, method)] = \
+                Endpoint(url, method, self.__executor)
+
+        self.endpoints[(url, method)].put(serializable, key)
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'workers': self.workers,
+                'endpoints': [endpoint.to_dict()
+                              for endpoint in self.endpoints.values()]}
+
+
+CALLBACKS = CallbackDispatcher()
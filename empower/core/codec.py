@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER precompiled message codecs.
+
+The message definitions used by the southbound protocols are written using
+construct. This module compiles those definitions into codecs built on top
+of precompiled struct.Struct objects. Each codec exposes the same subset of
+the construct API used by the controller (name, sizeof, parse, and build)
+and is wire-compatible with the definition it has been compiled from.
+
+The following constructs are supported:
+    - big-endian integer fields (UBInt8, SBInt16, ...)
+    - fixed-size byte fields (Bytes)
+    - byte-aligned bit fields (BitStruct with Bit/BitField and Padding)
+    - padding (Padding)
+    - counted arrays of fixed-size elements (Array)
+    - greedy ranges of fixed-size elements (OptionalGreedyRange)
+
+Parsed messages are returned as instances of a slotted record class
+generated for each definition. Records support both attribute and item
+access so that they can be used wherever a construct Container is.
+
+Columnar codecs decode arrays and ranges as NumPy structured arrays copied
+out of the message buffer with a single memcpy (bit fields are returned as
+the raw integer). If NumPy is not available, lists are returned as usual.
+"""
+
+import struct
+
+from construct import Struct
+from construct import Sequence
+from construct.core import FormatField
+from construct.core import StaticField
+from construct.core import Buffered
+from construct.core import MetaArray
+from construct.core import Range
+from construct.core import Reconfig
+from construct.adapters import PaddingAdapter
+from construct.adapters import BitIntegerAdapter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CODEC_CONSTRUCT = "construct"
+CODEC_STRUCT = "struct"
+
+CODECS = [CODEC_CONSTRUCT, CODEC_STRUCT]
+
+STRUCT_INTEGERS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+class Record:
+    """Base class for the records generated by the codecs.
+
+    Records are slotted objects whose fields can be accessed both as
+    attributes and as items, e.g. msg.wtp and msg['wtp'].
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+
+        if isinstance(other, Record):
+            return self.items() == other.items()
+
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+
+        return NotImplemented
+
+    def __repr__(self):
+        fields = ", ".join("%s=%r" % (k, v) for k, v in self.items())
+        return "%s(%s)" % (self.__class__.__name__, fields)
+
+    def keys(self):
+        """Return the names of the fields that have been set."""
+
+        return [k for k in self.__slots__ if hasattr(self, k)]
+
+    def values(self):
+        """Return the values of the fields that have been set."""
+
+        return [getattr(self, k) for k in self.keys()]
+
+    def items(self):
+        """Return the (name, value) pairs of the fields that have been set."""
+
+        return [(k, getattr(self, k)) for k in self.keys()]
+
+    def get(self, key, default=None):
+        """Return the value of key if set, default otherwise."""
+
+        return getattr(self, key, default)
+
+
+def make_record(name, fields):
+    """Generate a slotted record class with the specified fields."""
+
+    fields = tuple(fields)
+
+    if not fields:
+        return type(name, (Record,), {'__slots__': ()})
+
+    args = ", ".join("%s=None" % f for f in fields)
+    body = "\n".join("    self.%s = %s" % (f, f) for f in fields)
+    source = "def __init__(self, %s):\n%s\n" % (args, body)
+
+    namespace = {}
+    exec(source, namespace)
+
+    return type(name, (Record,), {'__slots__': fields,
+                                  '__init__': namespace['__init__']})
+
+
+def numpy_format(fmt):
+    """Return the big-endian NumPy format of a struct format character.
+
+    Sizes are explicit since struct and NumPy disagree on the size of some
+    format characters (e.g. L).
+    """
+
+    size = struct.calcsize(">" + fmt)
+
+    if fmt in "efd":
+        return ">f%u" % size
+
+    if fmt == "?":
+        return "?"
+
+    return ">%s%u" % ("i" if fmt.islower() else "u", size)
+
+
+class BitFields:
+    """A byte-aligned group of bit fields (a BitStruct).
+
+    The whole group is read from the wire as a single unsigned integer and
+    then split into its named components.
+
+    Attributes:
+        fmt: the struct format used to read the group
+        fields: a list of (name, shift, mask, signed) tuples
+        record: the record class returned when parsing
+    """
+
+    def __init__(self, bitstruct):
+
+        fields = []
+        width = 0
+
+        for subcon in bitstruct.subcon.subcons:
+
+            if isinstance(subcon, PaddingAdapter) and \
+               isinstance(subcon.subcon, StaticField):
+                width += subcon.subcon.length
+                continue
+
+            if isinstance(subcon, BitIntegerAdapter) and \
+               not callable(subcon.width) and not subcon.swapped:
+                fields.append((subcon.name, width, subcon.width,
+                               subcon.signed))
+                width += subcon.width
+                continue
+
+            raise ValueError("Unsupported bit field %s" % subcon)
+
+        if width % 8:
+            raise ValueError("Bit fields are not byte aligned")
+
+        size = width // 8
+
+        if size not in STRUCT_INTEGERS:
+            raise ValueError("Unsupported bit fields size %u" % size)
+
+        self.fmt = STRUCT_INTEGERS[size]
+        self.fields = [(name, width - offset - length, (1 << length) - 1,
+                        signed)
+                       for name, offset, length, signed in fields]
+        self.record = make_record(bitstruct.name,
+                                  [field[0] for field in fields])
+
+    def decode(self, value):
+        """Split an integer into its bit fields."""
+
+        out = self.record()
+
+        for name, shift, mask, signed in self.fields:
+            field = (value >> shift) & mask
+            if signed and field > (mask >> 1):
+                field -= mask + 1
+            setattr(out, name, field)
+
+        return out
+
+    def encode(self, obj):
+        """Merge the bit fields of obj into an integer."""
+
+        value = 0
+
+        for name, shift, mask, _ in self.fields:
+            value |= (int(obj[name]) & mask) << shift
+
+        return value
+
+
+class Layout:
+    """A run of fixed-size fields packed by a single struct.Struct.
+
+    Attributes:
+        packer: the precompiled struct.Struct
+        names: the name of each field that carries a value
+        bits: a list of (index, BitFields) for the bit fields in the run
+        columns: a list of (name, numpy format, offset) for each field
+    """
+
+    def __init__(self, subcons):
+
+        fmt = ">"
+        names = []
+        bits = []
+        columns = []
+
+        for subcon in subcons:
+
+            offset = struct.calcsize(fmt)
+
+            if isinstance(subcon, FormatField):
+
+                if subcon.packer.format[0] not in (">", "!"):
+                    raise ValueError("Field %s is not big-endian" %
+                                     subcon.name)
+
+                fmt += subcon.packer.format[1:]
+                names.append(subcon.name)
+                columns.append((subcon.name,
+                                numpy_format(subcon.packer.format[1:]),
+                                offset))
+
+            elif isinstance(subcon, StaticField):
+
+                fmt += "%us" % subcon.length
+                names.append(subcon.name)
+                columns.append((subcon.name, ("u1", (subcon.length,)),
+                                offset))
+
+            elif isinstance(subcon, PaddingAdapter) and \
+                    isinstance(subcon.subcon, StaticField) and \
+                    subcon.pattern == b"\x00":
+
+                fmt += "%ux" % subcon.subcon.length
+
+            elif isinstance(subcon, Buffered) and \
+                    isinstance(subcon.subcon, Struct):
+
+                field = BitFields(subcon)
+                fmt += field.fmt
+                bits.append((len(names), field))
+                names.append(subcon.name)
+                columns.append((subcon.name, numpy_format(field.fmt),
+                                offset))
+
+            else:
+
+                raise ValueError("Unsupported field %s" % subcon)
+
+        self.packer = struct.Struct(fmt)
+        self.names = names
+        self.bits = bits
+        self.columns = columns
+        self.__dtype = None
+
+    @property
+    def size(self):
+        """Return the size of the run in bytes."""
+
+        return self.packer.size
+
+    @property
+    def dtype(self):
+        """Return the NumPy structured dtype matching the run."""
+
+        if self.__dtype is None:
+            self.__dtype = numpy.dtype({
+                'names': [column[0] for column in self.columns],
+                'formats': [column[1] for column in self.columns],
+                'offsets': [column[2] for column in self.columns],
+                'itemsize': self.size})
+
+        return self.__dtype
+
+    def unpack(self, buf, offset):
+        """Unpack the run at offset and return its values as a list."""
+
+        values = self.packer.unpack_from(buf, offset)
+
+        if not self.bits:
+            return values
+
+        values = list(values)
+
+        for index, field in self.bits:
+            values[index] = field.decode(values[index])
+
+        return values
+
+    def pack(self, values):
+        """Pack a list of values."""
+
+        if self.bits:
+            values = list(values)
+            for index, field in self.bits:
+                values[index] = field.encode(values[index])
+
+        return self.packer.pack(*values)
+
+
+class Element:
+    """A fixed-size array element.
+
+    Elements can be a single field (returned as a scalar), a Sequence
+    (returned as a list), or a Struct (returned as a record).
+
+    Attributes:
+        layout: the Layout of the element
+        kind: one of the element kinds defined below
+        record: the record class (Struct elements only)
+    """
+
+    SCALAR = 0
+    SEQUENCE = 1
+    RECORD = 2
+
+    def __init__(self, subcon):
+
+        if isinstance(subcon, Sequence):
+            self.kind = self.SEQUENCE
+            self.layout = Layout(subcon.subcons)
+            self.record = None
+        elif isinstance(subcon, Struct):
+            self.kind = self.RECORD
+            self.layout = Layout(subcon.subcons)
+            self.record = make_record(subcon.name, self.layout.names)
+        else:
+            self.kind = self.SCALAR
+            self.layout = Layout([subcon])
+            self.record = None
+
+    def unpack(self, buf, offset, count):
+        """Unpack count elements starting at offset."""
+
+        layout = self.layout
+        size = layout.size
+        end = offset + size * count
+
+        if end > len(buf):
+            raise ValueError("Expected %u elements, buffer too short" % count)
+
+        chunk = memoryview(buf)[offset:end]
+
+        try:
+
+            if layout.bits:
+                values = [layout.unpack(chunk, i * size)
+                          for i in range(count)]
+            else:
+                values = layout.packer.iter_unpack(chunk)
+
+            if self.kind == self.SCALAR:
+                return [value[0] for value in values]
+
+            if self.kind == self.SEQUENCE:
+                return [list(value) for value in values]
+
+            record = self.record
+            return [record(*value) for value in values]
+
+        finally:
+            chunk.release()
+
+    def columns(self, buf, offset, count):
+        """Map count elements starting at offset onto a structured array.
+
+        The returned array is a copy, buf is usually a frame of the
+        connection FrameBuffer and the array can outlive it.
+        """
+
+        if offset + self.layout.size * count > len(buf):
+            raise ValueError("Expected %u elements, buffer too short" % count)
+
+        return numpy.frombuffer(buf, dtype=self.layout.dtype, count=count,
+                                offset=offset).copy()
+
+    def pack(self, objs):
+        """Pack a list of elements."""
+
+        layout = self.layout
+
+        if self.kind == self.SCALAR:
+            return b"".join(layout.pack((obj,)) for obj in objs)
+
+        if self.kind == self.SEQUENCE:
+            return b"".join(layout.pack(obj) for obj in objs)
+
+        names = layout.names
+        return b"".join(layout.pack([obj[name] for name in names])
+                        for obj in objs)
+
+
+class Codec:
+    """A precompiled codec.
+
+    The definition is split into a list of segments, each being either a
+    run of fixed-size fields (Layout), a counted array (MetaArray) or a
+    greedy range (Range) of fixed-size elements.
+
+    Attributes:
+        name: the name of the message
+        parser: the construct definition the codec was compiled from
+        segments: the list of (kind, name, Layout or Element, arg) tuples
+        record: the record class returned when parsing
+        columnar: if true arrays are parsed as NumPy structured arrays
+    """
+
+    FIXED = 0
+    ARRAY = 1
+    RANGE = 2
+
+    def __init__(self, parser, columnar=False):
+
+        if not isinstance(parser, Struct) or isinstance(parser, Sequence):
+            raise ValueError("Unsupported definition %s" % parser)
+
+        self.name = parser.name
+        self.parser = parser
+        self.segments = []
+        self.columnar = columnar and numpy is not None
+
+        names = []
+        fixed = []
+
+        for subcon in parser.subcons:
+
+            if isinstance(subcon, Reconfig):
+                subcon = subcon.subcon
+
+            if isinstance(subcon, (MetaArray, Range)):
+
+                if fixed:
+                    self.__add_layout(fixed)
+                    fixed = []
+
+                element = Element(subcon.subcon)
+
+                if isinstance(subcon, MetaArray):
+                    self.segments.append((self.ARRAY, subcon.name, element,
+                                          subcon.countfunc))
+                else:
+                    self.segments.append((self.RANGE, subcon.name, element,
+                                          (subcon.mincount, subcon.maxcout)))
+
+                names.append(subcon.name)
+                continue
+
+            fixed.append(subcon)
+
+        if fixed:
+            self.__add_layout(fixed)
+
+        for kind, _, layout, _ in self.segments:
+            if kind == self.FIXED:
+                names += layout.names
+
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate field names in %s" % parser.name)
+
+        self.record = make_record(parser.name, self.__fields())
+
+        # fast path for definitions made of a single run of fields
+        self.__simple = len(self.segments) == 1 and \
+            self.segments[0][0] == self.FIXED
+
+    def __add_layout(self, subcons):
+        """Append a run of fixed-size fields."""
+
+        self.segments.append((self.FIXED, None, Layout(subcons), None))
+
+    def __fields(self):
+        """Return the field names in wire order."""
+
+        fields = []
+
+        for kind, name, layout, _ in self.segments:
+            if kind == self.FIXED:
+                fields += layout.names
+            else:
+                fields.append(name)
+
+        return fields
+
+    def __repr__(self):
+        return "Codec(%s)" % self.name
+
+    def sizeof(self):
+        """Return the size of the message (fixed-size messages only)."""
+
+        return self.parser.sizeof()
+
+    def parse(self, data):
+        """Parse data (bytes, bytearray, or memoryview) into a record."""
+
+        if self.__simple:
+            return self.record(*self.segments[0][2].unpack(data, 0))
+
+        out = self.record()
+        offset = 0
+
+        for kind, name, layout, arg in self.segments:
+
+            if kind == self.FIXED:
+
+                values = layout.unpack(data, offset)
+                for field, value in zip(layout.names, values):
+                    setattr(out, field, value)
+                offset += layout.size
+
+            elif kind == self.ARRAY:
+
+                count = arg(out)
+                setattr(out, name, self.__unpack(layout, data, offset, count))
+                offset += layout.layout.size * count
+
+            else:
+
+                mincount, maxcount = arg
+                count = min((len(data) - offset) // layout.layout.size,
+                            maxcount)
+
+                if count < mincount:
+                    raise ValueError("Expected %u to %u elements, found %u" %
+                                     (mincount, maxcount, count))
+
+                setattr(out, name, self.__unpack(layout, data, offset, count))
+                offset += layout.layout.size * count
+
+        return out
+
+    def __unpack(self, element, data, offset, count):
+        """Unpack an array either as a list or as a structured array."""
+
+        if self.columnar:
+            return element.columns(data, offset, count)
+
+        return element.unpack(data, offset, count)
+
+    def build(self, obj):
+        """Build a message from obj (a record or a Container)."""
+
+        if self.__simple:
+            layout = self.segments[0][2]
+            return layout.pack([obj[name] for name in layout.names])
+
+        chunks = []
+
+        for kind, name, layout, arg in self.segments:
+
+            if kind == self.FIXED:
+
+                chunks.append(layout.pack([obj[field]
+                                           for field in layout.names]))
+
+            elif kind == self.ARRAY:
+
+                value = obj[name]
+                count = arg(obj)
+
+                if len(value) != count:
+                    raise ValueError("Expected %u elements, found %u" %
+                                     (count, len(value)))
+
+                chunks.append(self.__pack(layout, value))
+
+            else:
+
+                value = obj[name]
+                mincount, maxcount = arg
+
+                if len(value) < mincount or len(value) > maxcount:
+                    raise ValueError("Expected %u to %u elements, found %u" %
+                                     (mincount, maxcount, len(value)))
+
+                chunks.append(self.__pack(layout, value))
+
+        return b"".join(chunks)
+
+    @classmethod
+    def __pack(cls, element, value):
+        """Pack an array given either as a list or as a structured array."""
+
+        if numpy is not None and isinstance(value, numpy.ndarray):
+            return value.astype(element.layout.dtype, copy=False).tobytes()
+
+        return element.pack(value)
+
+
+def compile_parser(parser, columnar=False):
+    """Compile a construct definition.
+
+    Return the compiled codec or the original definition if the definition
+    uses constructs that are not supported by the compiler.
+    """
+
+    if parser is None or isinstance(parser, Codec):
+        return parser
+
+    try:
+        return Codec(parser, columnar)
+    except ValueError:
+        return parser
+
+
+def compile_pt_types(pt_types, codec=CODEC_STRUCT):
+    """Return a copy of pt_types using the specified codec."""
+
+    if codec not in CODECS:
+        raise ValueError("Invalid codec %s" % codec)
+
+    if codec == CODEC_CONSTRUCT:
+        return dict(pt_types)
+
+    return {pt_type: compile_parser(parser)
+            for pt_type, parser in pt_types.items()}
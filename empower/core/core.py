@@ -18,12 +18,14 @@
 """EmPOWER Runtime."""
 
 from random import randint
+from uuid import uuid4
 
-import pkgutil
+import time
+import base64
+import binascii
 import socket
 import fcntl
 import struct
-import tornado.ioloop
 
 from construct import Container
 from construct import Struct
@@ -35,6 +37,11 @@ from sqlalchemy.exc import IntegrityError
 from empower.datatypes.etheraddress import EtherAddress
 from empower.datatypes.dscp import DSCP
 from empower.persistence import Session
+from empower.persistence import PERSISTENCE
+from empower.core.timeseries import TIME_SERIES
+from empower.core.eventbus import EVENT_BUS
+from empower.persistence.writebehind import insert
+from empower.persistence.writebehind import delete
 from empower.persistence.persistence import TblTenant
 from empower.persistence.persistence import TblAccount
 from empower.core.account import Account
@@ -43,13 +50,29 @@ from empower.core.account import ROLE_USER
 from empower.core.tenant import Tenant
 from empower.core.acl import ACL
 from empower.persistence.persistence import TblAllow
+from empower.persistence.persistence import TblTrafficRule
 from empower.core.tenant import T_TYPES
+from empower.core.tenant import T_TYPE_UNIQUE
+from empower.core.bssidmap import BSSIDMap
+from empower.core.timerwheel import PeriodicTimer
+from empower.core.manifest import ManifestIndex
+from empower.core.startup import STARTUP
+from empower import settings
 
 import empower.logger
-import empower.apps
 
 DEFAULT_PERIOD = 5000
 
+# packages where the main and the user components are looked for
+MAIN_PACKAGES = ["empower", "empower.lvapp", "empower.lvnfp", "empower.vbsp"]
+USER_PACKAGES = ["empower.apps"]
+
+# lifetime (in seconds) of the entries of the authentication cache
+AUTH_CACHE_TTL = 60
+
+# maximum number of entries in the authentication cache
+AUTH_CACHE_MAXSIZE = 1024
+
 CTRL_ADV = Struct("ctrl_adv", Bytes("dst", 6),
                   Bytes("src", 6),
                   UBInt16("eth_type"),
@@ -89,33 +112,79 @@ def generate_default_accounts():
 
 
 class EmpowerRuntime:
-    """EmPOWER Runtime."""
+    """EmPOWER Runtime.
+
+    Besides the primary registries (tenants, lvaps, ues, ...), the runtime
+    keeps the following secondary indexes:
+        tenants_by_name: tenants indexed by network name (SSID)
+        tenants_by_plmn_id: tenants indexed by PLMN ID
+        tenant_owners: tenant owners indexed by tenant id (str)
+        ues_by_rnti: UEs indexed by (rnti, pci, vbs)
+        lvaps_by_wtp: LVAPs indexed by WTP address and then by LVAP address
+        lvaps_by_block: LVAPs indexed by block and then by LVAP address
+        vaps_by_block: VAPs indexed by block and then by BSSID
+        bssids: the BSSIDMap resolving BSSIDs into unique tenants and VAPs
+
+    The indexes are kept consistent by add_tenant/remove_tenant,
+    add_ue/remove_ue and add_vap/remove_vap, while UEs and LVAPs reindex
+    themselves when their cell/RNTI or blocks change. The generation counter
+    is incremented every time a tenant or a PNFDev is added or removed and
+    can be used to invalidate caches derived from them. In debug mode the
+    indexes are periodically checked against the primary registries.
+
+    Successful authentications are cached for AUTH_CACHE_TTL seconds in
+    auth_cache, indexed by the Authorization header. Entries are dropped
+    when the account is updated or removed.
+    """
 
     def __init__(self, options):
 
         self.components = {}
         self.accounts = {}
         self.tenants = {}
+        self.tenants_by_name = {}
+        self.tenants_by_plmn_id = {}
+        self.tenant_owners = {}
+        self.auth_cache = {}
         self.lvaps = {}
+        self.lvaps_by_wtp = {}
+        self.lvaps_by_block = {}
+        self.vaps_by_block = {}
+        self.bssids = BSSIDMap()
         self.ues = {}
+        self.ues_by_rnti = {}
         self.wtps = {}
         self.cpps = {}
         self.vbses = {}
         self.datapaths = {}
         self.allowed = {}
+        self.generation = 0
+        self.manifests = ManifestIndex(settings.MANIFEST_CACHE_PATH)
+        self.debug = options.debug
         self.log = empower.logger.get_logger()
 
         self.log.info("Starting EmPOWER Runtime")
 
+        self.log.info("Persistence mode: %s", options.persistence)
+        PERSISTENCE.set_mode(options.persistence)
+
         # generate default users if database is empty
         self.log.info("Generating default accounts")
         generate_default_accounts()
 
         # load defaults
         self.log.info("Loading EmPOWER Runtime defaults")
-        self.__load_accounts()
-        self.__load_tenants()
-        self.__load_acl()
+        with STARTUP.phase("load accounts"):
+            self.__load_accounts()
+
+        with STARTUP.phase("load tenants"):
+            self.__load_tenants()
+
+        with STARTUP.phase("load traffic rules"):
+            self.__load_traffic_rules()
+
+        with STARTUP.phase("load acl"):
+            self.__load_acl()
 
         if options.ctrl_adv:
             self.__ifname = options.ctrl_adv_iface
@@ -123,6 +192,11 @@ class EmpowerRuntime:
             self.__ctrl_port = options.ctrl_port
             self.__start_adv()
 
+        if self.debug:
+            self.log.info("Enabling runtime consistency checks")
+            self.__check = PeriodicTimer(self.check_indexes, DEFAULT_PERIOD)
+            self.__check.start()
+
     def __start_adv(self):
         """Star ctrl advertising."""
 
@@ -142,8 +216,7 @@ class EmpowerRuntime:
 
         self.__msg = CTRL_ADV.build(adv)
 
-        self.__auto_cfg = \
-            tornado.ioloop.PeriodicCallback(self.__auto_cfg_loop, 2000)
+        self.__auto_cfg = PeriodicTimer(self.__auto_cfg_loop, 2000)
 
         self.__auto_cfg.start()
 
@@ -182,6 +255,20 @@ class EmpowerRuntime:
                        tenant.bssid_type,
                        tenant.plmn_id)
 
+            self.__index_tenant(self.tenants[tenant.tenant_id])
+
+    def __load_traffic_rules(self):
+        """Load traffic rules."""
+
+        for rule in Session().query(TblTrafficRule).all():
+
+            if rule.tenant_id not in self.tenants:
+                continue
+
+            tenant = self.tenants[rule.tenant_id]
+            tenant.traffic_rules.add(rule.match, rule.dscp, rule.label,
+                                     rule.priority)
+
     def __load_acl(self):
         """ Load ACL list. """
 
@@ -197,7 +284,9 @@ class EmpowerRuntime:
         """Fetch the available components.
 
         A main component is a standard python module defining in the init file
-        a python dictionary named MANIFEST.
+        a python dictionary named MANIFEST. Manifests are read from the
+        source files (see ManifestIndex), components are imported only when
+        launched.
 
         The MANIFEST provides:
           - name: the name of the module
@@ -211,12 +300,7 @@ class EmpowerRuntime:
           - default: the default value of the parameter
         """
 
-        components = {}
-
-        self.__walk_module(empower, components)
-        self.__walk_module(empower.lvapp, components)
-        self.__walk_module(empower.lvnfp, components)
-        self.__walk_module(empower.vbsp, components)
+        components = self.manifests.get(*MAIN_PACKAGES)
 
         for component in components:
             if component in self.components:
@@ -234,7 +318,9 @@ class EmpowerRuntime:
         """Fetch the available user components.
 
         A user component is a standard python module defining in the init file
-        a python dictionary named MANIFEST.
+        a python dictionary named MANIFEST. Manifests are read from the
+        source files (see ManifestIndex), components are imported only when
+        launched.
 
         The MANIFEST provides:
           - name: the name of the module
@@ -249,9 +335,7 @@ class EmpowerRuntime:
         """
 
         tenant = self.tenants[tenant_id]
-        components = {}
-
-        self.__walk_module(empower.apps, components)
+        components = self.manifests.get(*USER_PACKAGES)
 
         for component in components:
             if component in tenant.components:
@@ -265,43 +349,13 @@ class EmpowerRuntime:
 
         return components
 
-    @classmethod
-    def __walk_module(cls, package, results):
-
-        pkgs = pkgutil.walk_packages(package.__path__)
-
-        for _, module_name, is_pkg in pkgs:
-
-            __import__(package.__name__ + "." + module_name)
-
-            if not is_pkg:
-                continue
-
-            if not hasattr(package, module_name):
-                continue
-
-            module = getattr(package, module_name)
-
-            if not hasattr(module, "MANIFEST"):
-                continue
-
-            manifest = getattr(module, "MANIFEST")
-
-            name = manifest['name']
-            results[name] = manifest
-
     def add_allowed(self, sta_addr, label=None):
         """ Add entry to ACL. """
 
-        allow = Session().query(TblAllow) \
-                         .filter(TblAllow.addr == sta_addr) \
-                         .first()
-        if allow:
+        if sta_addr in self.allowed:
             raise ValueError("Address already defined %s" % sta_addr)
 
-        session = Session()
-        session.add(TblAllow(addr=sta_addr, label=label))
-        session.commit()
+        PERSISTENCE.submit(insert(TblAllow, addr=sta_addr, label=label))
 
         acl = ACL(sta_addr, label)
         self.allowed[sta_addr] = acl
@@ -311,15 +365,10 @@ class EmpowerRuntime:
     def remove_allowed(self, sta_addr):
         """ Remove entry from ACL. """
 
-        allow = Session().query(TblAllow) \
-                         .filter(TblAllow.addr == sta_addr) \
-                         .first()
-        if not allow:
+        if sta_addr not in self.allowed:
             raise KeyError("Address not found %s" % sta_addr)
 
-        session = Session()
-        session.delete(allow)
-        session.commit()
+        PERSISTENCE.submit(delete(TblAllow, addr=sta_addr))
 
         del self.allowed[sta_addr]
 
@@ -337,23 +386,20 @@ class EmpowerRuntime:
         if role not in [ROLE_ADMIN, ROLE_USER]:
             raise ValueError("Invalid role %s" % role)
 
-        session = Session()
-        account = TblAccount(username=username,
-                             password=password,
-                             role=role,
-                             name=name,
-                             surname=surname,
-                             email=email)
-
-        session.add(account)
-        session.commit()
-
-        self.accounts[account.username] = Account(account.username,
-                                                  account.password,
-                                                  account.name,
-                                                  account.surname,
-                                                  account.email,
-                                                  account.role)
+        PERSISTENCE.submit(insert(TblAccount,
+                                  username=username,
+                                  password=password,
+                                  role=role,
+                                  name=name,
+                                  surname=surname,
+                                  email=email))
+
+        self.accounts[username] = Account(username,
+                                          password,
+                                          name,
+                                          surname,
+                                          email,
+                                          role)
 
     def remove_account(self, username):
         """Remove an account."""
@@ -361,17 +407,14 @@ class EmpowerRuntime:
         if username == 'root':
             raise ValueError("Cannot removed root account")
 
-        account = Session().query(TblAccount) \
-                           .filter(TblAccount.username == str(username)) \
-                           .first()
-        if not account:
+        if username not in self.accounts:
             raise KeyError(username)
 
-        session = Session()
-        session.delete(account)
-        session.commit()
+        PERSISTENCE.submit(delete(TblAccount, username=str(username)))
 
         del self.accounts[username]
+        self.__invalidate_auth(username)
+
         to_be_deleted = [x.tenant_id for x in self.tenants.values()
                          if x.owner == username]
 
@@ -383,6 +426,8 @@ class EmpowerRuntime:
 
         account = self.accounts[username]
 
+        self.__invalidate_auth(username)
+
         for param in request:
             setattr(account, param, request[param])
 
@@ -401,10 +446,13 @@ class EmpowerRuntime:
 
         self.log.info("Registering '%s'", name)
 
-        self.tenants[tenant_id].components[name] = init_method(**params)
+        app = init_method(**params)
 
-        if hasattr(self.tenants[tenant_id].components[name], "start"):
-            self.tenants[tenant_id].components[name].start()
+        self.tenants[tenant_id].components[name] = app
+        EVENT_BUS.subscribe_app(app)
+
+        if hasattr(app, "start"):
+            app.start()
 
     def register(self, name, init_method, params):
         """Register new component."""
@@ -440,6 +488,7 @@ class EmpowerRuntime:
 
         app.stop()
 
+        EVENT_BUS.unsubscribe_app(app)
         del tenant.components[app_id]
 
     def unregister(self, name):
@@ -478,6 +527,43 @@ class EmpowerRuntime:
 
         return True
 
+    def authenticate(self, auth_header):
+        """Return the account matching a basic Authorization header.
+
+        Returns None if the header is malformed or the credentials are
+        not valid.
+        """
+
+        now = time.time()
+        entry = self.auth_cache.get(auth_header)
+
+        if entry and entry[1] > now:
+            return entry[0]
+
+        try:
+            decoded = base64.b64decode(auth_header[6:]).decode()
+            username, password = decoded.split(':', 1)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+
+        if not self.check_permission(username, password):
+            return None
+
+        if len(self.auth_cache) >= AUTH_CACHE_MAXSIZE:
+            self.auth_cache.clear()
+
+        account = self.accounts[username]
+        self.auth_cache[auth_header] = (account, now + AUTH_CACHE_TTL)
+
+        return account
+
+    def __invalidate_auth(self, username):
+        """Drop the cached authentications of the specified user."""
+
+        for key, entry in list(self.auth_cache.items()):
+            if entry[0].username == username:
+                del self.auth_cache[key]
+
     def add_tenant(self, owner, desc, tenant_name, bssid_type,
                    tenant_id=None, plmn_id=None):
 
@@ -486,48 +572,49 @@ class EmpowerRuntime:
         if tenant_id in self.tenants:
             raise ValueError("Tenant %s exists" % tenant_id)
 
-        plmn_ids = [tenant.plmn_id for tenant in self.tenants.values()]
-
-        if plmn_id and plmn_id in plmn_ids:
+        if plmn_id and plmn_id in self.tenants_by_plmn_id:
             raise ValueError("PLMN ID %s exists" % plmn_id)
 
         if bssid_type not in T_TYPES:
             raise ValueError("Invalid bssid_type %s" % bssid_type)
 
-        session = Session()
-
-        if tenant_id:
-            request = TblTenant(tenant_id=tenant_id,
-                                tenant_name=tenant_name,
-                                owner=owner,
-                                desc=desc,
-                                bssid_type=bssid_type,
-                                plmn_id=plmn_id)
-        else:
-            request = TblTenant(owner=owner,
-                                tenant_name=tenant_name,
-                                desc=desc,
-                                bssid_type=bssid_type,
-                                plmn_id=plmn_id)
-
-        session.add(request)
-        session.commit()
-
-        self.tenants[request.tenant_id] = \
-            Tenant(request.tenant_id,
-                   request.tenant_name,
+        if owner not in self.accounts:
+            raise KeyError(owner)
+
+        if tenant_name in self.tenants_by_name:
+            raise ValueError("Tenant name %s exists" % tenant_name)
+
+        if not tenant_id:
+            tenant_id = uuid4()
+
+        try:
+            PERSISTENCE.submit(insert(TblTenant,
+                                      tenant_id=tenant_id,
+                                      tenant_name=tenant_name,
+                                      owner=owner,
+                                      desc=desc,
+                                      bssid_type=bssid_type,
+                                      plmn_id=plmn_id))
+        except IntegrityError:
+            raise ValueError("Tenant %s exists" % tenant_name)
+
+        self.tenants[tenant_id] = \
+            Tenant(tenant_id,
+                   tenant_name,
                    self.accounts[owner].username,
                    desc,
-                   request.bssid_type,
-                   request.plmn_id)
+                   bssid_type,
+                   plmn_id)
+
+        self.__index_tenant(self.tenants[tenant_id])
 
         # create default queue
         dscp = DSCP()
         descriptor = {}
 
-        self.tenants[request.tenant_id].add_slice(dscp, descriptor)
+        self.tenants[tenant_id].add_slice(dscp, descriptor)
 
-        return request.tenant_id
+        return tenant_id
 
     def remove_tenant(self, tenant_id):
         """Delete existing Tenant."""
@@ -541,16 +628,18 @@ class EmpowerRuntime:
         for dscp in list(tenant.slices):
             tenant.del_slice(dscp)
 
+        # remove vaps
+        for vap in list(tenant.vaps.values()):
+            self.remove_vap(vap)
+
         # remove tenant
+        self.__unindex_tenant(tenant)
         del self.tenants[tenant_id]
 
-        tenant = Session().query(TblTenant) \
-                          .filter(TblTenant.tenant_id == tenant_id) \
-                          .first()
+        TIME_SERIES.remove(tenant_id)
+        EVENT_BUS.unsubscribe(None, tenant_id)
 
-        session = Session()
-        session.delete(tenant)
-        session.commit()
+        PERSISTENCE.submit(delete(TblTenant, tenant_id=tenant_id))
 
         # remove running modules
         for component in self.components.values():
@@ -567,23 +656,43 @@ class EmpowerRuntime:
             for module_id in to_be_removed:
                 component.remove_module(module_id)
 
+    def __index_tenant(self, tenant):
+        """Add tenant to the secondary indexes."""
+
+        self.generation += 1
+
+        self.tenants_by_name[tenant.tenant_name] = tenant
+        self.tenant_owners[str(tenant.tenant_id)] = tenant.owner
+
+        if tenant.plmn_id:
+            self.tenants_by_plmn_id[tenant.plmn_id] = tenant
+
+        self.bssids.add_tenant(tenant)
+
+    def __unindex_tenant(self, tenant):
+        """Remove tenant from the secondary indexes."""
+
+        self.generation += 1
+
+        if self.tenants_by_name.get(tenant.tenant_name) is tenant:
+            del self.tenants_by_name[tenant.tenant_name]
+
+        self.tenant_owners.pop(str(tenant.tenant_id), None)
+
+        if self.tenants_by_plmn_id.get(tenant.plmn_id) is tenant:
+            del self.tenants_by_plmn_id[tenant.plmn_id]
+
+        self.bssids.remove_tenant(tenant)
+
     def load_tenant(self, tenant_name):
         """Load tenant from network name (SSID)."""
 
-        for tenant in self.tenants.values():
-            if tenant.tenant_name == tenant_name:
-                return tenant
-
-        return None
+        return self.tenants_by_name.get(tenant_name)
 
     def load_tenant_by_plmn_id(self, plmn_id):
-        """Load tenant from network name."""
-
-        for tenant in self.tenants.values():
-            if tenant.plmn_id == plmn_id:
-                return tenant
+        """Load tenant from PLMN ID."""
 
-        return None
+        return self.tenants_by_plmn_id.get(plmn_id)
 
     def remove_lvap(self, lvap_addr):
         """Remove LVAP from the network"""
@@ -610,8 +719,101 @@ class EmpowerRuntime:
         self.log.info("Deleting LVAP (DL+UL): %s", lvap.addr)
         lvap.clear_blocks()
 
+        self.unindex_lvap(lvap)
+
+        TIME_SERIES.remove(None, lvap.addr)
+
         del self.lvaps[lvap.addr]
 
+    def index_lvap(self, lvap):
+        """Add LVAP to the WTP and block indexes."""
+
+        for block in lvap.blocks:
+
+            if not block:
+                continue
+
+            self.lvaps_by_wtp.setdefault(block.radio.addr, {})[lvap.addr] = \
+                lvap
+            self.lvaps_by_block.setdefault(block, {})[lvap.addr] = lvap
+
+    def unindex_lvap(self, lvap):
+        """Remove LVAP from the WTP and block indexes."""
+
+        for block in lvap.blocks:
+
+            if not block:
+                continue
+
+            self.__unindex(self.lvaps_by_wtp, block.radio.addr, lvap.addr)
+            self.__unindex(self.lvaps_by_block, block, lvap.addr)
+
+    def find_lvaps_by_wtp(self, wtp_addr):
+        """Return the LVAPs having at least one block on a WTP."""
+
+        return list(self.lvaps_by_wtp.get(wtp_addr, {}).values())
+
+    def find_lvaps_by_block(self, block):
+        """Return the LVAPs scheduled on a block."""
+
+        return list(self.lvaps_by_block.get(block, {}).values())
+
+    def add_vap(self, vap):
+        """Add VAP to its tenant."""
+
+        vap.tenant.vaps[vap.bssid] = vap
+        self.vaps_by_block.setdefault(vap.block, {})[vap.bssid] = vap
+        self.bssids.add_vap(vap)
+
+    def remove_vap(self, vap):
+        """Remove VAP from its tenant."""
+
+        if vap.tenant.vaps.get(vap.bssid) is vap:
+            del vap.tenant.vaps[vap.bssid]
+
+        self.__unindex(self.vaps_by_block, vap.block, vap.bssid)
+
+        self.bssids.remove_vap(vap)
+
+    def find_vaps_by_block(self, block):
+        """Return the VAPs hosted by a block."""
+
+        return list(self.vaps_by_block.get(block, {}).values())
+
+    def find_bssid(self, bssid, sta):
+        """Find the networks a station can reach using the specified BSSID.
+
+        Returns:
+            A list of (tenant, vap) tuples, vap is None for unique tenants.
+        """
+
+        return self.bssids.find(bssid, sta)
+
+    @classmethod
+    def __unindex(cls, index, key, addr):
+        """Remove addr from a two-level index dropping empty entries."""
+
+        entries = index.get(key)
+
+        if not entries or addr not in entries:
+            return
+
+        del entries[addr]
+
+        if not entries:
+            del index[key]
+
+    def add_ue(self, ue):
+        """Add UE to the network."""
+
+        if ue.ue_id in self.ues:
+            raise ValueError("UE %s exists" % ue.ue_id)
+
+        self.ues[ue.ue_id] = ue
+        ue.tenant.ues[ue.ue_id] = ue
+
+        self.index_ue(ue)
+
     def remove_ue(self, ue_id):
         """Remove UE from the network"""
 
@@ -633,20 +835,104 @@ class EmpowerRuntime:
             vbsp_server = self.components[VBSPServer.__module__]
             vbsp_server.send_ue_leave_message_to_self(ue)
 
+        self.unindex_ue(ue)
+
+        TIME_SERIES.remove(None, ue.ue_id)
+
         del self.ues[ue.ue_id]
 
+    @classmethod
+    def __ue_key(cls, ue):
+        """Return the (rnti, pci, vbs) key of a UE."""
+
+        return (ue.rnti, ue.cell.pci, ue.cell.vbs)
+
+    def index_ue(self, ue):
+        """Add UE to the (rnti, pci, vbs) index."""
+
+        if ue.ue_id not in self.ues:
+            return
+
+        self.ues_by_rnti[self.__ue_key(ue)] = ue
+
+    def unindex_ue(self, ue):
+        """Remove UE from the (rnti, pci, vbs) index."""
+
+        key = self.__ue_key(ue)
+
+        if self.ues_by_rnti.get(key) is ue:
+            del self.ues_by_rnti[key]
+
     def find_ue_by_rnti(self, rnti, pci, vbs):
         """Find a UE using the tuple rnti, pci, vbs."""
 
-        for ue in self.ues.values():
+        return self.ues_by_rnti.get((rnti, pci, vbs))
+
+    def check_indexes(self):
+        """Check the secondary indexes against the primary registries.
+
+        Every inconsistency is logged as an error.
+
+        Returns:
+            The list of inconsistencies found (empty if none).
+        """
+
+        errors = []
+
+        def check(name, index, expected):
+
+            for key, value in expected.items():
+                if index.get(key) is not value:
+                    errors.append("%s: missing or stale entry %s" %
+                                  (name, key))
+
+            for key in index:
+                if key not in expected:
+                    errors.append("%s: dangling entry %s" % (name, key))
+
+        tenants = self.tenants.values()
+
+        check("tenants_by_name", self.tenants_by_name,
+              {t.tenant_name: t for t in tenants})
+
+        check("tenants_by_plmn_id", self.tenants_by_plmn_id,
+              {t.plmn_id: t for t in tenants if t.plmn_id})
+
+        check("tenant_owners", self.tenant_owners,
+              {str(t.tenant_id): t.owner for t in tenants})
+
+        check("ues_by_rnti", self.ues_by_rnti,
+              {self.__ue_key(ue): ue for ue in self.ues.values()})
+
+        def flatten(index):
+            return {(key, addr): value
+                    for key, entries in index.items()
+                    for addr, value in entries.items()}
+
+        lvaps = [(block, lvap) for lvap in self.lvaps.values()
+                 for block in lvap.blocks if block]
+
+        check("lvaps_by_wtp", flatten(self.lvaps_by_wtp),
+              {(block.radio.addr, lvap.addr): lvap for block, lvap in lvaps})
+
+        check("lvaps_by_block", flatten(self.lvaps_by_block),
+              {(block, lvap.addr): lvap for block, lvap in lvaps})
+
+        check("vaps_by_block", flatten(self.vaps_by_block),
+              {(vap.block, vap.bssid): vap for t in tenants
+               for vap in t.vaps.values()})
+
+        check("bssids.vaps", self.bssids.vaps,
+              {vap.bssid: vap for t in tenants for vap in t.vaps.values()})
 
-            if ue.rnti == rnti and \
-               ue.cell.pci == pci and \
-               ue.cell.vbs == vbs:
+        check("bssids.tenants", flatten(self.bssids.tenants),
+              {(t.bssid_base, t.tenant_id): t for t in tenants
+               if t.bssid_type == T_TYPE_UNIQUE})
 
-                return ue
+        for error in errors:
+            self.log.error("Inconsistent index %s", error)
 
-        return None
+        return errors
 
     def assoc_id(self):
         """Generate new assoc id."""
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER event bus.
+
+Lifecycle events (LVAP/UE/LVNF join and leave, WTP/VBS/CPP up and down) are
+dispatched to the apps through an index of subscribers keyed by event and
+tenant. Apps are subscribed only to the hooks they override, so dispatching
+an event costs O(subscribers) regardless of the number of tenants and apps.
+
+Events bound to a tenant (e.g. an LVAP joining a tenant) are delivered to
+the subscribers of that tenant only. Events concerning a device (e.g. a
+WTP connecting) are delivered to the subscribers of all the tenants.
+"""
+
+import time
+
+import empower.logger
+
+from empower.core.histogram import Histogram
+
+EV_LVAP_JOIN = "lvap_join"
+EV_LVAP_LEAVE = "lvap_leave"
+EV_LVAP_HANDOVER = "lvap_handover"
+EV_UE_JOIN = "ue_join"
+EV_UE_LEAVE = "ue_leave"
+EV_LVNF_JOIN = "lvnf_join"
+EV_LVNF_LEAVE = "lvnf_leave"
+EV_WTP_UP = "wtp_up"
+EV_WTP_DOWN = "wtp_down"
+EV_VBS_UP = "vbs_up"
+EV_VBS_DOWN = "vbs_down"
+EV_CPP_UP = "cpp_up"
+EV_CPP_DOWN = "cpp_down"
+
+# the events, each one matching an app hook with the same name
+EVENTS = [EV_LVAP_JOIN, EV_LVAP_LEAVE, EV_LVAP_HANDOVER, EV_UE_JOIN,
+          EV_UE_LEAVE, EV_LVNF_JOIN, EV_LVNF_LEAVE, EV_WTP_UP, EV_WTP_DOWN,
+          EV_VBS_UP, EV_VBS_DOWN, EV_CPP_UP, EV_CPP_DOWN]
+
+
+def overrides(obj, name):
+    """Return True if the class of obj overrides the method name.
+
+    A method is overridden if the class defining it is not the topmost
+    class of the hierarchy defining it (i.e. the default implementation).
+    """
+
+    classes = [cls for cls in type(obj).__mro__ if name in cls.__dict__]
+
+    return len(classes) > 1
+
+
+class EventBus:
+    """The event bus.
+
+    Attributes:
+        subscribers: the handlers indexed by event, then tenant_id, then
+            owner (the subscribing app)
+        latency: histogram of the dispatch time (ms) indexed by event
+    """
+
+    def __init__(self):
+
+        self.subscribers = {event: {} for event in EVENTS}
+        self.latency = {event: Histogram() for event in EVENTS}
+        self.log = empower.logger.get_logger()
+
+    def subscribe(self, event, tenant_id, handler, owner=None):
+        """Subscribe handler to the event for the specified tenant."""
+
+        if event not in self.subscribers:
+            raise KeyError(event)
+
+        tenants = self.subscribers[event]
+
+        if tenant_id not in tenants:
+            tenants[tenant_id] = {}
+
+        tenants[tenant_id][owner if owner is not None else handler] = handler
+
+    def unsubscribe(self, owner, tenant_id=None):
+        """Remove all the handlers of owner (or of a tenant if owner is None).
+        """
+
+        for tenants in self.subscribers.values():
+
+            for tid in list(tenants):
+
+                if tenant_id is not None and tid != tenant_id:
+                    continue
+
+                if owner is None:
+                    del tenants[tid]
+                    continue
+
+                tenants[tid].pop(owner, None)
+
+                if not tenants[tid]:
+                    del tenants[tid]
+
+    def subscribe_app(self, app):
+        """Subscribe the hooks overridden by an app."""
+
+        for event in EVENTS:
+            if overrides(app, event):
+                self.subscribe(event, app.tenant_id, getattr(app, event), app)
+
+    def unsubscribe_app(self, app):
+        """Remove all the hooks of an app."""
+
+        self.unsubscribe(app, app.tenant_id)
+
+    def publish(self, event, tenant_id, *args):
+        """Dispatch an event.
+
+        Args:
+            event: the event
+            tenant_id: the tenant the event is bound to (None for all)
+            args: the arguments passed to the handlers
+        """
+
+        tenants = self.subscribers[event]
+
+        if tenant_id is None:
+            groups = list(tenants.values())
+        elif tenant_id in tenants:
+            groups = [tenants[tenant_id]]
+        else:
+            groups = []
+
+        start = time.time()
+
+        for handlers in groups:
+            for handler in list(handlers.values()):
+                try:
+                    handler(*args)
+                except Exception as ex:
+                    self.log.exception(ex)
+
+        self.latency[event].add((time.time() - start) * 1000.0)
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {event: {'subscribers': sum([len(handlers) for handlers
+                                            in self.subscribers[event]
+                                            .values()]),
+                        'latency': self.latency[event].to_dict()}
+                for event in EVENTS}
+
+
+EVENT_BUS = EventBus()
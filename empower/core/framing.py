@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER framing layer."""
+
+import time
+import struct
+
+from tornado.ioloop import IOLoop
+
+# read size used by the connections when waiting for new data
+DEFAULT_CHUNK_SIZE = 65536
+
+# upper bound on the size of a single frame
+DEFAULT_MAX_FRAME_SIZE = 4 * 1024 * 1024
+
+# minimum interval (in seconds) between two rate updates
+RATE_INTERVAL = 1.0
+
+# IPv4 and TCP header bytes sent with every segment
+SEGMENT_OVERHEAD = 40
+
+
+class FrameBuffer:
+    """Zero-copy framing buffer.
+
+    Incoming chunks are appended to a single bytearray and every complete
+    frame currently in the buffer is returned, in one pass, as a memoryview
+    slice over that bytearray. The consumed bytes are removed from the buffer
+    only after all the complete frames have been processed.
+
+    Frames are delimited by a length field which must be located in the
+    fixed-size header and which must account for the entire frame (header
+    included).
+
+    Memoryviews returned by frames() are released as soon as the caller
+    moves to the next frame, handlers must then copy whatever they need to
+    keep.
+
+    Attributes:
+        hdr_size: the size of the fixed header
+        length_offset: the offset of the length field within the header
+        max_frame_size: frames longer than this are considered invalid
+        frames: the number of frames received
+        bytes: the number of bytes received
+        frames_per_second: the frames/sec received over the last interval
+        bytes_per_second: the bytes/sec received over the last interval
+    """
+
+    def __init__(self, hdr_size, length_offset, length_fmt="!I",
+                 max_frame_size=DEFAULT_MAX_FRAME_SIZE):
+
+        self.hdr_size = hdr_size
+        self.length_offset = length_offset
+        self.max_frame_size = max_frame_size
+        self.frames = 0
+        self.bytes = 0
+        self.frames_per_second = 0.0
+        self.bytes_per_second = 0.0
+
+        self.__length = struct.Struct(length_fmt)
+        self.__buffer = bytearray()
+        self.__last = time.time()
+        self.__last_frames = 0
+        self.__last_bytes = 0
+
+    def __len__(self):
+        return len(self.__buffer)
+
+    def feed(self, data):
+        """Append a chunk of data to the buffer."""
+
+        self.__buffer += data
+        self.bytes += len(data)
+
+    def split(self):
+        """Return every complete frame currently in the buffer.
+
+        This is a generator yielding a memoryview for each complete frame.
+        Once the generator is exhausted (or closed) the consumed bytes are
+        removed from the buffer while any trailing partial frame is kept.
+
+        Raises:
+            ValueError, if a frame with an invalid length is found
+        """
+
+        view = memoryview(self.__buffer)
+        frame = None
+        offset = 0
+
+        try:
+
+            while True:
+
+                available = len(view) - offset
+
+                if available < self.hdr_size:
+                    break
+
+                length = self.__length.unpack_from(view, offset +
+                                                   self.length_offset)[0]
+
+                if length < self.hdr_size or length > self.max_frame_size:
+                    raise ValueError("Invalid frame length %u" % length)
+
+                if available < length:
+                    break
+
+                frame = view[offset:offset + length]
+                offset += length
+                self.frames += 1
+
+                yield frame
+
+                frame.release()
+                frame = None
+
+        finally:
+
+            if frame is not None:
+                frame.release()
+
+            view.release()
+
+            if offset:
+                del self.__buffer[:offset]
+
+            self.__update_rates()
+
+    def __update_rates(self):
+        """Update the frames/sec and bytes/sec counters."""
+
+        now = time.time()
+        delta = now - self.__last
+
+        if delta < RATE_INTERVAL:
+            return
+
+        self.frames_per_second = (self.frames - self.__last_frames) / delta
+        self.bytes_per_second = (self.bytes - self.__last_bytes) / delta
+
+        self.__last = now
+        self.__last_frames = self.frames
+        self.__last_bytes = self.bytes
+
+    def to_dict(self):
+        """Return a JSON-serializable dictionary representing the buffer."""
+
+        return {'frames': self.frames,
+                'bytes': self.bytes,
+                'frames_per_second': self.frames_per_second,
+                'bytes_per_second': self.bytes_per_second,
+                'pending': len(self.__buffer)}
+
+
+class OutputBuffer:
+    """Corked output buffer.
+
+    Messages written to the buffer are collected and sent with a single
+    stream write at the next IOLoop iteration, so that all the messages
+    generated while handling the current events (e.g. the requests sent
+    after a caps response) leave in as few TCP segments as possible.
+    Latency-critical messages can be sent with flush=True, in which case
+    they are written right away together with any pending message.
+
+    Attributes:
+        stream: the stream the messages are written to
+        messages: the number of messages written
+        bytes: the number of bytes written
+        writes: the number of stream writes performed
+        flushes: the number of explicit flushes
+        saved: the number of stream writes (i.e. send syscalls and, with
+            nodelay, TCP segments) saved by coalescing
+        bytes_saved: the estimated IP and TCP header bytes saved
+    """
+
+    def __init__(self, stream):
+
+        self.stream = stream
+        self.messages = 0
+        self.bytes = 0
+        self.writes = 0
+        self.flushes = 0
+        self.saved = 0
+
+        self.__pending = []
+        self.__scheduled = False
+
+    def __len__(self):
+        return sum([len(data) for data in self.__pending])
+
+    @property
+    def bytes_saved(self):
+        """Return the estimated header bytes saved."""
+
+        return self.saved * SEGMENT_OVERHEAD
+
+    def write(self, data, flush=False):
+        """Queue a message, optionally flushing the buffer."""
+
+        self.__pending.append(data)
+        self.messages += 1
+        self.bytes += len(data)
+
+        if flush:
+            self.flushes += 1
+            self.flush()
+            return
+
+        if not self.__scheduled:
+            self.__scheduled = True
+            IOLoop.current().add_callback(self.__flush)
+
+    def __flush(self):
+        """Flush the buffer at the end of the IOLoop iteration."""
+
+        self.__scheduled = False
+        self.flush()
+
+    def flush(self):
+        """Write all the pending messages with a single stream write."""
+
+        if not self.__pending:
+            return
+
+        pending = self.__pending
+        self.__pending = []
+
+        data = pending[0] if len(pending) == 1 else b"".join(pending)
+
+        # messages queued on a closed stream are dropped
+        if self.stream.closed():
+            return
+
+        self.stream.write(data)
+        self.writes += 1
+        self.saved += len(pending) - 1
+
+    def to_dict(self):
+        """Return a JSON-serializable dictionary representing the buffer."""
+
+        return {'messages': self.messages,
+                'bytes': self.bytes,
+                'writes': self.writes,
+                'flushes': self.flushes,
+                'saved': self.saved,
+                'bytes_saved': self.bytes_saved,
+                'pending': len(self)}
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2018 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER histogram."""
+
+from bisect import bisect_left
+
+# default bucket upper bounds in ms
+DEFAULT_BOUNDS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                  1000, 2500, 5000, 10000)
+
+# percentiles reported by to_dict
+PERCENTILES = (50, 90, 99)
+
+
+class Histogram:
+    """A fixed-bucket histogram.
+
+    Values are counted in the first bucket whose upper bound is greater or
+    equal to the value, values above the last bound are counted in an extra
+    overflow bucket (reported with a None bound). Percentiles are estimated
+    as the upper bound of the bucket in which they fall.
+
+    Attributes:
+        bounds: the buckets upper bounds (sorted)
+        counts: the number of values in each bucket (plus overflow)
+        count: the number of values
+        total: the sum of the values
+        min: the minimum value
+        max: the maximum value
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Add a value to the histogram."""
+
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def avg(self):
+        """Return the average value."""
+
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct):
+        """Return the estimated pct-th percentile."""
+
+        if not self.count:
+            return None
+
+        rank = pct * self.count / 100.0
+        accum = 0
+
+        for bound, count in zip(self.bounds, self.counts):
+            accum += count
+            if accum >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        out = {'count': self.count,
+               'total': self.total,
+               'min': self.min,
+               'max': self.max,
+               'avg': self.avg,
+               'buckets': [{'le': bound, 'count': count} for bound, count
+                           in zip(self.bounds + (None,), self.counts)]}
+
+        for pct in PERCENTILES:
+            out['p%u' % pct] = self.percentile(pct)
+
+        return out
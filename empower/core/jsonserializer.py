@@ -15,7 +15,18 @@
 # specific language governing permissions and limitations
 # under the License.
 
-"""EmPOWER Runtime JSON Serializer."""
+"""EmPOWER Runtime JSON Serializer.
+
+Objects that are not natively supported by JSON are turned into serializable
+values by converters. A converter is a function taking the object and
+returning its JSON representation. Converters are registered per class with
+register_converter() and are resolved only once per class (the resolution
+follows the MRO and then falls back to to_dict(), isoformat() and iteration
+in this order), so that encoding an object costs a single dict lookup.
+
+dumps() uses the orjson backend when available and the standard library
+json module otherwise. Both backends produce the same layout.
+"""
 
 import json
 import uuid
@@ -29,6 +40,104 @@ import empower.datatypes.dpid
 import empower.datatypes.dscp
 import empower.datatypes.match
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# indentation of the non-compact documents (the only one orjson supports)
+INDENT = 2
+
+# converters explicitly registered, indexed by class
+CONVERTERS = {}
+
+# converters resolved for every class encountered so far
+_RESOLVED = {}
+
+
+def register_converter(cls, converter):
+    """Register a JSON converter for the specified class (and subclasses)."""
+
+    CONVERTERS[cls] = converter
+    _RESOLVED.clear()
+
+
+def _to_dict(obj):
+    return obj.to_dict()
+
+
+def _isoformat(obj):
+    return obj.isoformat()
+
+
+def _name(obj):
+    return obj.__name__
+
+
+def _item(obj):
+    return obj.item()
+
+
+def _tolist(obj):
+    return obj.tolist()
+
+
+def _resolve(cls):
+    """Find the converter for the specified class."""
+
+    for base in cls.__mro__:
+        if base in CONVERTERS:
+            return CONVERTERS[base]
+
+    if hasattr(cls, 'to_dict'):
+        return _to_dict
+
+    if hasattr(cls, 'isoformat'):
+        return _isoformat
+
+    if hasattr(cls, '__iter__'):
+        return list
+
+    return None
+
+
+def convert(obj):
+    """Return a JSON-serializable representation of obj."""
+
+    cls = obj.__class__
+    converter = _RESOLVED.get(cls)
+
+    if converter is None:
+        converter = _resolve(cls)
+        if converter is None:
+            raise TypeError("Object of type %s is not JSON serializable" %
+                            cls.__name__)
+        _RESOLVED[cls] = converter
+
+    return converter(obj)
+
+
+register_converter(types.FunctionType, _name)
+register_converter(types.MethodType, _name)
+register_converter(uuid.UUID, str)
+register_converter(ipaddress.IPv4Address, str)
+register_converter(empower.datatypes.dscp.DSCP, str)
+register_converter(empower.datatypes.ssid.SSID, str)
+register_converter(empower.datatypes.plmnid.PLMNID, str)
+register_converter(empower.datatypes.etheraddress.EtherAddress,
+                   empower.datatypes.etheraddress.EtherAddress.to_str)
+register_converter(empower.datatypes.dpid.DPID, str)
+register_converter(empower.datatypes.match.Match, str)
+
+if numpy is not None:
+    register_converter(numpy.generic, _item)
+    register_converter(numpy.ndarray, _tolist)
+
 
 class IterEncoder(json.JSONEncoder):
     """Encode iterable objects as lists."""
@@ -46,25 +155,35 @@ class EmpowerEncoder(IterEncoder):
 
     def default(self, obj):
 
-        if isinstance(obj, (types.FunctionType, types.MethodType)):
-            return obj.__name__
+        try:
+            return convert(obj)
+        except TypeError:
+            return super().default(obj)
+
+
+def dumps(value, compact=False):
+    """Serialize value as a JSON document (bytes).
+
+    In compact mode the document is neither indented nor sorted. Otherwise
+    keys are sorted and the document is indented by INDENT spaces.
+    """
 
-        instances = (uuid.UUID,
-                     ipaddress.IPv4Address,
-                     empower.datatypes.dscp.DSCP,
-                     empower.datatypes.ssid.SSID,
-                     empower.datatypes.plmnid.PLMNID,
-                     empower.datatypes.etheraddress.EtherAddress,
-                     empower.datatypes.dpid.DPID,
-                     empower.datatypes.match.Match)
+    if orjson:
 
-        if isinstance(obj, instances):
-            return str(obj)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if not compact:
+            option |= orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2
 
-        if hasattr(obj, 'to_dict'):
-            return obj.to_dict()
+        try:
+            return orjson.dumps(value, default=convert, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bits or unsortable keys
+            pass
 
-        if hasattr(obj, 'isoformat'):
-            return obj.isoformat()
+    if compact:
+        out = json.dumps(value, separators=(',', ':'), cls=EmpowerEncoder)
+    else:
+        out = json.dumps(value, sort_keys=True, indent=INDENT,
+                         cls=EmpowerEncoder)
 
-        return super().default(obj)
+    return out.encode()
@@ -277,8 +277,7 @@ class LVAP:
             self.pending.append(xid)
 
         # reset uplink and downlink
-        self._downlink = None
-        self._uplink = []
+        self._set_blocks(None, [])
 
     def commit(self):
         """Send add lvap message for downlink and uplinks blocks."""
@@ -471,7 +470,7 @@ class LVAP:
         self.pending.append(xid)
 
         # save block
-        self._downlink = dl_block
+        self._set_blocks(dl_block, self._uplink)
 
     def __assign_uplink(self, ul_blocks):
         """Set the downlink blocks."""
@@ -483,7 +482,22 @@ class LVAP:
             self.pending.append(xid)
 
             # save block into the list
-            self._uplink.append(block)
+            self._set_blocks(self._downlink, self._uplink + [block])
+
+    def _set_blocks(self, downlink, uplink):
+        """Set the blocks keeping the runtime indexes consistent.
+
+        No message is sent to the WTPs.
+        """
+
+        from empower.main import RUNTIME
+
+        RUNTIME.unindex_lvap(self)
+
+        self._downlink = downlink
+        self._uplink = uplink
+
+        RUNTIME.index_lvap(self)
 
     @property
     def wtp(self):
@@ -511,8 +525,7 @@ class LVAP:
         for block in self.blocks:
             block.radio.connection.send_del_lvap(self.addr)
 
-        self._downlink = None
-        self._uplink = []
+        self._set_blocks(None, [])
 
     def to_dict(self):
         """ Return a JSON-serializable dictionary representing the LVAP """
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER component manifests.
+
+A component is a sub-package whose __init__ file defines a dictionary named
+MANIFEST. The manifests are extracted from the source code without importing
+the components, which are imported only when launched.
+
+The manifests of a package are indexed the first time they are requested.
+The index is also saved in a cache file together with the modification time
+of the package directory and of every __init__ file, so that the following
+runs read the manifests from the cache unless a component has changed.
+"""
+
+import os
+import ast
+import copy
+import json
+import importlib
+import importlib.util
+
+import empower.logger
+
+# bump to invalidate the existing cache files
+CACHE_VERSION = 1
+
+
+def extract_manifest(filename):
+    """Return the MANIFEST defined in a file (or None).
+
+    Raises:
+        ValueError: if MANIFEST is not a literal
+    """
+
+    with open(filename, "rb") as source:
+        tree = ast.parse(source.read(), filename)
+
+    for node in tree.body:
+
+        if not isinstance(node, ast.Assign):
+            continue
+
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id == "MANIFEST":
+                return ast.literal_eval(node.value)
+
+    return None
+
+
+class ManifestIndex:
+    """Component manifest index.
+
+    Attributes:
+        path: the cache file (None disables the cache)
+        packages: the manifests indexed by package name and then by
+            component name
+    """
+
+    def __init__(self, path=None):
+
+        self.path = path
+        self.packages = {}
+        self.log = empower.logger.get_logger()
+
+        self.__cache = None
+
+    def get(self, *packages):
+        """Return a copy of the manifests defined in the packages."""
+
+        results = {}
+
+        for package in packages:
+
+            if package not in self.packages:
+                self.packages[package] = self.__index(package)
+
+            results.update(copy.deepcopy(self.packages[package]))
+
+        return results
+
+    def clear(self):
+        """Drop the index, manifests will be read again at the next get."""
+
+        self.packages = {}
+        self.__cache = None
+
+    def __index(self, package):
+        """Index the manifests of a package."""
+
+        spec = importlib.util.find_spec(package)
+        sources = {}
+
+        for path in spec.submodule_search_locations:
+
+            sources[path] = os.stat(path).st_mtime_ns
+
+            for entry in sorted(os.scandir(path), key=lambda e: e.name):
+
+                if not entry.is_dir() or not entry.name.isidentifier():
+                    continue
+
+                init = os.path.join(entry.path, "__init__.py")
+
+                if os.path.isfile(init):
+                    sources[init] = os.stat(init).st_mtime_ns
+
+        cache = self.__load()
+
+        if package in cache and cache[package]['sources'] == sources:
+            return cache[package]['manifests']
+
+        manifests = {}
+
+        for init in sources:
+
+            if not init.endswith("__init__.py"):
+                continue
+
+            name = os.path.basename(os.path.dirname(init))
+            manifest = self.__read(package + "." + name, init)
+
+            if manifest:
+                manifests[manifest['name']] = manifest
+
+        cache[package] = {'sources': sources, 'manifests': manifests}
+        self.__save()
+
+        return manifests
+
+    def __read(self, module_name, filename):
+        """Read the manifest of a component."""
+
+        try:
+            return extract_manifest(filename)
+        except (SyntaxError, ValueError):
+            self.log.warning("Non-literal MANIFEST in %s, importing %s",
+                             filename, module_name)
+
+        module = importlib.import_module(module_name)
+
+        return getattr(module, "MANIFEST", None)
+
+    def __load(self):
+        """Load the cache file."""
+
+        if self.__cache is not None:
+            return self.__cache
+
+        self.__cache = {}
+
+        if not self.path or not os.path.isfile(self.path):
+            return self.__cache
+
+        try:
+            with open(self.path) as cache:
+                data = json.load(cache)
+        except (OSError, ValueError) as ex:
+            self.log.warning("Unable to read %s: %s", self.path, ex)
+            return self.__cache
+
+        if data.get('version') == CACHE_VERSION:
+            self.__cache = data['packages']
+
+        return self.__cache
+
+    def __save(self):
+        """Save the cache file."""
+
+        if not self.path:
+            return
+
+        tmp = self.path + ".tmp"
+        data = {'version': CACHE_VERSION, 'packages': self.__cache}
+
+        try:
+            with open(tmp, "w") as cache:
+                json.dump(data, cache, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except (OSError, TypeError, ValueError) as ex:
+            self.log.warning("Unable to write %s: %s", self.path, ex)
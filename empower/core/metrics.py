@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER metrics.
+
+Instrumentation of the message dispatch path. When sampling is enabled
+every incoming message is counted (per message type and per PNFDev) and
+one message out of sampling (per message type) is timed: parse time,
+handler time (the built-in handler plus the handler chain), and the time
+spent in each handler of the chain. The cost of the periodic modules and
+the IOLoop callback lag are also measured.
+
+When sampling is disabled (the default) the dispatch path only checks
+METRICS.sampling. All the metrics are rendered in the Prometheus text
+exposition format by to_prometheus().
+"""
+
+from time import perf_counter
+
+from tornado.ioloop import IOLoop
+
+from empower.core.histogram import Histogram
+
+# messages timed (one every n per message type), 0 disables the metrics
+DEFAULT_SAMPLING = 0
+
+# interval (in ms) between two IOLoop lag measurements
+LOOP_INTERVAL = 100
+
+# histogram bounds (in ms) for message and handler times
+MESSAGE_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50,
+                  100, 250, 1000)
+
+
+class MessageStats:
+    """Per message type metrics.
+
+    Attributes:
+        messages: the number of messages received
+        handlers: the number of handlers invoked (for the timed messages)
+        sampled: the number of messages timed
+        parse: the parse time histogram (ms)
+        handle: the handler time histogram (ms)
+    """
+
+    def __init__(self):
+
+        self.messages = 0
+        self.handlers = 0
+        self.sampled = 0
+        self.parse = Histogram(MESSAGE_BOUNDS)
+        self.handle = Histogram(MESSAGE_BOUNDS)
+
+
+class PNFDevStats:
+    """Per PNFDev metrics.
+
+    Attributes:
+        messages: the number of messages received
+        sampled: the number of messages timed
+        seconds: the time spent parsing and handling the timed messages
+    """
+
+    def __init__(self):
+
+        self.messages = 0
+        self.sampled = 0
+        self.seconds = 0.0
+
+
+class LoopMonitor:
+    """IOLoop callback lag monitor.
+
+    Schedules a callback every interval ms and measures how late it runs.
+
+    Attributes:
+        interval: the interval between two measurements (ms)
+        lag: the lag histogram (ms)
+    """
+
+    def __init__(self, interval=LOOP_INTERVAL):
+
+        self.interval = interval
+        self.lag = Histogram()
+
+        self.__handle = None
+        self.__expected = None
+
+    def start(self):
+        """Start the monitor."""
+
+        if self.__handle:
+            return
+
+        self.__schedule()
+
+    def stop(self):
+        """Stop the monitor."""
+
+        if not self.__handle:
+            return
+
+        IOLoop.current().remove_timeout(self.__handle)
+        self.__handle = None
+
+    def __schedule(self):
+        """Schedule the next measurement."""
+
+        loop = IOLoop.current()
+        self.__expected = loop.time() + self.interval / 1000.0
+        self.__handle = loop.call_at(self.__expected, self.__run)
+
+    def __run(self):
+        """Measure the lag."""
+
+        self.lag.add(max(0.0, IOLoop.current().time() - self.__expected) *
+                     1000.0)
+        self.__schedule()
+
+
+class Metrics:
+    """Controller metrics.
+
+    Attributes:
+        sampling: one message out of sampling is timed (0 means disabled)
+        messages: MessageStats indexed by (protocol, message type)
+        pnfdevs: PNFDevStats indexed by (protocol, PNFDev address)
+        handlers: the handler time histograms (ms) indexed by handler
+        modules: the periodic modules run time histograms (ms) indexed by
+            module type
+        loop: the IOLoop lag monitor
+    """
+
+    def __init__(self, sampling=DEFAULT_SAMPLING):
+
+        self.sampling = 0
+        self.messages = {}
+        self.pnfdevs = {}
+        self.handlers = {}
+        self.modules = {}
+        self.loop = LoopMonitor()
+
+        self.set_sampling(sampling)
+
+    def set_sampling(self, sampling):
+        """Set the sampling rate (0 disables the metrics)."""
+
+        sampling = int(sampling)
+
+        if sampling < 0:
+            raise ValueError("Invalid sampling %d" % sampling)
+
+        self.sampling = sampling
+
+        if sampling:
+            self.loop.start()
+        else:
+            self.loop.stop()
+
+    def sample(self, protocol, msg_type):
+        """Count a message and return True if it must be timed."""
+
+        key = (protocol, msg_type)
+
+        if key not in self.messages:
+            self.messages[key] = MessageStats()
+
+        stats = self.messages[key]
+        stats.messages += 1
+
+        return stats.messages % self.sampling == 1 or self.sampling == 1
+
+    def record(self, protocol, msg_type, pnfdev, start=None, parsed=None,
+               fanout=0):
+        """Record a dispatched message.
+
+        Args:
+            protocol: the protocol (lvapp, vbsp, lvnfp)
+            msg_type: the message type
+            pnfdev: the PNFDev address
+            start: the perf_counter() value before parsing (timed messages)
+            parsed: the perf_counter() value after parsing (timed messages)
+            fanout: the number of handlers invoked
+        """
+
+        key = (protocol, pnfdev)
+
+        if key not in self.pnfdevs:
+            self.pnfdevs[key] = PNFDevStats()
+
+        stats = self.pnfdevs[key]
+        stats.messages += 1
+
+        if start is None:
+            return
+
+        end = perf_counter()
+
+        stats.sampled += 1
+        stats.seconds += end - start
+
+        stats = self.messages[(protocol, msg_type)]
+        stats.sampled += 1
+        stats.handlers += fanout
+        stats.parse.add((parsed - start) * 1000.0)
+        stats.handle.add((end - parsed) * 1000.0)
+
+    def dispatch(self, handler, handlers, *args):
+        """Invoke and time the built-in handler and the handler chain.
+
+        Args:
+            handler: the built-in handler (can be None)
+            handlers: the handler chain
+            args: the handlers arguments
+
+        Returns:
+            The number of handlers invoked.
+        """
+
+        fanout = 0
+
+        if handler:
+            self.call(handler, *args)
+            fanout += 1
+
+        for chained in handlers:
+            self.call(chained, *args)
+            fanout += 1
+
+        return fanout
+
+    def call(self, handler, *args):
+        """Invoke a handler of the chain and time it."""
+
+        start = perf_counter()
+
+        try:
+            return handler(*args)
+        finally:
+            self.__handler(handler).add((perf_counter() - start) * 1000.0)
+
+    def __handler(self, handler):
+        """Return the histogram of a handler.
+
+        Histograms are indexed by label only, handlers are often bound
+        methods and keeping them would keep their connections alive.
+        """
+
+        owner = getattr(handler, '__self__', None)
+        module = getattr(owner, 'module', None)
+
+        if module is not None and hasattr(module, 'MODULE_NAME'):
+            label = "module:%s" % module.MODULE_NAME
+        else:
+            label = getattr(handler, '__qualname__',
+                            type(handler).__qualname__)
+
+        if label not in self.handlers:
+            self.handlers[label] = Histogram(MESSAGE_BOUNDS)
+
+        return self.handlers[label]
+
+    def module(self, module_type, seconds):
+        """Record the run time of a periodic module."""
+
+        if module_type not in self.modules:
+            self.modules[module_type] = Histogram(MESSAGE_BOUNDS)
+
+        self.modules[module_type].add(seconds * 1000.0)
+
+    def to_prometheus(self, gauges=None, histograms=None):
+        """Render the metrics in the Prometheus text format.
+
+        Args:
+            gauges: additional gauges as a list of (name, help, samples)
+                tuples, where samples is a list of (labels, value) tuples
+            histograms: additional histograms (in ms), in the same format
+        """
+
+        out = []
+
+        def render(name, kind, text, samples):
+
+            out.append("# HELP %s %s" % (name, text))
+            out.append("# TYPE %s %s" % (name, kind))
+
+            for labels, value in samples:
+                if kind == "histogram":
+                    render_histogram(name, labels, value)
+                else:
+                    out.append("%s%s %s" % (name, format_labels(labels),
+                                            value))
+
+        def render_histogram(name, labels, histogram):
+
+            cumulative = 0
+
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                out.append("%s_bucket%s %u" %
+                           (name,
+                            format_labels(labels +
+                                          [("le", repr(bound / 1000.0))]),
+                            cumulative))
+
+            out.append("%s_bucket%s %u" %
+                       (name, format_labels(labels + [("le", "+Inf")]),
+                        histogram.count))
+            out.append("%s_sum%s %s" %
+                       (name, format_labels(labels),
+                        repr(histogram.total / 1000.0)))
+            out.append("%s_count%s %u" %
+                       (name, format_labels(labels), histogram.count))
+
+        messages = sorted(self.messages.items())
+        pnfdevs = sorted(self.pnfdevs.items(), key=lambda x: str(x[0]))
+
+        render("empower_metrics_sampling", "gauge",
+               "One message out of sampling is timed (0 is disabled).",
+               [([], self.sampling)])
+
+        render("empower_messages_total", "counter",
+               "Messages received.",
+               [(msg_labels(key), stats.messages)
+                for key, stats in messages])
+
+        render("empower_messages_sampled_total", "counter",
+               "Messages timed.",
+               [(msg_labels(key), stats.sampled)
+                for key, stats in messages])
+
+        render("empower_message_handlers_total", "counter",
+               "Handlers invoked by the timed messages (fan-out).",
+               [(msg_labels(key), stats.handlers)
+                for key, stats in messages])
+
+        render("empower_message_parse_seconds", "histogram",
+               "Message parse time.",
+               [(msg_labels(key), stats.parse) for key, stats in messages])
+
+        render("empower_message_handle_seconds", "histogram",
+               "Message handling time (all the handlers).",
+               [(msg_labels(key), stats.handle) for key, stats in messages])
+
+        render("empower_pnfdev_messages_total", "counter",
+               "Messages received per device.",
+               [(pnfdev_labels(key), stats.messages)
+                for key, stats in pnfdevs])
+
+        render("empower_pnfdev_messages_sampled_total", "counter",
+               "Messages timed per device.",
+               [(pnfdev_labels(key), stats.sampled)
+                for key, stats in pnfdevs])
+
+        render("empower_pnfdev_seconds_total", "counter",
+               "Time spent parsing and handling the timed messages.",
+               [(pnfdev_labels(key), repr(stats.seconds))
+                for key, stats in pnfdevs])
+
+        render("empower_handler_seconds", "histogram",
+               "Time spent in each handler of the chain.",
+               [([("handler", label)], histogram)
+                for label, histogram in sorted(self.handlers.items())])
+
+        render("empower_module_run_seconds", "histogram",
+               "Periodic modules run time.",
+               [([("module", module_type)], histogram)
+                for module_type, histogram in sorted(self.modules.items())])
+
+        render("empower_ioloop_lag_seconds", "histogram",
+               "IOLoop callback lag.",
+               [([], self.loop.lag)])
+
+        for name, text, samples in gauges or []:
+            render(name, "gauge", text, samples)
+
+        for name, text, samples in histograms or []:
+            render(name, "histogram", text, samples)
+
+        return "\n".join(out) + "\n"
+
+
+def format_labels(labels):
+    """Format a list of (name, value) labels."""
+
+    if not labels:
+        return ""
+
+    return "{%s}" % ",".join('%s="%s"' % (name, escape(value))
+                             for name, value in labels)
+
+
+def escape(value):
+    """Escape a label value."""
+
+    return str(value).replace("\\", "\\\\").replace('"', '\\"') \
+                     .replace("\n", "\\n")
+
+
+def msg_labels(key):
+    """Return the labels of a message type."""
+
+    return [("protocol", key[0]), ("type", key[1])]
+
+
+def pnfdev_labels(key):
+    """Return the labels of a PNFDev."""
+
+    return [("protocol", key[0]), ("pnfdev", key[1])]
+
+
+METRICS = Metrics()
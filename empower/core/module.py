@@ -18,48 +18,19 @@
 """EmPOWER Primitive Base Class."""
 
 import json
+import time
 import types
-import xmlrpc.client
-
-from multiprocessing.pool import ThreadPool
-
-import tornado.web
-import tornado.httpserver
-
-from tornado.ioloop import IOLoop
 
 import empower.logger
 
 from empower.core.jsonserializer import EmpowerEncoder
+from empower.core.timerwheel import PeriodicTimer
+from empower.core.callbacks import CALLBACKS
+from empower.core.metrics import METRICS
+from empower.core.timeseries import TIME_SERIES
 from empower.main import RUNTIME
 
 
-_WORKERS = ThreadPool(10)
-
-
-def exec_xmlrpc(callback, args=()):
-    """Execute XML-RPC call."""
-
-    proxy = xmlrpc.client.ServerProxy(callback[0])
-    func = getattr(proxy, callback[1])
-    run_background(func, on_complete, args)
-
-
-def run_background(func, callback, args=(), kwds=None):
-    """Run callback in background."""
-
-    def _callback(result):
-        IOLoop.instance().add_callback(lambda: callback(result))
-
-    _WORKERS.apply_async(func, args, kwds, _callback)
-
-
-def on_complete(_):
-    """XML RPC Callback."""
-
-    pass
-
-
 class Module:
     """Module object.
 
@@ -69,11 +40,16 @@ class Module:
         worker: the module worker responsible for reating new module instances.
         tenant_id: The tenant's Id for convenience (UUID)
         callback: Module callback (FunctionType)
+        series: The (entity, metric) keys of the time series created by
+            this module, removed when the module is removed
     """
 
     MODULE_NAME = None
     REQUIRED = ['module_type', 'worker', 'tenant_id']
 
+    # if true only the most recent pending remote callback is delivered
+    MERGE_CALLBACKS = False
+
     def __init__(self):
 
         self.__tenant_id = None
@@ -82,6 +58,7 @@ class Module:
         self.worker = None
         self.__callback = None
         self.__periodic = None
+        self.series = set()
         self.log = empower.logger.get_logger()
 
     def unload(self):
@@ -89,6 +66,17 @@ class Module:
 
         self.worker.remove_module(self.module_id)
 
+    def save_series(self, entity, metrics):
+        """Save the metrics of an entity in the time-series store."""
+
+        self.series.update(TIME_SERIES.add(self.tenant_id, entity, metrics))
+
+    def remove_series(self):
+        """Remove the time series created by this module."""
+
+        TIME_SERIES.remove_keys(self.tenant_id, self.series)
+        self.series.clear()
+
     def handle_callback(self, serializable):
         """Handle an module callback.
 
@@ -107,16 +95,15 @@ class Module:
 
         try:
 
-            as_dict = serializable.to_dict()
-            as_json = json.dumps(as_dict, cls=EmpowerEncoder)
-
             if isinstance(callback, (types.FunctionType, types.MethodType)):
 
                 callback(serializable)
 
             elif isinstance(callback, list) and len(callback) == 2:
 
-                exec_xmlrpc(callback, (as_json, ))
+                # serialized only when actually sent, see CALLBACKS
+                key = self.module_id if self.MERGE_CALLBACKS else None
+                CALLBACKS.deliver(callback, serializable, key)
 
             else:
 
@@ -241,7 +228,15 @@ class ModuleTrigger(Module):
 
 
 class ModulePeriodic(Module):
-    """Module Scheduled object."""
+    """Module Scheduled object.
+
+    Periodic modules can either implement run_once() or poll(). The latter
+    must return the request to be sent to the device as a (connection,
+    message) tuple and allows the worker to batch the requests of all the
+    modules sharing the same period (see ModuleBatch).
+    """
+
+    MERGE_CALLBACKS = True
 
     def __init__(self):
         super().__init__()
@@ -266,8 +261,11 @@ class ModulePeriodic(Module):
             self.run_once()
             return
 
-        self.__periodic = \
-            tornado.ioloop.PeriodicCallback(self.run_once, self.every)
+        if self.worker.batched:
+            self.worker.add_to_batch(self)
+            return
+
+        self.__periodic = PeriodicTimer(self.__tick, self.every)
         self.__periodic.start()
 
     def stop(self):
@@ -276,8 +274,47 @@ class ModulePeriodic(Module):
         if self.every == -1:
             return
 
+        if self.worker.batched:
+            self.worker.remove_from_batch(self)
+            return
+
         self.__periodic.stop()
 
+    def __tick(self):
+        """Run the periodic task, timing it if the metrics are enabled."""
+
+        if not METRICS.sampling:
+            self.run_once()
+            return
+
+        start = time.perf_counter()
+
+        try:
+            self.run_once()
+        finally:
+            METRICS.module(self.module_type, time.perf_counter() - start)
+
+    def poll(self):
+        """Return the periodic request.
+
+        Returns:
+            A (connection, message) tuple, where message is the encoded
+            request, or None if no request must be sent.
+        """
+
+        return None
+
+    def run_once(self):
+        """Period task."""
+
+        request = self.poll()
+
+        if not request:
+            return
+
+        connection, msg = request
+        connection.write(msg)
+
     def to_dict(self):
         """Return JSON-serializable representation of the object."""
 
@@ -299,6 +336,105 @@ class ModulePeriodic(Module):
         return False
 
 
+class ModuleBatch:
+    """Batched poller.
+
+    Polls all the periodic modules of a worker sharing the same period from
+    a single timer. At each tick the requests returned by the modules are
+    grouped by connection (i.e. by device) and sent with a single write per
+    connection. Responses are dispatched back to the modules by the worker
+    using the module id.
+
+    Attributes:
+        worker: the module worker owning this batch
+        every: the polling period in ms
+        modules: the modules polled by this batch
+        ticks: the number of ticks
+        requests: the number of requests sent
+        writes: the number of writes performed
+    """
+
+    def __init__(self, worker, every):
+
+        self.worker = worker
+        self.every = every
+        self.modules = {}
+        self.ticks = 0
+        self.requests = 0
+        self.writes = 0
+        self.log = empower.logger.get_logger()
+
+        self.__periodic = PeriodicTimer(self.tick, self.every)
+
+    def add(self, module):
+        """Add a module to the batch."""
+
+        self.modules[module.module_id] = module
+
+        if not self.__periodic.is_running():
+            self.__periodic.start()
+
+    def remove(self, module):
+        """Remove a module from the batch."""
+
+        if module.module_id in self.modules:
+            del self.modules[module.module_id]
+
+        if not self.modules:
+            self.__periodic.stop()
+
+    def tick(self):
+        """Poll all the modules and send out the requests."""
+
+        self.ticks += 1
+
+        batches = {}
+
+        # modules can unload themselves while polled, iterate over a copy
+        for module in list(self.modules.values()):
+
+            start = time.perf_counter() if METRICS.sampling else None
+
+            try:
+                request = module.poll()
+            except Exception as ex:
+                self.log.exception(ex)
+                continue
+            finally:
+                if start is not None:
+                    METRICS.module(module.module_type,
+                                   time.perf_counter() - start)
+
+            if not request:
+                continue
+
+            connection, msg = request
+
+            if connection not in batches:
+                batches[connection] = []
+
+            batches[connection].append(msg)
+
+        for connection, msgs in batches.items():
+
+            if connection.stream.closed():
+                continue
+
+            connection.write(b"".join(msgs))
+
+            self.requests += len(msgs)
+            self.writes += 1
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'every': self.every,
+                'modules': len(self.modules),
+                'ticks': self.ticks,
+                'requests': self.requests,
+                'writes': self.writes}
+
+
 class ModuleWorker:
     """Module worker.
 
@@ -306,13 +442,17 @@ class ModuleWorker:
 
     Attributes:
         modules: dictionary of modules currently active in this tenant
+        batched: if true periodic modules are polled in batches
+        batches: dictionary of ModuleBatch indexed by period
     """
 
-    def __init__(self, server, module, pt_type, pt_packet):
+    def __init__(self, server, module, pt_type, pt_packet, batched=False):
 
         self.__module_id = 0
         self.modules = {}
         self.module = module
+        self.batched = batched
+        self.batches = {}
 
         self.pt_type = pt_type
         self.pt_packet = pt_packet
@@ -408,9 +548,32 @@ class ModuleWorker:
                       module.module_id)
 
         module.stop()
+        module.remove_series()
 
         del self.modules[module_id]
 
+    def add_to_batch(self, module):
+        """Add a periodic module to the batch matching its period."""
+
+        if module.every not in self.batches:
+            self.batches[module.every] = ModuleBatch(self, module.every)
+
+        self.batches[module.every].add(module)
+
+    def remove_from_batch(self, module):
+        """Remove a periodic module from its batch."""
+
+        # the period might have changed since the module was started
+        for every, batch in list(self.batches.items()):
+
+            if module.module_id not in batch.modules:
+                continue
+
+            batch.remove(module)
+
+            if not batch.modules:
+                del self.batches[every]
+
     def handle_packet(self, pnfdev, message):
         """Handle response message."""
 
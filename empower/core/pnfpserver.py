@@ -17,19 +17,20 @@
 
 """PNF Protocol Server."""
 
-import json
-
 from uuid import UUID
 
 import empower.logger
 
 from empower.persistence import Session
+from empower.persistence import PERSISTENCE
+from empower.persistence.writebehind import insert
+from empower.persistence.writebehind import delete
 from empower.core.slice import Slice
+from empower.core.startup import STARTUP
+from empower.core.startup import SLICES
 from empower.datatypes.etheraddress import EtherAddress
 from empower.restserver.apihandlers import EmpowerAPIHandler
 from empower.restserver.apihandlers import EmpowerAPIHandlerUsers
-from empower.persistence.persistence import TblSlice
-from empower.persistence.persistence import TblSliceBelongs
 from empower.restserver.validate import validate
 
 from empower.main import RUNTIME
@@ -140,8 +141,13 @@ class PNFPServer:
     def __init__(self, port, pt_types, pt_types_handlers):
 
         self.port = port
-        self.__load_pnfdevs()
-        self.__load_slices()
+
+        with STARTUP.phase("load %s" % self.PNFDEV.ALIAS):
+            self.__load_pnfdevs()
+
+        with STARTUP.phase("load %s slices" % self.PNFDEV.ALIAS):
+            self.__load_slices()
+
         self.log = empower.logger.get_logger()
         self.pt_types = pt_types
         self.pt_types_handlers = pt_types_handlers
@@ -149,53 +155,45 @@ class PNFPServer:
     def __load_slices(self):
         """Load Slices."""
 
-        slices = Session().query(TblSlice).all()
+        for record in SLICES.load():
 
-        for slc in slices:
+            tenant = RUNTIME.tenants[record.tenant_id]
 
-            tenant = RUNTIME.tenants[slc.tenant_id]
-
-            desc = {'dscp': slc.dscp,
+            desc = {'dscp': record.dscp,
                     'wtps': {},
                     'vbses': {},
-                    'wifi': json.loads(slc.wifi),
-                    'lte': json.loads(slc.lte)}
-
-            if slc.dscp not in tenant.slices:
-                tenant.slices[slc.dscp] = Slice(slc.dscp, tenant, desc)
+                    'wifi': record.wifi,
+                    'lte': record.lte}
 
-            t_slice = tenant.slices[slc.dscp]
+            if record.dscp not in tenant.slices:
+                tenant.slices[record.dscp] = \
+                    Slice(record.dscp, tenant, desc)
 
-            belongs = \
-                Session().query(TblSliceBelongs) \
-                         .filter(TblSliceBelongs.dscp == slc.dscp) \
-                         .filter(TblSliceBelongs.tenant_id == slc.tenant_id) \
-                         .all()
+            t_slice = tenant.slices[record.dscp]
 
-            for belong in belongs:
+            for addr, properties in record.belongs.items():
 
-                if belong.addr not in self.pnfdevs:
+                if addr not in self.pnfdevs:
                     continue
 
-                pnfdev = self.pnfdevs[belong.addr]
+                pnfdev = self.pnfdevs[addr]
                 pnfdevs = None
 
                 if pnfdev.ALIAS == "vbses":
                     pnfdevs = t_slice.lte[pnfdev.ALIAS]
 
                     if pnfdev.addr not in pnfdevs:
-                        pnfdevs[belong.addr] = {'static-properties': {},
-                                                'cells': {}}
+                        pnfdevs[addr] = {'static-properties': {},
+                                         'cells': {}}
 
                 else:
                     pnfdevs = t_slice.wifi[pnfdev.ALIAS]
 
                     if pnfdev.addr not in pnfdevs:
-                        pnfdevs[belong.addr] = {'static-properties': {},
-                                                'blocks': {}}
+                        pnfdevs[addr] = {'static-properties': {},
+                                         'blocks': {}}
 
-                pnfdevs[belong.addr]['static-properties'] = \
-                        json.loads(belong.properties)
+                pnfdevs[addr]['static-properties'] = properties
 
     @property
     def pnfdevs(self):
@@ -230,10 +228,9 @@ class PNFPServer:
             raise KeyError(addr)
 
         self.pnfdevs[addr] = self.PNFDEV(addr, label)
+        RUNTIME.generation += 1
 
-        session = Session()
-        session.add(self.TBL_PNFDEV(addr=addr, label=label))
-        session.commit()
+        PERSISTENCE.submit(insert(self.TBL_PNFDEV, addr=addr, label=label))
 
         return self.pnfdevs[addr]
 
@@ -243,17 +240,10 @@ class PNFPServer:
         if addr not in self.pnfdevs:
             raise KeyError(addr)
 
-        pnfdev = self.pnfdevs[addr]
-
         del self.pnfdevs[addr]
+        RUNTIME.generation += 1
 
-        pnfdev = Session().query(self.TBL_PNFDEV) \
-            .filter(self.TBL_PNFDEV.addr == addr) \
-            .first()
-
-        session = Session()
-        session.delete(pnfdev)
-        session.commit()
+        PERSISTENCE.submit(delete(self.TBL_PNFDEV, addr=addr))
 
     def register_message(self, pt_type, parser, handler):
         """ Register new handler. This will be called after the default. """
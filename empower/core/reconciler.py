@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER state reconciliation.
+
+When a PNFDev (re)connects the controller asks the device for the objects
+(VAPs, slices, ...) it is currently running. A Reconciler collects the
+status replies for a given time window and then invokes a callback which
+compares the desired runtime state against the reported one, pushing only
+the missing or changed objects instead of the whole configuration.
+
+The protocols have no end-of-status marker, so the window is closed by a
+timeout. Devices with no state at all then simply get the full
+configuration once the timeout expires.
+"""
+
+from empower.core.timerwheel import OneShotTimer
+
+# time (in ms) the status replies are waited for
+DEFAULT_TIMEOUT = 500
+
+
+class Reconciler:
+    """Reconcile the state of a device.
+
+    Attributes:
+        callback: the function invoked when the status window expires
+        timeout: the duration of the status window (ms)
+        reported: the reported objects indexed by key
+        runs: the number of reconciliations completed
+        sent: the number of objects pushed to the device
+        unchanged: the number of objects already in the desired state
+    """
+
+    def __init__(self, callback, timeout=DEFAULT_TIMEOUT):
+
+        self.callback = callback
+        self.timeout = timeout
+        self.reported = {}
+        self.runs = 0
+        self.sent = 0
+        self.unchanged = 0
+
+        self.__timer = OneShotTimer(self.__expire, timeout)
+
+    def start(self):
+        """Open the status window, dropping the previous reported state."""
+
+        self.stop()
+
+        self.reported = {}
+        self.__timer.start()
+
+    def stop(self):
+        """Close the status window without reconciling."""
+
+        self.__timer.stop()
+
+    def is_pending(self):
+        """Return True if the status window is open."""
+
+        return self.__timer.is_running()
+
+    def report(self, key, value):
+        """Record an object reported by the device."""
+
+        self.reported[key] = value
+
+    def outdated(self, key, value):
+        """Return True if the object must be pushed to the device.
+
+        An object must be pushed if the device did not report it or if the
+        reported value differs from the desired one.
+        """
+
+        if self.reported.get(key) == value:
+            self.unchanged += 1
+            return False
+
+        self.sent += 1
+        return True
+
+    def __expire(self):
+        """Close the status window and reconcile."""
+
+        self.runs += 1
+        self.callback()
+
+    def to_dict(self):
+        """Return a JSON-serializable dictionary representing the object."""
+
+        return {'timeout': self.timeout,
+                'pending': self.is_pending(),
+                'reported': len(self.reported),
+                'runs': self.runs,
+                'sent': self.sent,
+                'unchanged': self.unchanged}
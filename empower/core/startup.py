@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER startup helpers.
+
+StartupReport measures the duration of each startup phase (runtime
+defaults, component imports, component launches, ...). The report is
+logged once all the components have been launched.
+
+SliceLoader fetches the slices and their memberships with a single joined
+query and parses the JSON descriptors once. The result is shared by all the
+PNFP servers (LVAPP, VBSP, LVNFP) launched at startup, each server taking
+the memberships of its own PNFDevs. The loader is cleared at the end of the
+startup so that servers launched later read the current slices.
+"""
+
+import json
+import time
+
+from contextlib import contextmanager
+
+from sqlalchemy import and_
+
+import empower.logger
+
+from empower.persistence import Session
+from empower.persistence.persistence import TblSlice
+from empower.persistence.persistence import TblSliceBelongs
+
+
+class StartupReport:
+    """Startup phases timing.
+
+    Attributes:
+        phases: list of (name, depth, seconds) tuples in start order
+        started: the perf_counter() value at creation
+        total: the startup duration (set by done)
+    """
+
+    def __init__(self):
+
+        self.phases = []
+        self.started = time.perf_counter()
+        self.total = None
+        self.log = empower.logger.get_logger()
+
+        self.__depth = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Time a startup phase (phases can be nested)."""
+
+        entry = [name, self.__depth, None]
+        self.phases.append(entry)
+
+        self.__depth += 1
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            entry[2] = time.perf_counter() - start
+            self.__depth -= 1
+
+    def done(self):
+        """Mark the end of the startup and log the report."""
+
+        self.total = time.perf_counter() - self.started
+
+        self.log.info("Startup completed in %.1fms", 1000.0 * self.total)
+
+        for name, depth, seconds in self.phases:
+            self.log.info("  %-60s %10.1fms", "  " * depth + name,
+                          1000.0 * (seconds or 0.0))
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'total': self.total,
+                'phases': [{'name': name, 'depth': depth, 'seconds': seconds}
+                           for name, depth, seconds in self.phases]}
+
+
+class SliceRecord:
+    """A slice as stored in the database.
+
+    Attributes:
+        tenant_id: the tenant id
+        dscp: the slice DSCP
+        wifi: the parsed wifi descriptor
+        lte: the parsed lte descriptor
+        belongs: the parsed static properties indexed by PNFDev address
+    """
+
+    def __init__(self, tenant_id, dscp, wifi, lte):
+
+        self.tenant_id = tenant_id
+        self.dscp = dscp
+        self.wifi = wifi
+        self.lte = lte
+        self.belongs = {}
+
+
+class SliceLoader:
+    """Shared slice loader.
+
+    Attributes:
+        slices: the SliceRecords, None until loaded
+    """
+
+    def __init__(self):
+
+        self.slices = None
+
+    def load(self):
+        """Return the slices, querying the database the first time."""
+
+        if self.slices is not None:
+            return self.slices
+
+        with STARTUP.phase("slices query"):
+
+            # only the membership columns are selected, the DSCP type does
+            # not accept the NULLs of slices without members
+            query = Session().query(TblSlice,
+                                    TblSliceBelongs.addr,
+                                    TblSliceBelongs.properties) \
+                .outerjoin(TblSliceBelongs,
+                           and_(TblSliceBelongs.dscp == TblSlice.dscp,
+                                TblSliceBelongs.tenant_id ==
+                                TblSlice.tenant_id))
+
+            slices = {}
+
+            for slc, addr, properties in query.all():
+
+                key = (slc.tenant_id, slc.dscp)
+
+                if key not in slices:
+                    slices[key] = SliceRecord(slc.tenant_id,
+                                              slc.dscp,
+                                              json.loads(slc.wifi),
+                                              json.loads(slc.lte))
+
+                if addr:
+                    slices[key].belongs[addr] = json.loads(properties)
+
+            self.slices = list(slices.values())
+
+        return self.slices
+
+    def clear(self):
+        """Drop the loaded slices."""
+
+        self.slices = None
+
+
+STARTUP = StartupReport()
+SLICES = SliceLoader()
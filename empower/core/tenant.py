@@ -25,10 +25,14 @@ from empower.persistence.persistence import TblSlice
 from empower.persistence.persistence import TblSliceBelongs
 from empower.persistence.persistence import TblTrafficRule
 from empower.core.slice import Slice
-from empower.persistence import Session
+from empower.persistence import PERSISTENCE
+from empower.persistence.writebehind import insert
+from empower.persistence.writebehind import upsert
+from empower.persistence.writebehind import delete
 from empower.core.utils import get_module
 from empower.datatypes.etheraddress import EtherAddress
 from empower.core.trafficrule import TrafficRule
+from empower.core.trafficrule import TrafficRuleTable
 from empower.vbsp import EP_OPERATION_SET
 from empower.vbsp import EP_OPERATION_ADD
 
@@ -36,6 +40,12 @@ T_TYPE_SHARED = "shared"
 T_TYPE_UNIQUE = "unique"
 T_TYPES = [T_TYPE_SHARED, T_TYPE_UNIQUE]
 
+# the tenant part of a bssid (the multicast bit is always cleared)
+BSSID_TENANT_MASK = 0xFEFFFF000000
+
+# the station (or block) part of a bssid
+BSSID_STATION_MASK = 0x000000FFFFFF
+
 
 class Tenant:
     """Tenant object representing a network slice.
@@ -84,6 +94,8 @@ class Tenant:
         self.vaps = {}
         self.slices = {}
         self.components = {}
+        self.traffic_rules = TrafficRuleTable()
+        self.__prefix = None
 
     @property
     def wtps(self):
@@ -126,20 +138,24 @@ class Tenant:
     def get_prefix(self):
         """Return tenant prefix."""
 
-        tokens = [self.tenant_id.hex[0:12][i:i + 2] for i in range(0, 12, 2)]
-        return EtherAddress(':'.join(tokens))
+        if self.__prefix is None:
+            self.__prefix = EtherAddress(self.tenant_id.bytes[0:6])
+
+        return self.__prefix
+
+    @property
+    def bssid_base(self):
+        """Return the tenant part of the bssids generated by this tenant."""
+
+        return self.get_prefix().to_int() & BSSID_TENANT_MASK
 
     def generate_bssid(self, mac):
         """ Generate a new BSSID address. """
 
-        base_mac = self.get_prefix()
-
-        base = str(base_mac).split(":")[0:3]
-        unicast_addr_mask = int(base[0], 16) & 0xFE
-        base[0] = str(format(unicast_addr_mask, 'X'))
-        suffix = str(mac).split(":")[3:6]
+        value = self.bssid_base | \
+            (EtherAddress(mac).to_int() & BSSID_STATION_MASK)
 
-        return EtherAddress(":".join(base + suffix))
+        return EtherAddress(value.to_bytes(6, 'big'))
 
     def add_endpoint(self, endpoint_id, endpoint_name, datapath, ports):
         """Add Endpoint."""
@@ -177,25 +193,6 @@ class Tenant:
         endpoint.ports.clear()
         del self.endpoints[endpoint_id]
 
-    @property
-    def traffic_rules(self):
-        """Fetch traffic rule queues in this tenant."""
-
-        trs = \
-            Session().query(TblTrafficRule) \
-                     .filter(TblTrafficRule.tenant_id == self.tenant_id) \
-                     .all()
-
-        results = {}
-
-        for rule in trs:
-            results[rule.match] = {'match': rule.match,
-                                   'label': rule.label,
-                                   'priority': rule.priority,
-                                   'dscp': rule.dscp}
-
-        return results
-
     def add_traffic_rule(self, match, dscp, label, priority=0):
         """Add a new traffic rule to the Tenant.
 
@@ -210,6 +207,9 @@ class Tenant:
             Nones
         """
 
+        if match in self.traffic_rules:
+            raise ValueError("Duplicate (%s, %s)" % (self.tenant_id, match))
+
         trule = TrafficRule(tenant=self,
                             match=match,
                             dscp=dscp,
@@ -222,16 +222,11 @@ class Tenant:
         if ibnp_server:
             ibnp_server.add_traffic_rule(trule)
 
-        rule = TblTrafficRule(tenant_id=self.tenant_id, match=match,
-                              dscp=dscp, priority=priority, label=label)
+        self.traffic_rules.add(match, dscp, label, priority)
 
-        try:
-            session = Session()
-            session.add(rule)
-            session.commit()
-        except IntegrityError:
-            session.rollback()
-            raise ValueError("Duplicate (%s, %s)" % (self.tenant_id, match))
+        PERSISTENCE.submit(insert(TblTrafficRule, tenant_id=self.tenant_id,
+                                  match=match, dscp=dscp, priority=priority,
+                                  label=label))
 
     def del_traffic_rule(self, match):
         """Delete a traffic rule from this tenant.
@@ -246,12 +241,8 @@ class Tenant:
             None
         """
 
-        rule = Session().query(TblTrafficRule) \
-                        .filter(TblTrafficRule.tenant_id == self.tenant_id,
-                                TblTrafficRule.match == match) \
-                        .first()
-        if not rule:
-            raise KeyError(rule)
+        if match not in self.traffic_rules:
+            raise KeyError(str(match))
 
         # Send command to IBN
         from empower.ibnp.ibnpserver import IBNPServer
@@ -259,9 +250,26 @@ class Tenant:
         if ibnp_server:
             ibnp_server.del_traffic_rule(self.tenant_id, match)
 
-        session = Session()
-        session.delete(rule)
-        session.commit()
+        self.traffic_rules.remove(match)
+
+        PERSISTENCE.submit(delete(TblTrafficRule, tenant_id=self.tenant_id,
+                                  match=match))
+
+    def __belongs_ops(self, slc, operation):
+        """Return the operations storing the slice's WTPs and VBSes."""
+
+        ops = []
+
+        for pnfdevs in (slc.wifi['wtps'], slc.lte['vbses']):
+            for addr, pnfdev in pnfdevs.items():
+                properties = json.dumps(pnfdev['static-properties'])
+                ops.append(operation(TblSliceBelongs,
+                                     tenant_id=self.tenant_id,
+                                     dscp=slc.dscp,
+                                     addr=addr,
+                                     properties=properties))
+
+        return ops
 
     def add_slice(self, dscp, request):
         """Add a new slice to the Tenant.
@@ -277,49 +285,24 @@ class Tenant:
             ValueError, if the dscp is not valid
         """
 
+        if dscp in self.slices:
+            raise ValueError("Slice %s exists" % dscp)
+
         # create new instance
         slc = Slice(dscp, self, request)
 
         # descriptors has been parsed, now it is safe to write to the db
-        try:
-
-            session = Session()
-
-            tbl_slc = TblSlice(tenant_id=self.tenant_id,
-                               dscp=slc.dscp,
-                               wifi=json.dumps(slc.wifi['static-properties']),
-                               lte=json.dumps(slc.lte['static-properties']))
-
-            session.add(tbl_slc)
-
-            for wtp_addr in slc.wifi['wtps']:
-
-                properties = \
-                    json.dumps(slc.wifi['wtps'][wtp_addr]['static-properties'])
-
-                belongs = TblSliceBelongs(tenant_id=self.tenant_id,
-                                          dscp=tbl_slc.dscp,
-                                          addr=wtp_addr,
-                                          properties=properties)
-
-                session.add(belongs)
-
-            for vbs_addr in slc.lte['vbses']:
-
-                properties = \
-                    json.dumps(slc.lte['vbses'][vbs_addr]['static-properties'])
-
-                belongs = TblSliceBelongs(tenant_id=self.tenant_id,
-                                          dscp=tbl_slc.dscp,
-                                          addr=vbs_addr,
-                                          properties=properties)
+        ops = [insert(TblSlice,
+                      tenant_id=self.tenant_id,
+                      dscp=slc.dscp,
+                      wifi=json.dumps(slc.wifi['static-properties']),
+                      lte=json.dumps(slc.lte['static-properties']))]
 
-                session.add(belongs)
-
-            session.commit()
+        ops += self.__belongs_ops(slc, insert)
 
+        try:
+            PERSISTENCE.submit(*ops)
         except IntegrityError:
-            session.rollback()
             raise ValueError()
 
         # store slice
@@ -362,75 +345,19 @@ class Tenant:
 
         # create new instance
         slc = Slice(dscp, self, request)
-        tenant_id = self.tenant_id
 
         # update db
-        try:
-
-            session = Session()
-
-            tbl_slice = Session().query(TblSlice) \
-                                 .filter(TblSlice.tenant_id == tenant_id) \
-                                 .filter(TblSlice.dscp == slc.dscp) \
-                                 .first()
-
-            tbl_slice.wifi = json.dumps(slc.wifi['static-properties'])
-            tbl_slice.lte = json.dumps(slc.lte['static-properties'])
-
-            for wtp_addr in slc.wifi['wtps']:
-
-                properties = \
-                    json.dumps(slc.wifi['wtps'][wtp_addr]['static-properties'])
-
-                tbl_belongs = \
-                    Session().query(TblSliceBelongs) \
-                             .filter(TblSliceBelongs.tenant_id == tenant_id) \
-                             .filter(TblSliceBelongs.dscp == slc.dscp) \
-                             .filter(TblSliceBelongs.addr == wtp_addr) \
-                             .first()
-
-                if not tbl_belongs:
-
-                    belongs = TblSliceBelongs(tenant_id=self.tenant_id,
-                                              dscp=slc.dscp,
-                                              addr=wtp_addr,
-                                              properties=properties)
-
-                    session.add(belongs)
-
-                else:
-
-                    tbl_belongs.properties = properties
-
-            for vbs_addr in slc.lte['vbses']:
-
-                properties = \
-                    json.dumps(slc.lte['vbses'][vbs_addr]['static-properties'])
-
-                tbl_belongs = \
-                    Session().query(TblSliceBelongs) \
-                             .filter(TblSliceBelongs.tenant_id == tenant_id) \
-                             .filter(TblSliceBelongs.dscp == slc.dscp) \
-                             .filter(TblSliceBelongs.addr == vbs_addr) \
-                             .first()
+        ops = [upsert(TblSlice,
+                      tenant_id=self.tenant_id,
+                      dscp=slc.dscp,
+                      wifi=json.dumps(slc.wifi['static-properties']),
+                      lte=json.dumps(slc.lte['static-properties']))]
 
-                if not tbl_belongs:
-
-                    belongs = TblSliceBelongs(tenant_id=self.tenant_id,
-                                              dscp=slc.dscp,
-                                              addr=vbs_addr,
-                                              properties=properties)
-
-                    session.add(belongs)
-
-                else:
-
-                    tbl_belongs.properties = properties
-
-            session.commit()
+        ops += self.__belongs_ops(slc, upsert)
 
+        try:
+            PERSISTENCE.submit(*ops)
         except IntegrityError:
-            session.rollback()
             raise ValueError()
 
         # store slice
@@ -470,48 +397,17 @@ class Tenant:
 
         # fetch slice
         slc = self.slices[dscp]
-        tenant_id = self.tenant_id
 
         # delete it from the db
-        try:
-
-            session = Session()
-
-            rem = Session().query(TblSlice) \
-                           .filter(TblSlice.tenant_id == self.tenant_id) \
-                           .filter(TblSlice.dscp == dscp) \
-                           .first()
+        ops = [delete(TblSlice, tenant_id=self.tenant_id, dscp=slc.dscp)]
 
-            session.delete(rem)
-
-            for wtp_addr in slc.wifi['wtps']:
-
-                rem = \
-                    Session().query(TblSliceBelongs) \
-                             .filter(TblSliceBelongs.tenant_id == tenant_id) \
-                             .filter(TblSliceBelongs.dscp == slc.dscp) \
-                             .filter(TblSliceBelongs.addr == wtp_addr) \
-                             .first()
-
-                if rem:
-                    session.delete(rem)
-
-            for vbs_addr in slc.lte['vbses']:
-
-                rem = \
-                    Session().query(TblSliceBelongs) \
-                             .filter(TblSliceBelongs.tenant_id == tenant_id) \
-                             .filter(TblSliceBelongs.dscp == slc.dscp) \
-                             .filter(TblSliceBelongs.addr == vbs_addr) \
-                             .first()
-
-                if rem:
-                    session.delete(rem)
-
-            session.commit()
+        for addr in list(slc.wifi['wtps']) + list(slc.lte['vbses']):
+            ops.append(delete(TblSliceBelongs, tenant_id=self.tenant_id,
+                              dscp=slc.dscp, addr=addr))
 
+        try:
+            PERSISTENCE.submit(*ops)
         except IntegrityError:
-            session.rollback()
             raise ValueError()
 
         # delete it from the WTPs
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER timer wheel.
+
+All the periodic tasks of the controller (modules, apps, heartbeats, ...)
+are scheduled on a single hierarchical timer wheel driven by one IOLoop
+callback, instead of each of them having its own PeriodicCallback. One-shot
+timers (e.g. timeouts) are scheduled on the same wheel.
+
+Timers sharing the same period are coalesced into groups, each group being
+a single entry in the wheel. Unless jitter is disabled, timers are spread
+over a limited number of phases within their period so that the load is
+distributed over the period while still being coalesced.
+
+At each tick at most budget seconds are spent running callbacks, but at
+least one callback is run. Callbacks that do not fit in the budget are
+deferred to the following ticks.
+"""
+
+import time
+import random
+
+from collections import deque
+
+from tornado.ioloop import IOLoop
+from tornado.ioloop import PeriodicCallback
+
+import empower.logger
+
+# duration of a tick in ms
+DEFAULT_RESOLUTION = 10
+
+# time (in seconds) that can be spent running callbacks in a single tick
+DEFAULT_BUDGET = 0.05
+
+# number of slots per level (must be a power of two)
+WHEEL_SIZE = 256
+
+# number of levels (10ms * 256^4 is more than a year)
+WHEEL_LEVELS = 4
+
+# number of phases timers with the same period are spread over
+PHASE_SLOTS = 16
+
+WHEEL_BITS = WHEEL_SIZE.bit_length() - 1
+WHEEL_MASK = WHEEL_SIZE - 1
+
+
+class PeriodicTimer:
+    """A periodic timer.
+
+    Drop-in replacement for tornado.ioloop.PeriodicCallback scheduling the
+    callback on a TimerWheel.
+
+    Attributes:
+        callback: the function to be called
+        callback_time: the period in ms
+        jitter: if true the timer phase is randomly spread over the period
+        wheel: the timer wheel (default TIMER_WHEEL)
+    """
+
+    # if true the timer is stopped before its first run
+    ONESHOT = False
+
+    def __init__(self, callback, callback_time, jitter=True, wheel=None):
+
+        if callback_time <= 0:
+            raise ValueError("callback_time must be positive")
+
+        self.callback = callback
+        self.callback_time = callback_time
+        self.jitter = jitter
+        self.wheel = wheel if wheel is not None else TIMER_WHEEL
+
+        self._running = False
+        self._pending = False
+        self._group = None
+
+    def start(self):
+        """Start the timer."""
+
+        if self._running:
+            return
+
+        self.wheel.add(self)
+
+    def stop(self):
+        """Stop the timer."""
+
+        if not self._running:
+            return
+
+        self.wheel.remove(self)
+
+    def is_running(self):
+        """Return True if the timer has been started."""
+
+        return self._running
+
+
+class OneShotTimer(PeriodicTimer):
+    """A one-shot timer.
+
+    The callback is run once, callback_time ms after the timer is started
+    (with the resolution of the wheel). The timer can be started again.
+    """
+
+    ONESHOT = True
+
+    def __init__(self, callback, callback_time, wheel=None):
+
+        super().__init__(callback, callback_time, False, wheel)
+
+
+class TimerGroup:
+    """A set of timers sharing the same period and phase.
+
+    Attributes:
+        period: the period in ticks
+        phase: the phase in ticks
+        expiry: the next expiry (tick)
+        timers: the timers in this group (insertion ordered)
+    """
+
+    def __init__(self, period, phase):
+
+        self.period = period
+        self.phase = phase
+        self.expiry = None
+        self.timers = {}
+
+
+class PeriodStats:
+    """Per-period metrics.
+
+    Attributes:
+        timers: number of active timers
+        runs: number of callbacks run
+        deferred: number of callbacks deferred to a later tick
+        skipped: number of runs skipped because the previous was pending
+        lag_last: lag of the last run (ms)
+        lag_max: maximum lag (ms)
+        lag_avg: average lag (ms)
+    """
+
+    def __init__(self):
+
+        self.timers = 0
+        self.runs = 0
+        self.deferred = 0
+        self.skipped = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_sum = 0.0
+
+    @property
+    def lag_avg(self):
+        """Return the average lag."""
+
+        return self.lag_sum / self.runs if self.runs else 0.0
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'timers': self.timers,
+                'runs': self.runs,
+                'deferred': self.deferred,
+                'skipped': self.skipped,
+                'lag_last': self.lag_last,
+                'lag_max': self.lag_max,
+                'lag_avg': self.lag_avg}
+
+
+class TimerWheel:
+    """Hierarchical timer wheel.
+
+    The wheel has WHEEL_LEVELS levels of WHEEL_SIZE slots. Slots at level
+    zero last one tick, slots at level n last WHEEL_SIZE^n ticks. Entries
+    are cascaded to the lower levels as the wheel turns.
+
+    Attributes:
+        resolution: the duration of a tick in ms
+        budget: the time (s) that can be spent running callbacks per tick
+        now: the current tick
+        groups: the timer groups indexed by (period, phase)
+        stats: the PeriodStats indexed by period (ms)
+        ticks: the number of ticks processed
+        overruns: the number of ticks in which the budget was exceeded
+    """
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION, budget=DEFAULT_BUDGET):
+
+        self.resolution = resolution
+        self.budget = budget
+        self.now = 0
+        self.groups = {}
+        self.stats = {}
+        self.ticks = 0
+        self.overruns = 0
+        self.log = empower.logger.get_logger()
+
+        self.__levels = [[[] for _ in range(WHEEL_SIZE)]
+                         for _ in range(WHEEL_LEVELS)]
+        self.__pending = deque()
+        self.__origin = None
+        self.__driver = None
+
+    def __len__(self):
+        return sum([len(group.timers) for group in self.groups.values()])
+
+    def __time(self):
+        """Return the current IOLoop time."""
+
+        return IOLoop.current().time()
+
+    def __tick_time(self, tick):
+        """Return the IOLoop time at which tick is due."""
+
+        return self.__origin + tick * self.resolution / 1000.0
+
+    def add(self, timer):
+        """Schedule a timer."""
+
+        period = max(1, int(round(timer.callback_time / self.resolution)))
+
+        if period >= WHEEL_SIZE ** WHEEL_LEVELS:
+            raise ValueError("Period %u beyond the wheel horizon" %
+                             timer.callback_time)
+
+        if timer.ONESHOT:
+            # the group expires one period from now
+            phase = self.now % period
+        elif timer.jitter:
+            slots = min(PHASE_SLOTS, period)
+            phase = random.randrange(slots) * period // slots
+        else:
+            phase = 0
+
+        key = (period, phase)
+
+        if key not in self.groups:
+
+            group = TimerGroup(period, phase)
+
+            # first tick after now aligned to the group's period and phase
+            group.expiry = self.now + 1 + \
+                (phase - self.now - 1) % period
+
+            self.groups[key] = group
+            self.__insert(group)
+
+        group = self.groups[key]
+        group.timers[timer] = None
+
+        timer._group = group
+        timer._running = True
+
+        self.__stats(timer).timers += 1
+
+        self.__start()
+
+    def remove(self, timer):
+        """Remove a timer."""
+
+        timer._running = False
+
+        group = timer._group
+        timer._group = None
+
+        if not group or timer not in group.timers:
+            return
+
+        del group.timers[timer]
+
+        self.__stats(timer).timers -= 1
+
+        # empty groups are dropped the next time they expire
+        if not group.timers and \
+           self.groups.get((group.period, group.phase)) is group:
+            del self.groups[(group.period, group.phase)]
+
+    def __stats(self, timer):
+        """Return the stats for the timer's period."""
+
+        if timer.callback_time not in self.stats:
+            self.stats[timer.callback_time] = PeriodStats()
+
+        return self.stats[timer.callback_time]
+
+    def __start(self):
+        """Start the driver if not running."""
+
+        if self.__driver:
+            return
+
+        # anchor the wheel to the current time keeping the current tick
+        self.__origin = self.__time() - self.now * self.resolution / 1000.0
+
+        self.__driver = PeriodicCallback(self.__drive, self.resolution)
+        self.__driver.start()
+
+    def __stop(self):
+        """Stop the driver."""
+
+        if not self.__driver:
+            return
+
+        self.__driver.stop()
+        self.__driver = None
+
+    def __insert(self, group):
+        """Insert a group in the wheel according to its expiry."""
+
+        delta = max(group.expiry - self.now, 0)
+
+        for level in range(WHEEL_LEVELS):
+            if delta < WHEEL_SIZE << (WHEEL_BITS * level):
+                break
+
+        shift = WHEEL_BITS * level
+        slot = (group.expiry >> shift) & WHEEL_MASK
+
+        self.__levels[level][slot].append(group)
+
+    def __cascade(self):
+        """Move the entries of the upper levels down after a turn."""
+
+        for level in range(1, WHEEL_LEVELS):
+
+            shift = WHEEL_BITS * level
+            slot = (self.now >> shift) & WHEEL_MASK
+
+            groups = self.__levels[level][slot]
+            self.__levels[level][slot] = []
+
+            for group in groups:
+                self.__insert(group)
+
+            # stop unless this level has wrapped too
+            if slot:
+                break
+
+    def __drive(self):
+        """Advance the wheel up to the current time."""
+
+        target = int((self.__time() - self.__origin) * 1000.0 /
+                     self.resolution)
+
+        while self.now < target:
+            self.now += 1
+            if not self.now & WHEEL_MASK:
+                self.__cascade()
+            self.__expire()
+
+        self.__run()
+
+        if not self.groups and not self.__pending:
+            self.__stop()
+
+    def __expire(self):
+        """Queue the timers of the groups expiring in the current tick."""
+
+        slot = self.now & WHEEL_MASK
+        groups = self.__levels[0][slot]
+        self.__levels[0][slot] = []
+
+        for group in groups:
+
+            if group.expiry != self.now:
+                self.__insert(group)
+                continue
+
+            if not group.timers:
+                continue
+
+            for timer in group.timers:
+
+                if timer._pending:
+                    self.__stats(timer).skipped += 1
+                    continue
+
+                timer._pending = True
+                self.__pending.append((timer, self.now))
+
+            group.expiry += group.period
+            self.__insert(group)
+
+    def __run(self):
+        """Run the pending callbacks within the budget."""
+
+        self.ticks += 1
+
+        if not self.__pending:
+            return
+
+        start = time.time()
+        ran = False
+
+        while self.__pending:
+
+            # at least one callback runs per tick
+            if ran and time.time() - start > self.budget:
+
+                self.overruns += 1
+
+                for timer, _ in self.__pending:
+                    self.__stats(timer).deferred += 1
+
+                return
+
+            timer, tick = self.__pending.popleft()
+            timer._pending = False
+
+            if not timer._running:
+                continue
+
+            if timer.ONESHOT:
+                self.remove(timer)
+
+            stats = self.__stats(timer)
+            lag = (self.__time() - self.__tick_time(tick)) * 1000.0
+
+            stats.runs += 1
+            stats.lag_last = lag
+            stats.lag_sum += lag
+            stats.lag_max = max(stats.lag_max, lag)
+
+            try:
+                timer.callback()
+            except Exception as ex:
+                self.log.exception(ex)
+
+            ran = True
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'resolution': self.resolution,
+                'budget': self.budget,
+                'now': self.now,
+                'ticks': self.ticks,
+                'overruns': self.overruns,
+                'timers': len(self),
+                'groups': len(self.groups),
+                'pending': len(self.__pending),
+                'periods': {period: stats.to_dict()
+                            for period, stats in self.stats.items()}}
+
+
+TIMER_WHEEL = TimerWheel()
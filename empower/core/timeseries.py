@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER time-series store.
+
+The statistics reported by the modules are saved in a shared in-memory
+store. Every (tenant, entity, metric) tuple is a series made of three
+fixed-capacity ring buffers (tiers):
+
+  raw: every sample as reported by the module
+  10s: one row per 10 seconds bucket (avg, min, max, count)
+  1m: one row per 1 minute bucket (avg, min, max, count)
+
+Downsampled buckets are written when the first sample of the following
+bucket is received, i.e. only closed buckets are returned by queries.
+
+Ring buffers are columnar NumPy arrays. If NumPy is not available plain
+Python arrays are used instead. Ring buffers grow geometrically up to their
+capacity, so short-lived series only take a few hundred bytes.
+
+Entities are named after the object the series refers to. Composite
+entities are given as tuples and their names are the items joined by '/'
+from the most generic to the most specific one, e.g. a slice on a block is
+(hwaddr, channel, band, dscp). Removing an entity removes the series of its
+sub-entities as well (e.g. removing a UE removes its per-cell series).
+"""
+
+import time
+
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TIER_RAW = "raw"
+TIER_10S = "10s"
+TIER_1M = "1m"
+
+# bucket duration (s) and capacity (rows) of each tier
+TIERS = {TIER_RAW: (0, 1024),
+         TIER_10S: (10, 360),
+         TIER_1M: (60, 1440)}
+
+# columns of the downsampled tiers
+COLUMNS = ('avg', 'min', 'max', 'count')
+
+AGGREGATES = ('avg', 'min', 'max', 'sum', 'count', 'last')
+
+# initial number of rows allocated by a ring buffer
+INITIAL_ROWS = 16
+
+# maximum number of series per tenant
+MAX_SERIES = 4096
+
+
+def entity_name(entity):
+    """Return the name of an entity (tuples are joined by '/')."""
+
+    if isinstance(entity, tuple):
+        return "/".join(str(item) for item in entity)
+
+    return str(entity)
+
+
+def entity_root(name):
+    """Return the root of an entity name (e.g. the UE of a UE/cell)."""
+
+    return name.split("/", 1)[0]
+
+
+class RingBuffer:
+    """A fixed-capacity columnar ring buffer.
+
+    Rows are allocated on demand, doubling the allocation until the
+    capacity is reached.
+
+    Attributes:
+        capacity: the maximum number of rows
+        columns: the names of the value columns
+    """
+
+    def __init__(self, capacity, columns=('value',)):
+
+        self.capacity = capacity
+        self.columns = columns
+
+        self.__ts = None
+        self.__values = None
+        self.__head = 0
+        self.__size = 0
+
+        self.__allocate(min(INITIAL_ROWS, capacity))
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def last(self):
+        """Return the timestamp of the most recent row (or None)."""
+
+        if not self.__size:
+            return None
+
+        return float(self.__ts[self.__head - 1])
+
+    def __allocate(self, rows):
+        """Resize the columns to rows (the buffer must not have wrapped)."""
+
+        size = self.__size
+
+        if numpy is not None:
+            tss = numpy.zeros(rows, dtype=numpy.float64)
+            values = numpy.zeros((rows, len(self.columns)),
+                                 dtype=numpy.float64)
+            if size:
+                tss[:size] = self.__ts[:size]
+                values[:size] = self.__values[:size]
+        else:
+            tss = array('d', bytes(8 * rows))
+            values = [array('d', bytes(8 * rows)) for _ in self.columns]
+            if size:
+                tss[:size] = self.__ts[:size]
+                for column, old in zip(values, self.__values):
+                    column[:size] = old[:size]
+
+        self.__ts = tss
+        self.__values = values
+
+    def append(self, timestamp, *values):
+        """Add a row, overwriting the oldest one if full."""
+
+        head = self.__head
+
+        if head == len(self.__ts) and head < self.capacity:
+            self.__allocate(min(2 * head, self.capacity))
+
+        self.__ts[head] = timestamp
+
+        if numpy is not None:
+            self.__values[head] = values
+        else:
+            for column, value in zip(self.__values, values):
+                column[head] = value
+
+        self.__head = (head + 1) % self.capacity
+        self.__size = min(self.__size + 1, self.capacity)
+
+    def __ordered(self, data):
+        """Return data from the oldest to the newest row."""
+
+        if self.__size < self.capacity:
+            return data[:self.__size]
+
+        if numpy is not None:
+            return numpy.concatenate((data[self.__head:],
+                                      data[:self.__head]))
+
+        return data[self.__head:] + data[:self.__head]
+
+    def range(self, start=None, end=None):
+        """Return the rows with start <= timestamp <= end.
+
+        Rows are returned as a tuple (timestamps, columns) where columns
+        is a list with one sequence of values per column.
+        """
+
+        tss = self.__ordered(self.__ts)
+
+        if numpy is not None:
+            values = self.__ordered(self.__values)
+            first = 0 if start is None else \
+                int(numpy.searchsorted(tss, start, 'left'))
+            last = len(tss) if end is None else \
+                int(numpy.searchsorted(tss, end, 'right'))
+            return tss[first:last], list(values[first:last].T)
+
+        values = [self.__ordered(column) for column in self.__values]
+        first = 0 if start is None else bisect_left(tss, start)
+        last = len(tss) if end is None else bisect_right(tss, end)
+
+        return tss[first:last], [column[first:last] for column in values]
+
+
+class Bucket:
+    """A downsampling bucket being filled.
+
+    Attributes:
+        start: the bucket start time
+        total: the sum of the samples
+        count: the number of samples
+        min: the minimum sample
+        max: the maximum sample
+    """
+
+    def __init__(self, start, value):
+
+        self.start = start
+        self.total = value
+        self.count = 1
+        self.min = value
+        self.max = value
+
+    def add(self, value):
+        """Add a sample to the bucket."""
+
+        self.total += value
+        self.count += 1
+
+        if value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+
+    def row(self):
+        """Return the bucket as a (avg, min, max, count) row."""
+
+        return (self.total / self.count, self.min, self.max, self.count)
+
+
+class Series:
+    """A time series.
+
+    Attributes:
+        tiers: the ring buffers indexed by tier name
+        buckets: the buckets being filled indexed by tier name
+    """
+
+    def __init__(self):
+
+        self.tiers = {}
+        self.buckets = {}
+
+        for tier, (period, capacity) in TIERS.items():
+            columns = COLUMNS if period else ('value',)
+            self.tiers[tier] = RingBuffer(capacity, columns)
+
+    def __len__(self):
+        return len(self.tiers[TIER_RAW])
+
+    def add(self, timestamp, value):
+        """Add a sample to the series."""
+
+        value = float(value)
+
+        self.tiers[TIER_RAW].append(timestamp, value)
+
+        for tier, (period, _) in TIERS.items():
+
+            if not period:
+                continue
+
+            start = timestamp - timestamp % period
+            bucket = self.buckets.get(tier)
+
+            if bucket and bucket.start == start:
+                bucket.add(value)
+                continue
+
+            if bucket:
+                self.tiers[tier].append(bucket.start, *bucket.row())
+
+            self.buckets[tier] = Bucket(start, value)
+
+    def query(self, start=None, end=None, tier=TIER_RAW, agg=None):
+        """Return the samples in the range.
+
+        If agg is None the samples are returned, otherwise the samples are
+        aggregated and a single value is returned (None if empty).
+        """
+
+        if tier not in self.tiers:
+            raise ValueError("Invalid tier %s" % tier)
+
+        if agg is not None and agg not in AGGREGATES:
+            raise ValueError("Invalid aggregate %s" % agg)
+
+        ring = self.tiers[tier]
+        tss, values = ring.range(start, end)
+
+        if agg is not None:
+            return aggregate(values, agg) if len(tss) else None
+
+        out = {'tier': tier, 'timestamps': [float(x) for x in tss]}
+
+        for column, data in zip(ring.columns, values):
+            out[column] = [float(x) for x in data]
+
+        if 'count' in out:
+            out['count'] = [int(x) for x in out['count']]
+
+        return out
+
+
+def aggregate(values, agg):
+    """Aggregate the columns returned by a RingBuffer range query."""
+
+    if len(values) == 1:
+        data = values[0]
+        counts = None
+    else:
+        data, mins, maxs, counts = values
+
+    if agg == 'last':
+        return float(data[-1])
+
+    if agg == 'count':
+        return int(sum(counts)) if counts is not None else len(data)
+
+    if agg == 'min':
+        return float(min(data if counts is None else mins))
+
+    if agg == 'max':
+        return float(max(data if counts is None else maxs))
+
+    if counts is None:
+        total = float(sum(data))
+        count = len(data)
+    else:
+        total = float(sum([x * y for x, y in zip(data, counts)]))
+        count = int(sum(counts))
+
+    if agg == 'sum':
+        return total
+
+    return total / count
+
+
+class TimeSeriesStore:
+    """The time-series store.
+
+    Attributes:
+        series: the series indexed by tenant_id and then (entity, metric)
+        roots: the (entity, metric) keys indexed by tenant_id and then by
+            root entity, so that removing an entity only touches its series
+        max_series: the maximum number of series per tenant
+        dropped: the number of samples dropped because a tenant had too
+            many series
+    """
+
+    def __init__(self, max_series=MAX_SERIES):
+
+        self.series = {}
+        self.roots = {}
+        self.max_series = max_series
+        self.dropped = 0
+
+    def add(self, tenant_id, entity, metrics, timestamp=None):
+        """Add a sample for each of the metrics of an entity.
+
+        Args:
+            tenant_id: the tenant id
+            entity: the entity (e.g. an LVAP address or a tuple)
+            metrics: a dictionary mapping metric names to values
+            timestamp: the sample time (default now)
+
+        Returns:
+            The list of the (entity, metric) keys of the series created.
+        """
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        if tenant_id not in self.series:
+            self.series[tenant_id] = {}
+            self.roots[tenant_id] = {}
+
+        tenant = self.series[tenant_id]
+        entity = entity_name(entity)
+        created = []
+
+        for metric, value in metrics.items():
+
+            if value is None:
+                continue
+
+            key = (entity, metric)
+
+            if key not in tenant:
+
+                if len(tenant) >= self.max_series:
+                    self.dropped += 1
+                    continue
+
+                tenant[key] = Series()
+                created.append(key)
+
+            tenant[key].add(timestamp, value)
+
+        if created:
+            self.roots[tenant_id].setdefault(entity_root(entity),
+                                             set()).update(created)
+
+        return created
+
+    def remove(self, tenant_id, entity=None):
+        """Remove the series of a tenant or of one of its entities.
+
+        The series of the sub-entities of entity are removed as well. If
+        tenant_id is None the entity is removed from every tenant.
+        """
+
+        if entity is None:
+            self.series.pop(tenant_id, None)
+            self.roots.pop(tenant_id, None)
+            return
+
+        entity = entity_name(entity)
+        root = entity_root(entity)
+        prefix = entity + "/"
+
+        if tenant_id is None:
+            tenant_ids = [key for key, roots in self.roots.items()
+                          if root in roots]
+        else:
+            tenant_ids = [tenant_id]
+
+        for tenant_id in tenant_ids:
+
+            keys = self.roots.get(tenant_id, {}).get(root)
+
+            if not keys:
+                continue
+
+            if entity != root:
+                keys = [key for key in keys
+                        if key[0] == entity or key[0].startswith(prefix)]
+
+            self.remove_keys(tenant_id, list(keys))
+
+    def remove_keys(self, tenant_id, keys):
+        """Remove the series of a tenant matching the (entity, metric) keys."""
+
+        tenant = self.series.get(tenant_id, {})
+        roots = self.roots.get(tenant_id, {})
+
+        for key in keys:
+
+            if tenant.pop(key, None) is None:
+                continue
+
+            root = entity_root(key[0])
+            roots[root].discard(key)
+
+            if not roots[root]:
+                del roots[root]
+
+    def query(self, tenant_id, entity=None, metric=None, start=None,
+              end=None, tier=TIER_RAW, agg=None):
+        """Query the series of a tenant.
+
+        Returns a list with one entry per series matching entity and metric
+        (both optional) containing the samples in the [start, end] range or
+        their aggregate.
+        """
+
+        if tier not in TIERS:
+            raise ValueError("Invalid tier %s" % tier)
+
+        if agg is not None and agg not in AGGREGATES:
+            raise ValueError("Invalid aggregate %s" % agg)
+
+        out = []
+
+        for (ent, met), series in self.series.get(tenant_id, {}).items():
+
+            if entity is not None and ent != entity_name(entity):
+                continue
+
+            if metric is not None and met != metric:
+                continue
+
+            result = series.query(start, end, tier, agg)
+
+            if agg is None:
+                out.append(dict(result, entity=ent, metric=met))
+            else:
+                out.append({'entity': ent, 'metric': met, 'tier': tier,
+                            'agg': agg, 'value': result})
+
+        return out
+
+    def to_dict(self, tenant_id):
+        """Return a JSON-serializable list of the series of a tenant."""
+
+        return [{'entity': entity,
+                 'metric': metric,
+                 'samples': len(series),
+                 'last': series.tiers[TIER_RAW].last}
+                for (entity, metric), series
+                in self.series.get(tenant_id, {}).items()]
+
+
+TIME_SERIES = TimeSeriesStore()
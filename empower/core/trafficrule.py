@@ -51,3 +51,95 @@ class TrafficRule:
 
         return "%s-%s -> %s (priority %d)" % \
             (self.tenant.tenant_id, self.dscp, self.match, self.priority)
+
+
+class TrafficRuleTable:
+    """The traffic rules of a tenant.
+
+    Rules are kept in memory as dictionaries (match, dscp, label and
+    priority) indexed by match and by priority. The table behaves as a
+    read-only dictionary indexed by match.
+
+    Attributes:
+        by_priority: the rules indexed by priority and then by match
+    """
+
+    def __init__(self):
+
+        self.by_priority = {}
+        self.__rules = {}
+
+    def add(self, match, dscp, label, priority=0):
+        """Add a rule, replacing the existing one with the same match."""
+
+        if match in self.__rules:
+            self.remove(match)
+
+        rule = {'match': match,
+                'dscp': dscp,
+                'label': label,
+                'priority': int(priority)}
+
+        self.__rules[match] = rule
+
+        if rule['priority'] not in self.by_priority:
+            self.by_priority[rule['priority']] = {}
+
+        self.by_priority[rule['priority']][match] = rule
+
+        return rule
+
+    def remove(self, match):
+        """Remove the rule with the specified match."""
+
+        rule = self.__rules.pop(match)
+        rules = self.by_priority[rule['priority']]
+
+        del rules[match]
+
+        if not rules:
+            del self.by_priority[rule['priority']]
+
+        return rule
+
+    def matches(self, priority):
+        """Return the matches of the rules with the specified priority."""
+
+        return list(self.by_priority.get(int(priority), ()))
+
+    def __getitem__(self, match):
+        return self.__rules[match]
+
+    def __contains__(self, match):
+        return match in self.__rules
+
+    def __iter__(self):
+        return iter(self.__rules)
+
+    def __len__(self):
+        return len(self.__rules)
+
+    def get(self, match, default=None):
+        """Return the rule with the specified match or default."""
+
+        return self.__rules.get(match, default)
+
+    def keys(self):
+        """Return the matches."""
+
+        return self.__rules.keys()
+
+    def values(self):
+        """Return the rules."""
+
+        return self.__rules.values()
+
+    def items(self):
+        """Return the (match, rule) pairs."""
+
+        return self.__rules.items()
+
+    def to_dict(self):
+        """Return a json-frinedly representation of the object."""
+
+        return {str(k): v for k, v in self.__rules.items()}
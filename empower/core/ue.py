@@ -59,7 +59,7 @@ class UE:
         self.tenant = tenant
 
         # set on different situations, e.g. after an handover
-        self.rnti = rnti
+        self._rnti = rnti
 
         # imsi
         self.imsi = imsi
@@ -103,8 +103,7 @@ class UE:
         if opcode == 1:
 
             # set new cell and rnti
-            self._cell = target_vbs.cells[target_pci]
-            self.rnti = target_rnti
+            self.__move(target_vbs.cells[target_pci], target_rnti)
 
             # set state to running
             self._state = PROCESS_RUNNING
@@ -115,14 +114,37 @@ class UE:
         if origin_vbs == target_vbs:
 
             # reset new cell and rnti
-            self._cell = origin_vbs.cells[target_pci]
-            self.rnti = origin_rnti
+            self.__move(origin_vbs.cells[target_pci], origin_rnti)
 
             # set state to running
             self._state = PROCESS_RUNNING
 
             return
 
+    def __move(self, cell, rnti):
+        """Set cell and rnti keeping the runtime indexes consistent."""
+
+        from empower.main import RUNTIME
+
+        RUNTIME.unindex_ue(self)
+
+        self._cell = cell
+        self._rnti = rnti
+
+        RUNTIME.index_ue(self)
+
+    @property
+    def rnti(self):
+        """Get the rnti."""
+
+        return self._rnti
+
+    @rnti.setter
+    def rnti(self, rnti):
+        """Set the rnti."""
+
+        self.__move(self._cell, rnti)
+
     def is_running(self):
         """Check if the UE is running."""
 
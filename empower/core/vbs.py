@@ -47,4 +47,7 @@ class VBS(BasePNFDev):
 
         out = super().to_dict()
         out['cells'] = self.cells
+        out['output'] = self.connection.output if self.connection else None
+        out['reconciler'] = \
+            self.connection.reconciler if self.connection else None
         return out
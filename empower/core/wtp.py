@@ -50,6 +50,10 @@ class WTP(BasePNFDev):
 
         out = super().to_dict()
         out['supports'] = self.supports
+        out['framing'] = self.connection.framer if self.connection else None
+        out['output'] = self.connection.output if self.connection else None
+        out['reconciler'] = \
+            self.connection.reconciler if self.connection else None
         return out
 
     def blocks(self):
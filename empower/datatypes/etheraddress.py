@@ -17,50 +17,92 @@
 
 """EmPOWER EtherAddress Class."""
 
+# maximum number of entries in the intern table
+INTERN_MAXSIZE = 65536
+
+_INTERN = {}
+
 
 class EtherAddress:
-    """An Ethernet (MAC) address type."""
+    """An Ethernet (MAC) address type.
+
+    EtherAddress objects are immutable and interned: building an address
+    from the same raw bytes (or the same string) returns the same object as
+    long as the address is in the intern table. The table is bounded to
+    INTERN_MAXSIZE entries and it is flushed when full. Since addresses are
+    compared by value, this only affects memory usage.
+
+    The integer and string forms of the address are cached, the former
+    is used for hashing and ordering.
+    """
 
-    def __init__(self, addr="00:00:00:00:00:00"):
+    __slots__ = ('_value', '_int', '_str')
+
+    def __new__(cls, addr="00:00:00:00:00:00"):
         """
         Understands Ethernet address is various forms. Hex strings, raw bytes
         strings, etc.
         """
+
+        if isinstance(addr, EtherAddress):
+            return addr
+
+        try:
+            obj = _INTERN.get(addr)
+        except TypeError:
+            obj = None
+
+        if obj is not None:
+            return obj
+
         # Always stores as a 6 character string
         if isinstance(addr, bytes) and len(addr) == 6:
             # raw
-            self._value = addr
+            value = addr
         elif isinstance(addr, str):
-            if len(addr) == 17 or addr.count(':') == 5:
-                # hex
-                if len(addr) == 17:
-                    if addr[2::3] != ':::::' and addr[2::3] != '-----':
-                        raise RuntimeError("Bad format for ethernet address")
-                    # Address of form xx:xx:xx:xx:xx:xx
-                    # Pick out the hex digits only
-                    addr = ''.join(
-                        (addr[x * 3:x * 3 + 2] for x in range(0, 6)))
-                else:
-                    # Assume it's hex digits but they may not all be in
-                    # two-digit groupings (e.g., xx:x:x:xx:x:x). This actually
-                    # comes up.
-                    addr = ''.join(["%02x" % (int(x, 16),)
-                                    for x in addr.split(":")])
-
-                # We should now have 12 hex digits (xxxxxxxxxxxx).
-                # Convert to 6 raw bytes.
-                addr = b''.join(bytes((int(addr[x * 2:x * 2 + 2], 16),))
-                                for x in range(0, 6))
-            else:
-                raise ValueError("Expected 6 raw bytes or some hex")
-            self._value = addr
-        elif isinstance(addr, EtherAddress):
-            self._value = addr.to_raw()
+            # the raw form might be already interned
+            value = cls.__parse(addr)
+            obj = _INTERN.get(value)
         elif addr is None:
-            self._value = b'\x00' * 6
+            value = b'\x00' * 6
+            obj = _INTERN.get(value)
         else:
             raise ValueError("EtherAddress must be a string of 6 raw bytes")
 
+        if len(_INTERN) >= INTERN_MAXSIZE:
+            _INTERN.clear()
+
+        if obj is None:
+            obj = object.__new__(cls)
+            obj._value = value
+            obj._int = int.from_bytes(value, 'big')
+            obj._str = None
+            _INTERN[value] = obj
+
+        if addr is not None:
+            _INTERN[addr] = obj
+
+        return obj
+
+    @classmethod
+    def __parse(cls, addr):
+        """Parse an address in hex form."""
+
+        if len(addr) == 17:
+            sep = addr[2]
+            if sep not in ':-' or addr[2::3] != sep * 5:
+                raise RuntimeError("Bad format for ethernet address")
+            # Address of form xx:xx:xx:xx:xx:xx
+            return bytes.fromhex(addr.replace(sep, ''))
+
+        if addr.count(':') == 5:
+            # Assume it's hex digits but they may not all be in
+            # two-digit groupings (e.g., xx:x:x:xx:x:x). This actually
+            # comes up.
+            return bytes(int(x, 16) for x in addr.split(':'))
+
+        raise ValueError("Expected 6 raw bytes or some hex")
+
     def is_global(self):
         """
         Returns True if this is a globally unique (OUI enforced) address.
@@ -90,21 +132,27 @@ class EtherAddress:
         Returns a 6-entry long tuple where each entry is the numeric value
         of the corresponding byte of the address.
         """
-        return tuple((x for x in self._value))
+        return tuple(self._value)
 
     def to_str(self, separator=':'):
         """
         Returns the address as string consisting of 12 hex chars separated
         by separator.
         """
-        return separator.join(('%02x' % (x,) for x in self._value)).upper()
+
+        if separator != ':':
+            return self._value.hex(separator).upper()
+
+        if self._str is None:
+            self._str = self._value.hex(':').upper()
+
+        return self._str
 
     def to_int(self, separator=':'):
         """
-        Returns the address as string consisting of 12 hex chars separated
-        by separator.
+        Returns the address as an integer.
         """
-        return int(self.to_str().replace(separator, ""), 16)
+        return self._int
 
     def match(self, other):
         """ Bitwise match. """
@@ -118,39 +166,68 @@ class EtherAddress:
                 other = EtherAddress(other).to_raw()
             except RuntimeError:
                 return False
-        for cnt in range(0, 6):
-            if (self._value[cnt] & other[cnt]) != self._value[cnt]:
-                return False
-        return True
+
+        value = self._int
+        return value & int.from_bytes(other, 'big') == value
 
     def __str__(self):
         return self.to_str()
 
     def __eq__(self, other):
 
-        if isinstance(other, EtherAddress):
-            other = other.to_raw()
-        elif isinstance(other, bytes):
-            pass
-        else:
-            try:
-                other = EtherAddress(other).to_raw()
-            except RuntimeError:
-                return False
-        if self._value == other:
+        if self is other:
             return True
-        return False
+
+        if isinstance(other, EtherAddress):
+            return self._int == other._int
+
+        if isinstance(other, bytes):
+            return self._value == other
+
+        try:
+            other = EtherAddress(other)
+        except RuntimeError:
+            return False
+
+        return self._int == other._int
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        if isinstance(other, EtherAddress):
+            return self._int < other._int
+        return NotImplemented
+
+    def __le__(self, other):
+        if isinstance(other, EtherAddress):
+            return self._int <= other._int
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, EtherAddress):
+            return self._int > other._int
+        return NotImplemented
+
+    def __ge__(self, other):
+        if isinstance(other, EtherAddress):
+            return self._int >= other._int
+        return NotImplemented
 
     def __hash__(self):
-        return self._value.__hash__()
+        return hash(self._int)
 
     def __repr__(self):
         return self.__class__.__name__ + "('" + self.to_str() + "')"
 
-    def __setattr__(self, a, v):
-        if hasattr(self, '_value'):
-            raise TypeError("This object is immutable")
-        object.__setattr__(self, a, v)
+    def __reduce__(self):
+        return (self.__class__, (self._value,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     @classmethod
     def bcast(cls):
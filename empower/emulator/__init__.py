@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER WTP emulator.
+
+Load test an LVAPP server without real access points. The emulator opens
+one TCP connection per emulated WTP and speaks the LVAPP wire format as
+defined in empower.lvapp (and in the statistics modules), while emulated
+stations probe, authenticate and associate with the controller.
+
+Usage: python3 -m empower.emulator --help
+"""
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Emulated WTP agent."""
+
+import time
+import random
+import struct
+
+from construct import Container
+from tornado.tcpclient import TCPClient
+from tornado.iostream import StreamClosedError
+
+from empower.core.codec import compile_parser
+from empower.core.framing import FrameBuffer
+from empower.core.framing import DEFAULT_CHUNK_SIZE
+from empower.core.timerwheel import PeriodicTimer
+from empower.datatypes.etheraddress import EtherAddress
+from empower.datatypes.ssid import WIFI_NWID_MAXSIZE
+from empower.lvapp import PT_VERSION
+from empower.lvapp import PT_HELLO
+from empower.lvapp import PT_CAPS_REQUEST
+from empower.lvapp import PT_CAPS_RESPONSE
+from empower.lvapp import PT_PROBE_REQUEST
+from empower.lvapp import PT_PROBE_RESPONSE
+from empower.lvapp import PT_AUTH_REQUEST
+from empower.lvapp import PT_AUTH_RESPONSE
+from empower.lvapp import PT_ASSOC_REQUEST
+from empower.lvapp import PT_ASSOC_RESPONSE
+from empower.lvapp import PT_ADD_LVAP
+from empower.lvapp import PT_DEL_LVAP
+from empower.lvapp import PT_ADD_LVAP_RESPONSE
+from empower.lvapp import PT_DEL_LVAP_RESPONSE
+from empower.lvapp import HEADER
+from empower.lvapp import HELLO
+from empower.lvapp import CAPS_RESPONSE
+from empower.lvapp import PROBE_REQUEST
+from empower.lvapp import PROBE_RESPONSE
+from empower.lvapp import AUTH_REQUEST
+from empower.lvapp import AUTH_RESPONSE
+from empower.lvapp import ASSOC_REQUEST
+from empower.lvapp import ASSOC_RESPONSE
+from empower.lvapp import ADD_LVAP
+from empower.lvapp import DEL_LVAP
+from empower.lvapp import ADD_LVAP_RESPONSE
+from empower.lvapp import DEL_LVAP_RESPONSE
+from empower.lvapp.bin_counter.bin_counter import PT_STATS_REQUEST
+from empower.lvapp.bin_counter.bin_counter import PT_STATS_RESPONSE
+from empower.lvapp.bin_counter.bin_counter import STATS_REQUEST
+from empower.lvapp.bin_counter.bin_counter import STATS_RESPONSE
+from empower.lvapp.lvap_stats.lvap_stats import PT_RATES_REQUEST
+from empower.lvapp.lvap_stats.lvap_stats import PT_RATES_RESPONSE
+from empower.lvapp.lvap_stats.lvap_stats import RATES_REQUEST
+from empower.lvapp.lvap_stats.lvap_stats import RATES_RESPONSE
+from empower.lvapp.ucqm.ucqm import PT_POLLER_REQUEST
+from empower.lvapp.ucqm.ucqm import PT_POLLER_RESPONSE
+from empower.lvapp.common.maps import POLLER_REQUEST
+from empower.lvapp.common.maps import POLLER_RESPONSE
+from empower.lvapp.wifi_stats.wifi_stats import PT_WIFI_STATS_REQUEST
+from empower.lvapp.wifi_stats.wifi_stats import PT_WIFI_STATS_RESPONSE
+from empower.lvapp.wifi_stats.wifi_stats import WIFI_STATS_REQUEST
+from empower.lvapp.wifi_stats.wifi_stats import WIFI_STATS_RESPONSE
+from empower.lvapp.wifi_stats.wifi_stats import NB_SAMPLES
+from empower.core.resourcepool import BT_HT20
+
+import empower.logger
+
+# default hello period in ms
+DEFAULT_PERIOD = 5000
+
+# channels assigned (round robin) to the emulated WTPs
+CHANNELS = (1, 6, 11, 36, 40, 44, 48)
+
+# prefixes of the addresses generated by the emulator (locally administered)
+WTP_PREFIX = 0x02EE00000000
+HWADDR_PREFIX = 0x02EF00000000
+STA_PREFIX = 0x025A00000000
+
+# number of entries in the emulated rates and bin counter reports
+NB_RATES = 8
+NB_BINS = 4
+
+# maximum number of stations reported in a poller response
+NB_POLLER_ENTRIES = 16
+
+# messages sent by the controller that are answered by the emulator
+REQUESTS = {PT_CAPS_REQUEST: None,
+            PT_ADD_LVAP: ADD_LVAP,
+            PT_DEL_LVAP: DEL_LVAP,
+            PT_PROBE_RESPONSE: PROBE_RESPONSE,
+            PT_AUTH_RESPONSE: AUTH_RESPONSE,
+            PT_ASSOC_RESPONSE: ASSOC_RESPONSE,
+            PT_STATS_REQUEST: STATS_REQUEST,
+            PT_RATES_REQUEST: RATES_REQUEST,
+            PT_POLLER_REQUEST: POLLER_REQUEST,
+            PT_WIFI_STATS_REQUEST: WIFI_STATS_REQUEST}
+
+# messages sent by the emulator
+RESPONSES = {PT_HELLO: HELLO,
+             PT_CAPS_RESPONSE: CAPS_RESPONSE,
+             PT_PROBE_REQUEST: PROBE_REQUEST,
+             PT_AUTH_REQUEST: AUTH_REQUEST,
+             PT_ASSOC_REQUEST: ASSOC_REQUEST,
+             PT_ADD_LVAP_RESPONSE: ADD_LVAP_RESPONSE,
+             PT_DEL_LVAP_RESPONSE: DEL_LVAP_RESPONSE,
+             PT_STATS_RESPONSE: STATS_RESPONSE,
+             PT_RATES_RESPONSE: RATES_RESPONSE,
+             PT_POLLER_RESPONSE: POLLER_RESPONSE,
+             PT_WIFI_STATS_RESPONSE: WIFI_STATS_RESPONSE}
+
+CODECS = {pt_type: compile_parser(parser)
+          for pt_type, parser in list(REQUESTS.items()) +
+          list(RESPONSES.items()) if parser}
+
+# the length field of the LVAPP header
+LENGTH = struct.Struct("!I")
+
+
+def make_addr(prefix, index):
+    """Return the index-th address with the specified prefix."""
+
+    return EtherAddress((prefix | index).to_bytes(6, 'big'))
+
+
+def to_ssid(ssid):
+    """Return an SSID as a NUL padded byte string."""
+
+    return ssid.encode().ljust(WIFI_NWID_MAXSIZE + 1, b'\0')
+
+
+class EmulatedWTP:
+    """An emulated WTP.
+
+    The agent connects to the controller, sends periodic hellos, announces
+    one resource block and answers the LVAP and statistics requests. Every
+    message exchanged is reported to the owner (see LoadTest), which is
+    also notified of the probe, auth, and assoc responses.
+
+    Attributes:
+        index: the WTP index (used to build the addresses)
+        addr: the WTP address
+        hwaddr: the address of the only resource block
+        channel: the channel of the resource block
+        band: the band of the resource block
+        owner: the object notified of the incoming messages
+        period: the hello period in ms
+        lvaps: the addresses of the stations hosted by this WTP
+        online: True after the CAPS_RESPONSE has been sent
+    """
+
+    def __init__(self, index, owner, period=DEFAULT_PERIOD):
+
+        self.index = index
+        self.addr = make_addr(WTP_PREFIX, index)
+        self.hwaddr = make_addr(HWADDR_PREFIX, index)
+        self.channel = CHANNELS[index % len(CHANNELS)]
+        self.band = BT_HT20
+        self.owner = owner
+        self.period = period
+        self.lvaps = {}
+        self.online = False
+        self.stream = None
+        self.log = empower.logger.get_logger()
+
+        self.__seq = 0
+        self.__framer = FrameBuffer(HEADER.sizeof(), length_offset=2)
+        self.__hello = PeriodicTimer(self.send_hello, period)
+        self.__handlers = {PT_CAPS_REQUEST: self._handle_caps_request,
+                           PT_ADD_LVAP: self._handle_add_lvap,
+                           PT_DEL_LVAP: self._handle_del_lvap,
+                           PT_PROBE_RESPONSE: self._handle_response,
+                           PT_AUTH_RESPONSE: self._handle_response,
+                           PT_ASSOC_RESPONSE: self._handle_response,
+                           PT_STATS_REQUEST: self._handle_stats_request,
+                           PT_RATES_REQUEST: self._handle_rates_request,
+                           PT_POLLER_REQUEST: self._handle_poller_request,
+                           PT_WIFI_STATS_REQUEST:
+                               self._handle_wifi_stats_request}
+
+    async def connect(self, host, port):
+        """Connect to the controller and start the hello loop."""
+
+        self.stream = await TCPClient().connect(host, port)
+        self.stream.set_nodelay(True)
+
+        self.send_hello()
+        self.__hello.start()
+
+        try:
+            while True:
+                data = await self.stream.read_bytes(DEFAULT_CHUNK_SIZE,
+                                                    partial=True)
+                self.__on_read(data)
+        except StreamClosedError:
+            pass
+        finally:
+            self.__hello.stop()
+            self.online = False
+            self.owner.disconnected(self)
+
+    def close(self):
+        """Close the connection."""
+
+        if self.stream:
+            self.stream.close()
+
+    def __on_read(self, data):
+        """Dispatch the complete frames."""
+
+        self.__framer.feed(data)
+
+        for frame in self.__framer.split():
+
+            pt_type = frame[1]
+            self.owner.received(pt_type)
+
+            if pt_type not in self.__handlers:
+                continue
+
+            parser = REQUESTS[pt_type]
+            msg = CODECS[pt_type].parse(bytes(frame)) if parser else None
+
+            self.__handlers[pt_type](pt_type, msg)
+
+    def send_message(self, pt_type, **fields):
+        """Build and send a message."""
+
+        if not self.stream or self.stream.closed():
+            return
+
+        self.__seq += 1
+
+        msg = Container(version=PT_VERSION, type=pt_type, length=0,
+                        seq=self.__seq, **fields)
+
+        frame = bytearray(CODECS[pt_type].build(msg))
+        LENGTH.pack_into(frame, 2, len(frame))
+
+        self.stream.write(bytes(frame))
+        self.owner.sent(pt_type)
+
+    def send_hello(self):
+        """Send a HELLO message."""
+
+        self.send_message(PT_HELLO, wtp=self.addr.to_raw(),
+                          period=self.period)
+
+    def send_probe_request(self, sta, ssid=""):
+        """Send a PROBE_REQUEST message."""
+
+        self.send_message(PT_PROBE_REQUEST, wtp=self.addr.to_raw(),
+                          sta=sta.to_raw(), hwaddr=self.hwaddr.to_raw(),
+                          channel=self.channel, band=self.band,
+                          supported_band=self.band, ssid=to_ssid(ssid))
+
+    def send_auth_request(self, sta, bssid):
+        """Send an AUTH_REQUEST message."""
+
+        self.send_message(PT_AUTH_REQUEST, wtp=self.addr.to_raw(),
+                          sta=sta.to_raw(), bssid=bssid.to_raw())
+
+    def send_assoc_request(self, sta, bssid, ssid):
+        """Send an ASSOC_REQUEST message."""
+
+        self.send_message(PT_ASSOC_REQUEST, wtp=self.addr.to_raw(),
+                          sta=sta.to_raw(), bssid=bssid.to_raw(),
+                          hwaddr=self.hwaddr.to_raw(), channel=self.channel,
+                          band=self.band, supported_band=self.band,
+                          ssid=to_ssid(ssid))
+
+    def _handle_caps_request(self, _, __):
+        """Announce the resource block."""
+
+        self.send_message(PT_CAPS_RESPONSE, wtp=self.addr.to_raw(),
+                          dpid=b'\0\0' + self.addr.to_raw(),
+                          nb_resources_elements=1, nb_ports_elements=1,
+                          blocks=[[self.hwaddr.to_raw(), self.channel,
+                                   self.band]],
+                          ports=[[self.hwaddr.to_raw(), 1,
+                                  b'wlan0'.ljust(10, b'\0')]])
+
+        self.online = True
+        self.owner.connected(self)
+
+    def _handle_add_lvap(self, _, msg):
+        """Confirm the LVAP and save its networks."""
+
+        sta = EtherAddress(msg.sta)
+
+        self.lvaps[sta] = None
+
+        self.send_message(PT_ADD_LVAP_RESPONSE, wtp=self.addr.to_raw(),
+                          sta=msg.sta, module_id=msg.module_id, status=0)
+
+        networks = [(EtherAddress(network.bssid),
+                     network.ssid.decode().strip('\0'))
+                    for network in msg.networks]
+
+        self.owner.lvap_added(self, sta, networks)
+
+    def _handle_del_lvap(self, _, msg):
+        """Confirm the LVAP removal."""
+
+        self.lvaps.pop(EtherAddress(msg.sta), None)
+
+        self.send_message(PT_DEL_LVAP_RESPONSE, wtp=self.addr.to_raw(),
+                          sta=msg.sta, module_id=msg.module_id, status=0)
+
+    def _handle_response(self, pt_type, msg):
+        """Notify the owner of a probe/auth/assoc response."""
+
+        self.owner.response(pt_type, EtherAddress(msg.sta))
+
+    def _handle_stats_request(self, _, msg):
+        """Send a bin counter report."""
+
+        stats = [[random.randint(0, 1500), random.randint(0, 1000)]
+                 for _ in range(2 * NB_BINS)]
+
+        self.send_message(PT_STATS_RESPONSE, module_id=msg.module_id,
+                          wtp=self.addr.to_raw(), sta=msg.sta,
+                          nb_tx=NB_BINS, nb_rx=NB_BINS, stats=stats)
+
+    def _handle_rates_request(self, _, msg):
+        """Send a rates report."""
+
+        rates = [[rate, Container(mcs=True), random.randint(0, 18000),
+                  random.randint(0, 18000)] for rate in range(NB_RATES)]
+
+        self.send_message(PT_RATES_RESPONSE, module_id=msg.module_id,
+                          wtp=self.addr.to_raw(), nb_entries=NB_RATES,
+                          rates=rates)
+
+    def _handle_poller_request(self, _, msg):
+        """Send a channel quality map."""
+
+        entries = [[sta.to_raw(), random.randint(0, 10),
+                    random.randint(-90, -30), random.randint(0, 100),
+                    random.randint(0, 1000), random.randint(-90, -30)]
+                   for sta in list(self.lvaps)[:NB_POLLER_ENTRIES]]
+
+        self.send_message(PT_POLLER_RESPONSE, module_id=msg.module_id,
+                          wtp=self.addr.to_raw(), nb_entries=len(entries),
+                          img_entries=entries)
+
+    def _handle_wifi_stats_request(self, _, msg):
+        """Send a channel utilization report."""
+
+        now = int(time.time() * 1000) & 0xFFFFFFFF
+
+        entries = [[stats_type, (now - 10 * sample) & 0xFFFFFFFF,
+                    random.randint(0, 180)]
+                   for stats_type in range(3)
+                   for sample in range(NB_SAMPLES)]
+
+        self.send_message(PT_WIFI_STATS_RESPONSE, module_id=msg.module_id,
+                          wtp=self.addr.to_raw(), nb_entries=len(entries),
+                          entries=entries)
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Load test runner.
+
+The runner connects the emulated WTPs to the controller, optionally in
+steps of a given size so that the load increases over time, and runs a
+set of stations on every WTP. Each station probes, authenticates, and
+associates using a fresh address taken from its own small address pool,
+stays associated for an exponentially distributed time, and then leaves
+and starts over.
+
+Every report interval the runner prints the messages/sec exchanged with
+the controller, the request to response latency of the probe, auth and
+assoc requests, and, if the controller pid is known, the controller CPU
+time per message. Latency grows sharply when the controller saturates.
+
+Since stations cannot be allowed on the fly, their addresses (and the
+WTPs) must be known to the controller. This can be done once with the
+--register option, which adds the missing entries through the REST API.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+import urllib.error
+import urllib.request
+
+from datetime import timedelta
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+from tornado.concurrent import Future
+from tornado.util import TimeoutError
+
+from empower.core.histogram import Histogram
+from empower.emulator.agent import EmulatedWTP
+from empower.emulator.agent import DEFAULT_PERIOD
+from empower.emulator.agent import STA_PREFIX
+from empower.emulator.agent import make_addr
+from empower.lvapp import PT_PROBE_RESPONSE
+from empower.lvapp import PT_AUTH_RESPONSE
+from empower.lvapp import PT_ASSOC_RESPONSE
+
+import empower.logger
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 4433
+DEFAULT_REST = "http://127.0.0.1:8888"
+DEFAULT_USER = "root"
+DEFAULT_PASSWORD = "root"
+
+DEFAULT_WTPS = 100
+DEFAULT_STATIONS = 2
+DEFAULT_POOL = 2
+DEFAULT_FANOUT = 1
+DEFAULT_DWELL = 10.0
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_DURATION = 60.0
+DEFAULT_REPORT = 5.0
+
+# maximum number of addresses per station
+MAX_POOL = 16
+
+# the requests whose latency is measured, indexed by response type
+REQUESTS = {PT_PROBE_RESPONSE: "probe",
+            PT_AUTH_RESPONSE: "auth",
+            PT_ASSOC_RESPONSE: "assoc"}
+
+
+def ms(value):
+    """Format a latency (None if not available)."""
+
+    return "%.1f" % value if value is not None else "-"
+
+
+def cpu_time(pid):
+    """Return the CPU time (user + system, in seconds) used by a process."""
+
+    with open("/proc/%u/stat" % pid) as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class LoadStats:
+    """Load test counters.
+
+    Attributes:
+        sent: the messages sent to the controller
+        received: the messages received from the controller
+        latency: request to response latency (ms) histograms, by request
+        timeouts: the requests not answered in time, by request
+        unexpected: the responses not matching any pending request
+        associations: the completed associations
+        connected: the WTPs connected (CAPS exchanged)
+        disconnected: the WTPs disconnected by the controller
+    """
+
+    def __init__(self):
+
+        self.sent = 0
+        self.received = 0
+        self.latency = {name: Histogram() for name in REQUESTS.values()}
+        self.timeouts = {name: 0 for name in REQUESTS.values()}
+        self.unexpected = 0
+        self.associations = 0
+        self.connected = 0
+        self.disconnected = 0
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'sent': self.sent,
+                'received': self.received,
+                'latency': {name: histogram.to_dict()
+                            for name, histogram in self.latency.items()},
+                'timeouts': self.timeouts,
+                'unexpected': self.unexpected,
+                'associations': self.associations,
+                'connected': self.connected,
+                'disconnected': self.disconnected}
+
+
+class LoadTest:
+    """An LVAPP load test.
+
+    Attributes:
+        host: the controller address
+        port: the LVAPP server port
+        nb_wtps: the number of emulated WTPs
+        stations: the number of stations per WTP
+        pool: the number of addresses used in turn by each station
+        fanout: the number of WTPs reporting each probe
+        dwell: the average association time (s)
+        timeout: the time (s) after which a request is considered lost
+        step: the number of WTPs connected at each step (0 means all)
+        step_interval: the time (s) between two steps
+        pid: the controller pid (used to measure its CPU usage)
+        wtps: the emulated WTPs
+        total: the counters since the beginning of the test
+        interval: the counters since the last report
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 nb_wtps=DEFAULT_WTPS, stations=DEFAULT_STATIONS,
+                 pool=DEFAULT_POOL, fanout=DEFAULT_FANOUT,
+                 dwell=DEFAULT_DWELL, timeout=DEFAULT_TIMEOUT, step=0,
+                 step_interval=DEFAULT_REPORT, period=DEFAULT_PERIOD,
+                 pid=None):
+
+        if not 1 <= pool <= MAX_POOL:
+            raise ValueError("pool must be between 1 and %u" % MAX_POOL)
+
+        self.host = host
+        self.port = port
+        self.nb_wtps = nb_wtps
+        self.stations = stations
+        self.pool = pool
+        self.fanout = max(1, min(fanout, nb_wtps))
+        self.dwell = dwell
+        self.timeout = timeout
+        self.step = step if step > 0 else nb_wtps
+        self.step_interval = step_interval
+        self.pid = pid
+        self.wtps = [EmulatedWTP(index, self, period)
+                     for index in range(nb_wtps)]
+        self.total = LoadStats()
+        self.interval = LoadStats()
+        self.log = empower.logger.get_logger()
+
+        self.__running = False
+        self.__pending = {}
+        self.__networks = {}
+        self.__active = 0
+
+    def addresses(self, wtp):
+        """Return all the station addresses used at a WTP."""
+
+        return [self.station_addr(wtp, slot, idx)
+                for slot in range(self.stations)
+                for idx in range(self.pool)]
+
+    def station_addr(self, wtp, slot, idx):
+        """Return the idx-th address of a station."""
+
+        station = wtp.index * self.stations + slot
+
+        return make_addr(STA_PREFIX, station * MAX_POOL + idx)
+
+    def sent(self, _):
+        """Count a message sent to the controller."""
+
+        self.total.sent += 1
+        self.interval.sent += 1
+
+    def received(self, _):
+        """Count a message received from the controller."""
+
+        self.total.received += 1
+        self.interval.received += 1
+
+    def connected(self, wtp):
+        """Start the stations of a WTP once it is online."""
+
+        self.total.connected += 1
+        self.interval.connected += 1
+
+        for slot in range(self.stations):
+            IOLoop.current().spawn_callback(self.__station, wtp, slot)
+
+    def disconnected(self, _):
+        """Count a WTP disconnection."""
+
+        if not self.__running:
+            return
+
+        self.total.disconnected += 1
+        self.interval.disconnected += 1
+
+    def lvap_added(self, _, sta, networks):
+        """Save the networks offered to a station."""
+
+        if networks:
+            self.__networks[sta] = networks
+
+    def response(self, pt_type, sta):
+        """Complete a pending request."""
+
+        entry = self.__pending.pop((pt_type, sta), None)
+
+        if not entry:
+            self.total.unexpected += 1
+            self.interval.unexpected += 1
+            return
+
+        start, future = entry
+        delta = (time.time() - start) * 1000.0
+
+        for stats in (self.total, self.interval):
+            stats.latency[REQUESTS[pt_type]].add(delta)
+
+        future.set_result(True)
+
+    async def __request(self, pt_type, sta, send):
+        """Send a request and wait for its response."""
+
+        future = Future()
+        self.__pending[(pt_type, sta)] = (time.time(), future)
+
+        send()
+
+        try:
+            await gen.with_timeout(timedelta(seconds=self.timeout), future)
+        except TimeoutError:
+            self.__pending.pop((pt_type, sta), None)
+            for stats in (self.total, self.interval):
+                stats.timeouts[REQUESTS[pt_type]] += 1
+            return False
+
+        return True
+
+    async def __station(self, wtp, slot):
+        """Run a station."""
+
+        # spread the first probes over the dwell time
+        await gen.sleep(random.uniform(0, self.dwell))
+
+        neighbours = [self.wtps[(wtp.index + offset) % self.nb_wtps]
+                      for offset in range(self.fanout)]
+
+        idx = 0
+
+        while self.__running and wtp.online:
+
+            sta = self.station_addr(wtp, slot, idx)
+            idx = (idx + 1) % self.pool
+
+            def probe(sta=sta):
+                for neighbour in neighbours:
+                    if neighbour.online:
+                        neighbour.send_probe_request(sta)
+
+            if not await self.__request(PT_PROBE_RESPONSE, sta, probe):
+                continue
+
+            if sta not in self.__networks:
+                self.log.warning("No networks available for %s", sta)
+                await gen.sleep(self.timeout)
+                continue
+
+            bssid, ssid = self.__networks[sta][0]
+
+            if not await self.__request(
+                    PT_AUTH_RESPONSE, sta,
+                    lambda: wtp.send_auth_request(sta, bssid)):
+                continue
+
+            if not await self.__request(
+                    PT_ASSOC_RESPONSE, sta,
+                    lambda: wtp.send_assoc_request(sta, bssid, ssid)):
+                continue
+
+            self.total.associations += 1
+            self.interval.associations += 1
+
+            await gen.sleep(random.expovariate(1.0 / self.dwell))
+
+    def report(self, elapsed, delta, cpu, own_cpu):
+        """Print one report line and reset the interval counters."""
+
+        stats = self.interval
+        online = len([wtp for wtp in self.wtps if wtp.online])
+
+        line = ["%7.1fs" % elapsed,
+                "wtps %5u" % online,
+                "assoc/s %7.1f" % (stats.associations / delta),
+                "tx/s %8.1f" % (stats.sent / delta),
+                "rx/s %8.1f" % (stats.received / delta)]
+
+        for name, histogram in stats.latency.items():
+            line.append("%s p50/p99 %s/%sms" %
+                        (name, ms(histogram.percentile(50)),
+                         ms(histogram.percentile(99))))
+
+        line.append("timeouts %u" % sum(stats.timeouts.values()))
+
+        messages = stats.sent + stats.received
+
+        if cpu is not None:
+            line.append("ctrl %5.1f%% %6.1fus/msg" %
+                        (100.0 * cpu / delta,
+                         1e6 * cpu / messages if messages else 0.0))
+
+        line.append("emu %5.1f%%" % (100.0 * own_cpu / delta))
+
+        print(" ".join(line))
+        sys.stdout.flush()
+
+        self.interval = LoadStats()
+
+    def __cpu(self):
+        """Return the controller CPU time (None if unknown)."""
+
+        if not self.pid:
+            return None
+
+        try:
+            return cpu_time(self.pid)
+        except (OSError, ValueError):
+            return None
+
+    async def run(self, duration=DEFAULT_DURATION, report=DEFAULT_REPORT):
+        """Run the load test for the specified time."""
+
+        self.__running = True
+
+        start = last = time.time()
+        last_cpu = self.__cpu()
+        last_own_cpu = time.process_time()
+        next_step = start
+
+        connecting = 0
+
+        while time.time() - start < duration:
+
+            now = time.time()
+
+            if connecting < self.nb_wtps and now >= next_step:
+                for wtp in self.wtps[connecting:connecting + self.step]:
+                    IOLoop.current().spawn_callback(self.__connect, wtp)
+                connecting += self.step
+                next_step = now + self.step_interval
+
+            await gen.sleep(min(report, 0.5))
+
+            now = time.time()
+
+            if now - last < report:
+                continue
+
+            cpu = self.__cpu()
+            own_cpu = time.process_time()
+
+            self.report(now - start, now - last,
+                        cpu - last_cpu if cpu is not None and
+                        last_cpu is not None else None,
+                        own_cpu - last_own_cpu)
+
+            last, last_cpu, last_own_cpu = now, cpu, own_cpu
+
+        self.__running = False
+
+        for wtp in self.wtps:
+            wtp.close()
+
+        return self.total
+
+    async def __connect(self, wtp):
+        """Connect a WTP."""
+
+        try:
+            await wtp.connect(self.host, self.port)
+        except OSError as ex:
+            self.log.error("WTP %s unable to connect: %s", wtp.addr, ex)
+
+
+def register(test, url, user, password):
+    """Add the emulated WTPs and stations to the controller."""
+
+    token = base64.b64encode(("%s:%s" % (user, password)).encode()).decode()
+    headers = {'Authorization': "Basic %s" % token,
+               'Content-Type': "application/json"}
+
+    def call(method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(url + path, data=data, headers=headers,
+                                     method=method)
+        with urllib.request.urlopen(req) as response:
+            return response.read()
+
+    wtps = set(wtp['addr'] for wtp in json.loads(call("GET", "/api/v1/wtps")))
+    allowed = set(acl['addr'] for acl in
+                  json.loads(call("GET", "/api/v1/allow")))
+
+    added = 0
+
+    for wtp in test.wtps:
+
+        if str(wtp.addr) not in wtps:
+            call("POST", "/api/v1/wtps", {'version': "1.0",
+                                          'addr': str(wtp.addr),
+                                          'label': "Emulated WTP"})
+            added += 1
+
+        for sta in test.addresses(wtp):
+            if str(sta) not in allowed:
+                call("POST", "/api/v1/allow", {'version': "1.0",
+                                               'sta': str(sta),
+                                               'label': "Emulated STA"})
+                added += 1
+
+    return added
+
+
+def main(argv=None):
+    """Parse the command line and run the load test."""
+
+    parser = argparse.ArgumentParser(prog="python3 -m empower.emulator",
+                                     description="LVAPP load test.")
+
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="controller address (default %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="LVAPP server port (default %(default)s)")
+    parser.add_argument("--wtps", type=int, default=DEFAULT_WTPS,
+                        help="number of WTPs (default %(default)s)")
+    parser.add_argument("--stations", type=int, default=DEFAULT_STATIONS,
+                        help="stations per WTP (default %(default)s)")
+    parser.add_argument("--pool", type=int, default=DEFAULT_POOL,
+                        help="addresses per station (default %(default)s)")
+    parser.add_argument("--fanout", type=int, default=DEFAULT_FANOUT,
+                        help="WTPs reporting each probe (default "
+                             "%(default)s)")
+    parser.add_argument("--dwell", type=float, default=DEFAULT_DWELL,
+                        help="average association time in s (default "
+                             "%(default)s)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="request timeout in s (default %(default)s)")
+    parser.add_argument("--period", type=int, default=DEFAULT_PERIOD,
+                        help="hello period in ms (default %(default)s)")
+    parser.add_argument("--step", type=int, default=0,
+                        help="WTPs connected per step (default all)")
+    parser.add_argument("--step-interval", type=float,
+                        default=DEFAULT_REPORT,
+                        help="time between steps in s (default "
+                             "%(default)s)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help="test duration in s (default %(default)s)")
+    parser.add_argument("--report", type=float, default=DEFAULT_REPORT,
+                        help="report interval in s (default %(default)s)")
+    parser.add_argument("--pid", type=int,
+                        help="controller pid, used to report its CPU usage")
+    parser.add_argument("--register", action="store_true",
+                        help="add WTPs and stations through the REST API")
+    parser.add_argument("--rest", default=DEFAULT_REST,
+                        help="REST API url (default %(default)s)")
+    parser.add_argument("--user", default=DEFAULT_USER,
+                        help="REST API user (default %(default)s)")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD,
+                        help="REST API password (default %(default)s)")
+    parser.add_argument("--json", action="store_true",
+                        help="print the final counters as JSON")
+
+    args = parser.parse_args(argv)
+
+    test = LoadTest(host=args.host, port=args.port, nb_wtps=args.wtps,
+                    stations=args.stations, pool=args.pool,
+                    fanout=args.fanout, dwell=args.dwell,
+                    timeout=args.timeout, step=args.step,
+                    step_interval=args.step_interval, period=args.period,
+                    pid=args.pid)
+
+    if args.register:
+        try:
+            added = register(test, args.rest, args.user, args.password)
+        except (urllib.error.URLError, ValueError) as ex:
+            parser.error("unable to register the WTPs: %s" % ex)
+        print("Registered %u WTPs/stations" % added)
+
+    total = IOLoop.current().run_sync(
+        lambda: test.run(args.duration, args.report))
+
+    if args.json:
+        print(json.dumps(total.to_dict(), indent=2))
+        return
+
+    print("sent %u received %u associations %u connected %u "
+          "disconnected %u unexpected %u" %
+          (total.sent, total.received, total.associations, total.connected,
+           total.disconnected, total.unexpected))
+
+    for name, histogram in total.latency.items():
+        print("%-6s count %7u avg %8.2fms p50 %sms p90 %sms p99 %sms "
+              "max %sms timeouts %u" %
+              (name, histogram.count, histogram.avg,
+               ms(histogram.percentile(50)), ms(histogram.percentile(90)),
+               ms(histogram.percentile(99)), ms(histogram.max),
+               total.timeouts[name]))
@@ -183,7 +183,7 @@ class IBNPMainHandler(tornado.websocket.WebSocketHandler):
         if wtp_addr not in RUNTIME.wtps:
             return
 
-        for lvap in RUNTIME.lvaps.values():
+        for lvap in RUNTIME.find_lvaps_by_wtp(wtp_addr):
 
             if lvap.wtp.addr != wtp_addr:
                 continue
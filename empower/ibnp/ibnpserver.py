@@ -25,8 +25,6 @@ from empower.core.trafficrule import TrafficRule
 
 from empower.datatypes.match import conflicting_match
 from empower.ibnp.ibnpmainhandler import IBNPMainHandler
-from empower.persistence import Session
-from empower.persistence.persistence import TblTrafficRule
 
 from empower.main import RUNTIME
 
@@ -65,19 +63,17 @@ class IBNPServer(tornado.web.Application):
 
     def __load_traffic_rules(self):
 
-        rules = Session().query(TblTrafficRule).all()
+        for tenant in RUNTIME.tenants.values():
 
-        for rule in rules:
+            for rule in tenant.traffic_rules.values():
 
-            tenant = RUNTIME.tenants[rule.tenant_id]
+                traffic_rule = TrafficRule(tenant=tenant,
+                                           match=rule['match'],
+                                           priority=rule['priority'],
+                                           label=rule['label'],
+                                           dscp=rule['dscp'])
 
-            traffic_rule = TrafficRule(tenant=tenant,
-                                       match=rule.match,
-                                       priority=rule.priority,
-                                       label=rule.label,
-                                       dscp=rule.dscp)
-
-            self.add_traffic_rule(traffic_rule)
+                self.add_traffic_rule(traffic_rule)
 
     def add_traffic_rule(self, tr):
         """Send traffic rule to backhaul controller."""
@@ -15,46 +15,175 @@
 # specific language governing permissions and limitations
 # under the License.
 
-"""EmPOWER logging package."""
+"""EmPOWER logging package.
 
-import inspect
+Logger names are derived from the caller's source file. The name is
+resolved once per file by looking at the caller frame (no stack
+inspection) and then cached.
+
+Records can be written through a QueueHandler so that formatting and I/O
+happen in a background thread (see start_queue). Chatty protocol messages
+(e.g. hello and stats) can be sampled: only one every n messages of a given
+type is logged while all of them are counted (see SAMPLER).
+"""
+
+import atexit
 import os
+import sys
+import queue
 import logging
+import logging.handlers
 
-PATH = inspect.stack()[0][1]
+PATH = __file__
 EXT_PATH = PATH[0:PATH.rindex(os.sep)]
 EXT_PATH = os.path.dirname(EXT_PATH) + os.sep
 PATH = os.path.dirname(PATH) + os.sep
 
+# logger names indexed by source file
+NAMES = {}
+
+# messages types logged only once every DEFAULT_SAMPLING_RATE messages
+DEFAULT_SAMPLING_RATE = 100
+DEFAULT_SAMPLING = {name: DEFAULT_SAMPLING_RATE
+                    for name in ["hello", "stats_response",
+                                 "wifi_stats_response", "rates_response",
+                                 "poller_response", "slice_stats_response",
+                                 "txp_bin_counter_response", "summary",
+                                 "rssi_trigger", "mac_reports_resp",
+                                 "ue_meas_response"]}
+
+
+def module_name(filename):
+    """Return the logger name for a source file."""
+
+    name = filename
+
+    if name.endswith('.py'):
+        name = name[0:-3]
+    elif name.endswith('.pyc'):
+        name = name[0:-4]
+    if name.startswith(PATH):
+        name = name[len(PATH):]
+    elif name.startswith(EXT_PATH):
+        name = name[len(EXT_PATH):]
+    name = name.replace('/', '.').replace('\\', '.')
+
+    # Remove double names ("topology.topology" -> "topology")
+    if name.find('.') != -1:
+        toks = name.split('.')
+        if len(toks) >= 2:
+            if toks[-1] == toks[-2]:
+                del toks[-1]
+                name = '.'.join(toks)
+
+    if name.startswith("ext."):
+        name = name.split("ext.", 1)[1]
+
+    if name.endswith(".__init__"):
+        name = name.rsplit(".__init__", 1)[0]
+
+    return name
+
 
 def get_logger(name=None, more_frames=0):
     """Logger factory."""
 
     if name is None:
-        stack = inspect.stack()[1+more_frames]
-        name = stack[1]
-        if name.endswith('.py'):
-            name = name[0:-3]
-        elif name.endswith('.pyc'):
-            name = name[0:-4]
-        if name.startswith(PATH):
-            name = name[len(PATH):]
-        elif name.startswith(EXT_PATH):
-            name = name[len(EXT_PATH):]
-        name = name.replace('/', '.').replace('\\', '.')
-
-        # Remove double names ("topology.topology" -> "topology")
-        if name.find('.') != -1:
-            toks = name.split('.')
-            if len(toks) >= 2:
-                if toks[-1] == toks[-2]:
-                    del toks[-1]
-                    name = '.'.join(toks)
-
-        if name.startswith("ext."):
-            name = name.split("ext.", 1)[1]
-
-        if name.endswith(".__init__"):
-            name = name.rsplit(".__init__", 1)[0]
+
+        filename = sys._getframe(1 + more_frames).f_code.co_filename
+
+        name = NAMES.get(filename)
+
+        if name is None:
+            name = module_name(filename)
+            NAMES[filename] = name
 
     return logging.getLogger(name)
+
+
+class MessageSampler:
+    """Per message type log sampling.
+
+    Attributes:
+        rates: one every rate messages is logged, indexed by message type
+        counters: the number of messages seen, indexed by message type
+    """
+
+    def __init__(self, rates=None):
+
+        self.rates = dict(rates) if rates else {}
+        self.counters = {}
+
+    def set_rate(self, msg_type, rate):
+        """Log one every rate messages of type msg_type."""
+
+        rate = int(rate)
+
+        if rate < 1:
+            raise ValueError("Invalid sampling rate %u" % rate)
+
+        self.rates[msg_type] = rate
+
+    def sample(self, msg_type):
+        """Count a message and return True if it must be logged."""
+
+        count = self.counters.get(msg_type, 0) + 1
+        self.counters[msg_type] = count
+
+        rate = self.rates.get(msg_type, 1)
+
+        return rate == 1 or count % rate == 1
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'rates': self.rates,
+                'counters': self.counters}
+
+
+SAMPLER = MessageSampler(DEFAULT_SAMPLING)
+
+LISTENER = None
+
+
+def start_queue():
+    """Move the root handlers to a background thread.
+
+    The root logger handlers are replaced by a single QueueHandler and are
+    then served by a QueueListener thread.
+    """
+
+    global LISTENER
+
+    if LISTENER:
+        return LISTENER
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+
+    records = queue.Queue()
+
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    root.addHandler(logging.handlers.QueueHandler(records))
+
+    LISTENER = logging.handlers.QueueListener(records, *handlers,
+                                              respect_handler_level=True)
+    LISTENER.start()
+
+    atexit.register(stop_queue)
+
+    return LISTENER
+
+
+def stop_queue():
+    """Flush the queue and stop the background thread."""
+
+    global LISTENER
+
+    if not LISTENER:
+        return
+
+    LISTENER.stop()
+    LISTENER = None
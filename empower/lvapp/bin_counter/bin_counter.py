@@ -33,6 +33,7 @@ from empower.lvapp.lvappserver import ModuleLVAPPWorker
 from empower.core.module import ModulePeriodic
 from empower.core.app import EmpowerApp
 from empower.lvapp import PT_VERSION
+from empower.lvapp.common.bins import BinClassifier
 
 from empower.main import RUNTIME
 
@@ -92,6 +93,7 @@ class BinCounter(ModulePeriodic):
         # parameters
         self._lvap = None
         self._bins = [8192]
+        self._classifier = BinClassifier(self._bins)
 
         # data structures
         self.tx_packets = []
@@ -148,6 +150,7 @@ class BinCounter(ModulePeriodic):
                 raise ValueError("bins values must be positive")
 
         self._bins = bins
+        self._classifier = BinClassifier(bins or [])
 
     def to_dict(self):
         """ Return a JSON-serializable dictionary representing the Stats """
@@ -167,27 +170,27 @@ class BinCounter(ModulePeriodic):
 
         return out
 
-    def run_once(self):
-        """ Send out stats request. """
+    def poll(self):
+        """ Return stats request. """
 
         if self.tenant_id not in RUNTIME.tenants:
             self.log.info("Tenant %s not found", self.tenant_id)
             self.unload()
-            return
+            return None
 
         tenant = RUNTIME.tenants[self.tenant_id]
 
         if self.lvap not in tenant.lvaps:
             self.log.info("LVAP %s not found", self.lvap)
             self.unload()
-            return
+            return None
 
         lvap = tenant.lvaps[self.lvap]
 
         if not lvap.wtp.connection or lvap.wtp.connection.stream.closed():
             self.log.info("WTP %s not connected", lvap.wtp.addr)
             self.unload()
-            return
+            return None
 
         stats_req = Container(version=PT_VERSION,
                               type=PT_STATS_REQUEST,
@@ -201,12 +204,13 @@ class BinCounter(ModulePeriodic):
                       self.module_id)
 
         msg = STATS_REQUEST.build(stats_req)
-        lvap.wtp.connection.stream.write(msg)
+
+        return (lvap.wtp.connection, msg)
 
     def fill_bytes_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -215,25 +219,12 @@ class BinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if not entry:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + size * count
-                    break
-
-        return out
+        return self._classifier.classify(data)[0]
 
     def fill_packets_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -242,32 +233,7 @@ class BinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if entry:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + count
-                    break
-
-        return out
-
-    @classmethod
-    def update_stats(cls, delta, last, current):
-        """Update stats."""
-
-        stats = []
-
-        for i in range(0, len(last)):
-            diff = current[i] - last[i]
-            stats.append(diff / delta)
-
-        return stats
+        return self._classifier.classify(data)[1]
 
     def handle_response(self, response):
         """Handle an incoming STATS_RESPONSE message.
@@ -279,7 +245,7 @@ class BinCounter(ModulePeriodic):
 
         # update this object
         tx_samples = response.stats[0:response.nb_tx]
-        rx_samples = response.stats[response.nb_tx:-1]
+        rx_samples = response.stats[response.nb_tx:]
 
         old_tx_bytes = self.tx_bytes
         old_rx_bytes = self.rx_bytes
@@ -287,22 +253,30 @@ class BinCounter(ModulePeriodic):
         old_tx_packets = self.tx_packets
         old_rx_packets = self.rx_packets
 
-        self.tx_bytes = self.fill_bytes_samples(tx_samples)
-        self.rx_bytes = self.fill_bytes_samples(rx_samples)
-
-        self.tx_packets = self.fill_packets_samples(tx_samples)
-        self.rx_packets = self.fill_packets_samples(rx_samples)
+        self.tx_bytes, self.tx_packets = \
+            self._classifier.classify(tx_samples)
+        self.rx_bytes, self.rx_packets = \
+            self._classifier.classify(rx_samples)
 
         if self.last:
             delta = time.time() - self.last
+            rates = self._classifier.rates
             self.tx_bytes_per_second = \
-                self.update_stats(delta, old_tx_bytes, self.tx_bytes)
+                rates(delta, old_tx_bytes, self.tx_bytes)
             self.rx_bytes_per_second = \
-                self.update_stats(delta, old_rx_bytes, self.rx_bytes)
+                rates(delta, old_rx_bytes, self.rx_bytes)
             self.tx_packets_per_second = \
-                self.update_stats(delta, old_tx_packets, self.tx_packets)
+                rates(delta, old_tx_packets, self.tx_packets)
             self.rx_packets_per_second = \
-                self.update_stats(delta, old_rx_packets, self.rx_packets)
+                rates(delta, old_rx_packets, self.rx_packets)
+
+            # save time series
+            metrics = {}
+            for name in ('tx_bytes_per_second', 'rx_bytes_per_second',
+                         'tx_packets_per_second', 'rx_packets_per_second'):
+                for size, value in zip(self.bins, getattr(self, name)):
+                    metrics['%s/%u' % (name, size)] = value
+            self.save_series(self.lvap, metrics)
 
         self.last = time.time()
 
@@ -336,4 +310,5 @@ setattr(EmpowerApp, BinCounter.MODULE_NAME, bound_bin_counter)
 def launch():
     """ Initialize the module. """
 
-    return BinCounterWorker(BinCounter, PT_STATS_RESPONSE, STATS_RESPONSE)
+    return BinCounterWorker(BinCounter, PT_STATS_RESPONSE, STATS_RESPONSE,
+                            batched=True)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2018 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Bin classification engine.
+
+Used by the bin counter primitives. Samples are [size, count] pairs where
+count is the number of size-long packets. Each sample is classified in the
+first bin whose upper bound is greater than or equal to its size, samples
+larger than the last bin are discarded.
+
+NumPy is used if available: samples are copied in a preallocated array,
+the bin of each sample is resolved with searchsorted and the per-bin totals
+are computed with bincount. Otherwise a pure-Python implementation (based
+on bisect) is used.
+"""
+
+from bisect import bisect_left
+from itertools import chain
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# initial capacity (in samples) of the samples array
+DEFAULT_CAPACITY = 256
+
+# below this number of samples the pure-Python implementation is faster
+NUMPY_THRESHOLD = 64
+
+
+class BinClassifier:
+    """Classify (size, count) samples in bins.
+
+    Attributes:
+        bins: the bins upper bounds (monotonically increasing)
+        use_numpy: use the NumPy implementation (default if available)
+    """
+
+    def __init__(self, bins, use_numpy=None):
+
+        self.bins = list(bins)
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+
+        if self.use_numpy:
+            self.__bins = numpy.array(self.bins, dtype=numpy.int64)
+            self.__samples = numpy.empty(2 * DEFAULT_CAPACITY,
+                                         dtype=numpy.int64)
+
+    def classify(self, samples):
+        """Return the bytes and packets per bin as two lists."""
+
+        if self.use_numpy and len(samples) >= NUMPY_THRESHOLD:
+            return self.__classify_numpy(samples)
+
+        return self.__classify_python(samples)
+
+    def __classify_python(self, samples):
+        """Pure-Python implementation."""
+
+        nb_bins = len(self.bins)
+        out_bytes = [0] * nb_bins
+        out_packets = [0] * nb_bins
+
+        for entry in samples:
+            if not entry:
+                continue
+            size = entry[0]
+            count = entry[1]
+            i = bisect_left(self.bins, size)
+            if i < nb_bins:
+                out_bytes[i] += size * count
+                out_packets[i] += count
+
+        return out_bytes, out_packets
+
+    def __classify_numpy(self, samples):
+        """NumPy implementation."""
+
+        nb_samples = len(samples)
+        nb_bins = len(self.bins)
+
+        if 2 * nb_samples > len(self.__samples):
+            self.__samples = numpy.empty(4 * nb_samples, dtype=numpy.int64)
+
+        # samples are flattened as size, count, size, count, ...
+        data = self.__samples[:2 * nb_samples]
+        data[:] = list(chain.from_iterable(samples))
+
+        sizes = data[0::2]
+        counts = data[1::2]
+
+        # the last bin collects the samples to be discarded
+        idx = numpy.searchsorted(self.__bins, sizes)
+
+        out_packets = numpy.bincount(idx, weights=counts,
+                                     minlength=nb_bins + 1)
+        out_bytes = numpy.bincount(idx, weights=sizes * counts,
+                                   minlength=nb_bins + 1)
+
+        return (out_bytes[:nb_bins].astype(numpy.int64).tolist(),
+                out_packets[:nb_bins].astype(numpy.int64).tolist())
+
+    def rates(self, delta, last, current):
+        """Return the per-second rates between the last and current values."""
+
+        if self.use_numpy:
+            diff = numpy.subtract(current, last, dtype=numpy.float64)
+            return (diff / delta).tolist()
+
+        return [(cur - old) / delta for old, cur in zip(last, current)]
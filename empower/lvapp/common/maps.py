@@ -173,7 +173,7 @@ class Maps(ModulePeriodic):
                       self.MODULE_NAME, self.block, self.module_id)
 
         msg = POLLER_REQUEST.build(req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def handle_response(self, response):
         """Handle an incoming poller response message.
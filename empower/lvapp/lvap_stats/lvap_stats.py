@@ -112,27 +112,27 @@ class LVAPStats(ModulePeriodic):
 
         return out
 
-    def run_once(self):
-        """Send out rate request."""
+    def poll(self):
+        """Return rate request."""
 
         if self.tenant_id not in RUNTIME.tenants:
             self.log.info("Tenant %s not found", self.tenant_id)
             self.unload()
-            return
+            return None
 
         tenant = RUNTIME.tenants[self.tenant_id]
 
         if self.lvap not in tenant.lvaps:
             self.log.info("LVNF %s not found", self.lvap)
             self.unload()
-            return
+            return None
 
         lvap = tenant.lvaps[self.lvap]
 
         if not lvap.wtp.connection or lvap.wtp.connection.stream.closed():
             self.log.info("WTP %s not connected", lvap.wtp.addr)
             self.unload()
-            return
+            return None
 
         rates_req = Container(version=PT_VERSION,
                               type=PT_RATES_REQUEST,
@@ -145,7 +145,8 @@ class LVAPStats(ModulePeriodic):
                       lvap.addr, lvap.wtp.addr, self.module_id)
 
         msg = RATES_REQUEST.build(rates_req)
-        lvap.wtp.connection.stream.write(msg)
+
+        return (lvap.wtp.connection, msg)
 
     def handle_response(self, response):
         """Handle an incoming RATES_RESPONSE message.
@@ -176,6 +177,11 @@ class LVAPStats(ModulePeriodic):
         self.best_prob = \
             max([k for k, v in self.rates.items() if v['prob'] == max_val])
 
+        # save time series
+        metrics = {'prob/%s' % k: v['prob'] for k, v in self.rates.items()}
+        metrics['best_prob'] = self.best_prob
+        self.save_series(self.lvap, metrics)
+
         # call callback
         self.handle_callback(self)
 
@@ -205,4 +211,5 @@ setattr(EmpowerApp, LVAPStats.MODULE_NAME, bound_lvap_stats)
 def launch():
     """ Initialize the module. """
 
-    return LVAPStatsWorker(LVAPStats, PT_RATES_RESPONSE, RATES_RESPONSE)
+    return LVAPStatsWorker(LVAPStats, PT_RATES_RESPONSE, RATES_RESPONSE,
+                          batched=True)
@@ -18,7 +18,6 @@
 """LVAP Connection."""
 
 import time
-import tornado.ioloop
 
 from construct import Container
 
@@ -32,6 +31,12 @@ from empower.datatypes.ssid import WIFI_NWID_MAXSIZE
 from empower.core.resourcepool import ResourceBlock
 from empower.core.datapath import Datapath
 from empower.core.networkport import NetworkPort
+from empower.core.framing import FrameBuffer
+from empower.core.framing import DEFAULT_CHUNK_SIZE
+from empower.core.framing import OutputBuffer
+from empower.core.reconciler import Reconciler
+from empower.core.timerwheel import PeriodicTimer
+from empower.core.metrics import METRICS
 from empower.core.utils import get_xid
 from empower.lvapp import HEADER
 from empower.lvapp import PT_VERSION
@@ -51,7 +56,6 @@ from empower.lvapp import PT_SET_SLICE
 from empower.lvapp import PT_DEL_SLICE
 from empower.lvapp import PT_TRANSMISSION_POLICY_STATUS_REQUEST
 from empower.lvapp import PT_HELLO
-from empower.lvapp import PT_TYPES
 from empower.lvapp import PT_DEL_VAP
 from empower.lvapp import PT_CAPS_RESPONSE
 from empower.lvapp import PT_SLICE_STATUS_REQUEST
@@ -72,11 +76,16 @@ from empower.lvapp import PROBE_RESPONSE
 from empower.lvapp import AUTH_RESPONSE
 from empower.lvapp import ASSOC_RESPONSE
 from empower.lvapp import DEL_SLICE
-from empower.core.tenant import T_TYPE_SHARED
 from empower.core.tenant import T_TYPE_UNIQUE
+from empower.core.eventbus import EVENT_BUS
+from empower.core.eventbus import EV_WTP_UP
+from empower.core.eventbus import EV_WTP_DOWN
 
 from empower.main import RUNTIME
 
+# messages written right away instead of at the end of the IOLoop iteration
+FLUSH_TYPES = {PT_PROBE_RESPONSE, PT_AUTH_RESPONSE, PT_ASSOC_RESPONSE}
+
 
 class LVAPPConnection:
     """LVAPP Connection.
@@ -116,6 +125,9 @@ class LVAPPConnection:
 
     Attributes:
         stream: The stream object used to talk with the WTP.
+        output: The output buffer coalescing the messages sent to the WTP.
+        reconciler: The reconciler pushing the VAPs and the slices missing
+            on the WTP after the status replies have been collected.
         addr: The connection source address, i.e. the WTP IP address.
         server: Pointer to the server object.
         wtp: Pointer to a WTP object.
@@ -124,14 +136,16 @@ class LVAPPConnection:
     def __init__(self, stream, addr, server):
         self.stream = stream
         self.stream.set_nodelay(True)
+        self.output = OutputBuffer(self.stream)
+        self.reconciler = Reconciler(self.reconcile)
         self.addr = addr
         self.server = server
         self.wtp = None
         self.stream.set_close_callback(self._on_disconnect)
-        self.__buffer = b''
+        self.framer = FrameBuffer(HEADER.sizeof(), length_offset=2)
         self._hb_interval_ms = 500
-        self._hb_worker = tornado.ioloop.PeriodicCallback(self._heartbeat_cb,
-                                                          self._hb_interval_ms)
+        self._hb_worker = PeriodicTimer(self._heartbeat_cb,
+                                        self._hb_interval_ms)
         self._hb_worker.start()
         self._wait()
         self.log = empower.logger.get_logger()
@@ -141,6 +155,15 @@ class LVAPPConnection:
 
         return self.addr
 
+    def write(self, data, flush=False):
+        """Write an encoded message to the WTP.
+
+        Messages are coalesced and written at the end of the current IOLoop
+        iteration unless flush is True.
+        """
+
+        self.output.write(data, flush)
+
     def _heartbeat_cb(self):
         """ Check if wtp connection is still active. Disconnect if no hellos
         have been received from the wtp for twice the hello period. """
@@ -152,22 +175,19 @@ class LVAPPConnection:
                               self.addr)
                 self.stream.close()
 
-    def _on_read(self, line):
-        """ Appends bytes read from socket to a buffer. Once the full packet
-        has been read the parser is invoked and the buffers is cleared. The
-        parsed packet is then passed to the suitable method or dropped if the
-        packet type in unknown. """
-
-        self.__buffer = self.__buffer + line
-        hdr = HEADER.parse(self.__buffer)
+    def _on_read(self, data):
+        """ Appends bytes read from socket to the framing buffer. Every
+        complete frame in the buffer is then passed to the suitable method
+        or dropped if the packet type in unknown. Incomplete frames are left
+        in the buffer until the remaining bytes are received. """
 
-        if len(self.__buffer) < hdr.length:
-            remaining = hdr.length - len(self.__buffer)
-            self.stream.read_bytes(remaining, self._on_read)
-            return
+        self.framer.feed(data)
 
         try:
-            self._trigger_message(hdr.type)
+            for frame in self.framer.split():
+                self._trigger_message(frame[1], frame)
+                if self.stream.closed():
+                    break
         except Exception as ex:
             self.log.exception(ex)
             self.stream.close()
@@ -175,7 +195,7 @@ class LVAPPConnection:
         if not self.stream.closed():
             self._wait()
 
-    def _trigger_message(self, msg_type):
+    def _trigger_message(self, msg_type, frame):
 
         if msg_type not in self.server.pt_types:
             self.log.error("Unknown message type %u", msg_type)
@@ -185,9 +205,15 @@ class LVAPPConnection:
 
             msg_name = self.server.pt_types[msg_type].name
 
-            msg = self.server.pt_types[msg_type].parse(self.__buffer)
+            start = None
+            if METRICS.sampling and METRICS.sample("lvapp", msg_name):
+                start = time.perf_counter()
+
+            msg = self.server.pt_types[msg_type].parse(frame)
             addr = EtherAddress(msg.wtp)
 
+            parsed = time.perf_counter() if start is not None else None
+
             try:
                 wtp = RUNTIME.wtps[addr]
             except KeyError:
@@ -203,52 +229,59 @@ class LVAPPConnection:
                               msg.seq)
                 return
 
-            self.log.info("Got %s message from %s seq %u",
-                          msg_name,
-                          EtherAddress(addr),
-                          msg.seq)
+            if empower.logger.SAMPLER.sample(msg_name):
+                self.log.info("Got %s message from %s seq %u",
+                              msg_name,
+                              EtherAddress(addr),
+                              msg.seq)
 
             valid = [PT_HELLO, PT_CAPS_RESPONSE]
             if not wtp.is_online() and msg_type not in valid:
                 self.log.info("WTP %s not ready", wtp.addr)
                 return
 
-            handler_name = "_handle_%s" % self.server.pt_types[msg_type].name
+            handler = getattr(self, "_handle_%s" % msg_name, None)
+            handlers = self.server.pt_types_handlers.get(msg_type, [])
+
+            if start is not None:
+                fanout = METRICS.dispatch(handler, handlers, wtp, msg)
+                METRICS.record("lvapp", msg_name, addr, start, parsed, fanout)
+                return
 
-            if hasattr(self, handler_name):
-                handler = getattr(self, handler_name)
+            if METRICS.sampling:
+                METRICS.record("lvapp", msg_name, addr)
+
+            if handler:
                 handler(wtp, msg)
 
-            if msg_type in self.server.pt_types_handlers:
-                for handler in self.server.pt_types_handlers[msg_type]:
-                    handler(wtp, msg)
+            for chained in handlers:
+                chained(wtp, msg)
 
     def _wait(self):
         """ Wait for incoming packets on signalling channel """
-        self.__buffer = b''
-        self.stream.read_bytes(6, self._on_read)
+        self.stream.read_bytes(DEFAULT_CHUNK_SIZE, self._on_read,
+                               partial=True)
 
     def _on_disconnect(self):
         """ Handle WTP disconnection """
 
+        self._hb_worker.stop()
+        self.reconciler.stop()
+
         if not self.wtp:
             return
 
         self.log.info("WTP disconnected: %s", self.wtp.addr)
 
         # remove hosted lvaps
-        for lvap in list(RUNTIME.lvaps.values()):
-            wtps = [x.radio for x in lvap.blocks]
-            if self.wtp in wtps:
-                RUNTIME.remove_lvap(lvap.addr)
+        for lvap in RUNTIME.find_lvaps_by_wtp(self.wtp.addr):
+            RUNTIME.remove_lvap(lvap.addr)
 
         # remove hosted vaps
-        for tenant_id in list(RUNTIME.tenants.keys()):
-            for vap_id in list(RUNTIME.tenants[tenant_id].vaps.keys()):
-                vap = RUNTIME.tenants[tenant_id].vaps[vap_id]
-                if vap.block.radio == self.wtp:
-                    self.log.info("Deleting VAP: %s", vap.bssid)
-                    del RUNTIME.tenants[tenant_id].vaps[vap.bssid]
+        for block in self.wtp.supports:
+            for vap in RUNTIME.find_vaps_by_block(block):
+                self.log.info("Deleting VAP: %s", vap.bssid)
+                RUNTIME.remove_vap(vap)
 
         # reset state
         self.wtp.set_disconnected()
@@ -261,7 +294,7 @@ class LVAPPConnection:
     def send_message(self, msg_type, msg):
         """Send message and set common parameters."""
 
-        parser = PT_TYPES[msg_type]
+        parser = self.server.pt_types[msg_type]
 
         if self.stream.closed():
             self.log.warning("Stream closed, unabled to send %s message to %s",
@@ -272,12 +305,13 @@ class LVAPPConnection:
         msg.seq = self.wtp.seq
         msg.type = msg_type
 
-        self.log.info("Sending %s message to %s seq %u",
-                      parser.name,
-                      self.wtp,
-                      msg.seq)
+        if empower.logger.SAMPLER.sample(parser.name):
+            self.log.info("Sending %s message to %s seq %u",
+                          parser.name,
+                          self.wtp,
+                          msg.seq)
 
-        self.stream.write(parser.build(msg))
+        self.write(parser.build(msg), msg_type in FLUSH_TYPES)
 
         if hasattr(msg, 'module_id'):
             return msg.module_id
@@ -407,14 +441,32 @@ class LVAPPConnection:
         # fetch active tramission policies
         self.send_transmission_policy_status_request()
 
+        # send vaps and slices once the status replies have been received
+        self.reconciler.start()
+
+    def reconcile(self):
+        """Push the VAPs and the slices missing on the WTP."""
+
+        if not self.wtp or not self.wtp.is_online() or self.stream.closed():
+            return
+
+        sent = self.reconciler.sent
+
         # send vaps
         self.update_vaps()
 
         # send slices
         self.update_slices()
 
+        self.log.info("WTP %s reconciled (%u objects reported, %u sent)",
+                      self.wtp.addr, len(self.reconciler.reported),
+                      self.reconciler.sent - sent)
+
     def update_vaps(self):
-        """Update active VAPs."""
+        """Update active VAPs.
+
+        VAPs reported by the WTP with the same block and SSID are not sent.
+        """
 
         for tenant in RUNTIME.tenants.values():
 
@@ -430,17 +482,23 @@ class LVAPPConnection:
 
                 bssid = tenant.generate_bssid(block.hwaddr)
 
-                # vap has already been created
-                if bssid in tenant.vaps:
-                    continue
+                if bssid not in tenant.vaps:
+                    RUNTIME.add_vap(VAP(bssid, block, tenant))
 
-                vap = VAP(bssid, block, tenant)
+                vap = tenant.vaps[bssid]
 
-                self.send_add_vap(vap)
-                tenant.vaps[bssid] = vap
+                key = ("vap", bssid)
+                value = (block.hwaddr, block.channel, block.band,
+                         tenant.tenant_name)
+
+                if self.reconciler.outdated(key, value):
+                    self.send_add_vap(vap)
 
     def update_slices(self):
-        """Update active Slices."""
+        """Update active Slices.
+
+        Slices reported by the WTP with the same properties are not sent.
+        """
 
         for tenant in RUNTIME.tenants.values():
 
@@ -454,8 +512,15 @@ class LVAPPConnection:
                 if not slc.wifi['wtps'] or \
                     (slc.wifi['wtps'] and self.wtp.addr in slc.wifi['wtps']):
 
+                    value = self.slice_properties(slc)
+
                     for block in self.wtp.supports:
-                        self.wtp.connection.send_set_slice(block, slc)
+
+                        key = ("slice", block.hwaddr, block.channel,
+                               block.band, tenant.tenant_name, slc.dscp)
+
+                        if self.reconciler.outdated(key, value):
+                            self.send_set_slice(block, slc)
 
     def _handle_probe_request(self, wtp, request):
         """Handle an incoming PROBE_REQUEST message.
@@ -472,14 +537,22 @@ class LVAPPConnection:
             self.log.warning("No valid intersection found. Ignoring request.")
             return
 
-        # check is station is in ACL
         sta = EtherAddress(request.sta)
+        incoming_ssid = SSID(request.ssid)
 
-        if not RUNTIME.is_allowed(sta):
+        probes = self.server.probes
+
+        # the same probe has just been reported by another wtp, only the
+        # wtp hosting the lvap needs to answer
+        if probes.is_duplicate(sta, incoming_ssid):
+            lvap = RUNTIME.lvaps.get(sta)
+            if lvap and lvap.wtp == wtp:
+                self.send_probe_response(lvap, incoming_ssid)
             return
 
-        # Requested BSSID
-        incoming_ssid = SSID(request.ssid)
+        # check is station is in ACL
+        if not RUNTIME.is_allowed(sta):
+            return
 
         if incoming_ssid == b'':
             self.log.info("Probe request from %s ssid %s", sta, "Broadcast")
@@ -487,16 +560,7 @@ class LVAPPConnection:
             self.log.info("Probe request from %s ssid %s", sta, incoming_ssid)
 
         # generate list of available networks
-        networks = list()
-
-        for tenant in RUNTIME.tenants.values():
-            if tenant.bssid_type == T_TYPE_SHARED:
-                continue
-            for wtp_in_tenant in tenant.wtps.values():
-                if wtp.addr == wtp_in_tenant.addr:
-                    bssid = tenant.generate_bssid(sta)
-                    ssid = tenant.tenant_name
-                    networks.append((bssid, ssid))
+        networks = probes.networks(wtp, sta)
 
         if not networks:
             self.log.info("No Networks available at this WTP")
@@ -526,10 +590,15 @@ class LVAPPConnection:
 
             return
 
-        # Update networks
+        # Update networks (if changed)
         lvap = RUNTIME.lvaps[sta]
-        lvap.networks = networks
-        lvap.commit()
+
+        if lvap.networks != networks:
+            lvap.networks = networks
+            lvap.commit()
+            probes.commits.inc()
+        else:
+            probes.unchanged.inc()
 
         # Send probe response
         if lvap.wtp == wtp:
@@ -564,36 +633,15 @@ class LVAPPConnection:
             return
 
         # Otherwise check if the requested BSSID belongs to a unique tenant
-        for tenant in RUNTIME.tenants.values():
-
-            if tenant.bssid_type == T_TYPE_SHARED:
-                continue
-
-            bssid = tenant.generate_bssid(lvap.addr)
-
-            if bssid == incoming_bssid:
-                lvap.bssid = incoming_bssid
-                lvap.authentication_state = True
-                lvap.association_state = False
-                lvap.ssid = None
-                lvap.commit()
-                self.send_auth_response(lvap)
-                return
-
-        # Finally check if this is a shared bssid
-        for tenant in RUNTIME.tenants.values():
-
-            if tenant.bssid_type == T_TYPE_UNIQUE:
-                continue
-
-            if incoming_bssid in tenant.vaps:
-                lvap.bssid = incoming_bssid
-                lvap.authentication_state = True
-                lvap.association_state = False
-                lvap.ssid = None
-                lvap.commit()
-                self.send_auth_response(lvap)
-                return
+        # or to a shared VAP
+        if RUNTIME.find_bssid(incoming_bssid, lvap.addr):
+            lvap.bssid = incoming_bssid
+            lvap.authentication_state = True
+            lvap.association_state = False
+            lvap.ssid = None
+            lvap.commit()
+            self.send_auth_response(lvap)
+            return
 
         self.log.info("Auth request from unknown BSSID %s", incoming_bssid)
 
@@ -621,17 +669,14 @@ class LVAPPConnection:
 
         incoming_ssid = SSID(request.ssid)
 
-        # Check if the requested SSID is from a unique tenant
-        for tenant in RUNTIME.tenants.values():
+        networks = RUNTIME.find_bssid(incoming_bssid, lvap.addr)
 
-            if tenant.bssid_type == T_TYPE_SHARED:
-                continue
-
-            bssid = tenant.generate_bssid(lvap.addr)
+        if not networks:
+            self.log.info("Invalid BSSID %s", incoming_bssid)
+            return
 
-            if bssid != incoming_bssid:
-                self.log.info("Invalid BSSID %s", incoming_bssid)
-                continue
+        # Check if the requested SSID is from a unique tenant or a shared VAP
+        for tenant, _ in networks:
 
             if tenant.tenant_name == incoming_ssid:
                 lvap.bssid = incoming_bssid
@@ -643,28 +688,6 @@ class LVAPPConnection:
                 self.send_assoc_response(lvap)
                 return
 
-        # Check if the requested SSID is from a unique tenant
-        for tenant in RUNTIME.tenants.values():
-
-            if tenant.bssid_type == T_TYPE_UNIQUE:
-                continue
-
-            if incoming_bssid not in tenant.vaps:
-                self.log.info("Invalid BSSID %s", incoming_bssid)
-                continue
-
-            ssid = tenant.vaps[incoming_bssid].ssid
-
-            if ssid == incoming_ssid:
-                lvap.bssid = incoming_bssid
-                lvap.authentication_state = True
-                lvap.association_state = True
-                lvap.ssid = incoming_ssid
-                lvap.supported_band = request.supported_band
-                lvap.commit()
-                self.send_assoc_response(lvap)
-                return
-
         self.log.info("Unable to find SSID %s", incoming_ssid)
 
     def _handle_status_lvap(self, wtp, status):
@@ -717,9 +740,9 @@ class LVAPPConnection:
             lvap.blocks[0].radio.connection.send_del_lvap(sta)
 
         if set_mask:
-            lvap._downlink = valid[0]
+            lvap._set_blocks(valid[0], lvap._uplink)
         else:
-            lvap._uplink.append(valid[0])
+            lvap._set_blocks(lvap._downlink, lvap._uplink + [valid[0]])
 
         # if this is not a DL+UL block then stop here
         if not set_mask:
@@ -807,6 +830,15 @@ class LVAPPConnection:
             self.send_del_slice(valid[0], ssid, dscp)
             return
 
+        # while reconciling the reported state does not override the
+        # desired one
+        if self.reconciler.is_pending():
+            key = ("slice", EtherAddress(status.hwaddr), status.channel,
+                   status.band, ssid, dscp)
+            value = (bool(status.flags.amsdu_aggregation), status.quantum)
+            self.reconciler.report(key, value)
+            return
+
         slc = tenant.slices[dscp]
 
         if wtp.addr not in slc.wifi['wtps']:
@@ -846,11 +878,16 @@ class LVAPPConnection:
 
         # If the VAP does not exists, then create a new one
         if bssid not in tenant.vaps:
-            vap = VAP(bssid, valid, tenant)
-            tenant.vaps[bssid] = vap
+            vap = VAP(bssid, valid[0], tenant)
+            RUNTIME.add_vap(vap)
 
         vap = tenant.vaps[bssid]
 
+        if self.reconciler.is_pending():
+            self.reconciler.report(("vap", bssid),
+                                   (EtherAddress(status.hwaddr),
+                                    status.channel, status.band, ssid))
+
         self.log.info("VAP status %s", vap)
 
     def send_caps_request(self):
@@ -1015,9 +1052,7 @@ class LVAPPConnection:
     def send_bye_message_to_self(self):
         """Send a unsollicited BYE message to senf."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.wtp_down(self.wtp)
+        EVENT_BUS.publish(EV_WTP_DOWN, None, self.wtp)
 
         for handler in self.server.pt_types_handlers[PT_BYE]:
             handler(self.wtp)
@@ -1025,17 +1060,13 @@ class LVAPPConnection:
     def send_register_message_to_self(self):
         """Send a unsollicited REGISTER message to senf."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.wtp_up(self.wtp)
+        EVENT_BUS.publish(EV_WTP_UP, None, self.wtp)
 
         for handler in self.server.pt_types_handlers[PT_REGISTER]:
             handler(self.wtp)
 
-    def send_set_slice(self, block, slc):
-        """Send an SET_SLICE message."""
-
-        ssid = slc.tenant.tenant_name
+    def slice_properties(self, slc):
+        """Return the (amsdu_aggregation, quantum) of a slice on this WTP."""
 
         amsdu_aggregation = slc.wifi['static-properties']['amsdu_aggregation']
         quantum = slc.wifi['static-properties']['quantum']
@@ -1050,6 +1081,15 @@ class LVAPPConnection:
             if 'quantum' in static:
                 quantum = static['quantum']
 
+        return bool(amsdu_aggregation), int(quantum)
+
+    def send_set_slice(self, block, slc):
+        """Send an SET_SLICE message."""
+
+        ssid = slc.tenant.tenant_name
+
+        amsdu_aggregation, quantum = self.slice_properties(slc)
+
         flags = Container(amsdu_aggregation=amsdu_aggregation)
 
         msg = Container(length=SET_SLICE.sizeof(),
@@ -24,7 +24,19 @@ from empower.core.pnfpserver import BasePNFDevHandler
 from empower.restserver.restserver import RESTServer
 from empower.core.pnfpserver import PNFPServer
 from empower.core.module import ModuleWorker
+from empower.core.codec import CODEC_STRUCT
+from empower.core.codec import CODECS
+from empower.core.codec import Codec
+from empower.core.codec import compile_parser
+from empower.core.codec import compile_pt_types
+from empower.core.eventbus import EVENT_BUS
+from empower.core.eventbus import EV_LVAP_JOIN
+from empower.core.eventbus import EV_LVAP_LEAVE
+from empower.core.eventbus import EV_LVAP_HANDOVER
 from empower.lvapp.lvappconnection import LVAPPConnection
+from empower.lvapp.probefilter import ProbeFilter
+from empower.restserver.apihandlers import EmpowerAPIHandler
+from empower.restserver.validate import validate
 from empower.persistence.persistence import TblWTP
 from empower.core.wtp import WTP
 
@@ -55,12 +67,32 @@ class WTPHandler(BasePNFDevHandler):
                 (r"/api/v1/wtps/([a-zA-Z0-9:]*)/?")]
 
 
+class ProbesHandler(EmpowerAPIHandler):
+    """Probes handler. Used to view the probe request counters."""
+
+    HANDLERS = [r"/api/v1/probes/?"]
+
+    @validate()
+    def get(self, *args, **kwargs):
+        """Show the number (total and last second) of probe requests
+        received, handled, and suppressed as duplicates.
+
+        Args:
+            None
+
+        Example URLs:
+            GET /api/v1/probes
+        """
+
+        return self.server.probes
+
+
 class ModuleLVAPPWorker(ModuleWorker):
     """Module worker (LVAP Server version)."""
 
-    def __init__(self, module, pt_type, pt_packet=None):
+    def __init__(self, module, pt_type, pt_packet=None, batched=False):
         ModuleWorker.__init__(self, LVAPPServer.__module__, module, pt_type,
-                              pt_packet)
+                              pt_packet, batched)
 
     def handle_packet(self, pnfdev, message):
         """Handle response message."""
@@ -77,20 +109,38 @@ class ModuleLVAPPWorker(ModuleWorker):
 
 
 class LVAPPServer(PNFPServer, TCPServer):
-    """Exposes the LVAP API."""
+    """Exposes the LVAP API.
+
+    Attributes:
+        codec: the codec used for the LVAPP messages (construct or struct)
+        probes: the probe request filter shared by all the connections
+    """
 
     PNFDEV = WTP
     TBL_PNFDEV = TblWTP
 
-    def __init__(self, port, pt_types, pt_types_handlers):
+    def __init__(self, port, pt_types, pt_types_handlers, codec=CODEC_STRUCT):
 
-        PNFPServer.__init__(self, port, pt_types, pt_types_handlers)
+        PNFPServer.__init__(self, port, compile_pt_types(pt_types, codec),
+                            pt_types_handlers)
         TCPServer.__init__(self)
 
+        self.codec = codec
         self.connection = None
+        self.probes = ProbeFilter()
 
         self.listen(self.port)
 
+    def register_message(self, pt_type, parser, handler):
+        """Register new handler compiling the parser if necessary."""
+
+        if self.codec == CODEC_STRUCT:
+            parser = compile_parser(parser)
+        elif isinstance(parser, Codec):
+            parser = parser.parser
+
+        super().register_message(pt_type, parser, handler)
+
     def handle_stream(self, stream, address):
         self.log.info('Incoming connection from %r', address)
         self.connection = LVAPPConnection(stream, address, server=self)
@@ -99,9 +149,8 @@ class LVAPPServer(PNFPServer, TCPServer):
     def send_lvap_leave_message_to_self(self, lvap):
         """Send an LVAP_LEAVE message to self."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.lvap_leave(lvap)
+        if lvap.tenant:
+            EVENT_BUS.publish(EV_LVAP_LEAVE, lvap.tenant.tenant_id, lvap)
 
         for handler in self.pt_types_handlers[PT_LVAP_LEAVE]:
             handler(lvap)
@@ -109,9 +158,8 @@ class LVAPPServer(PNFPServer, TCPServer):
     def send_lvap_join_message_to_self(self, lvap):
         """Send an LVAP_JOIN message to self."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.lvap_join(lvap)
+        if lvap.tenant:
+            EVENT_BUS.publish(EV_LVAP_JOIN, lvap.tenant.tenant_id, lvap)
 
         for handler in self.pt_types_handlers[PT_LVAP_JOIN]:
             handler(lvap)
@@ -119,24 +167,30 @@ class LVAPPServer(PNFPServer, TCPServer):
     def send_lvap_handover_message_to_self(self, lvap, source_blocks):
         """Send an LVAP_HANDOVER message to self."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.lvap_handover(lvap, source_blocks)
+        if lvap.tenant:
+            EVENT_BUS.publish(EV_LVAP_HANDOVER, lvap.tenant.tenant_id, lvap,
+                              source_blocks)
 
         for handler in self.pt_types_handlers[PT_LVAP_HANDOVER]:
             handler(lvap, source_blocks)
 
 
-def launch(port=DEFAULT_PORT):
+def launch(port=DEFAULT_PORT, codec=CODEC_STRUCT):
     """Start LVAPP Server Module."""
 
-    server = LVAPPServer(int(port), PT_TYPES, PT_TYPES_HANDLERS)
+    if codec not in CODECS:
+        raise ValueError("Invalid codec %s, expected one of %s" %
+                         (codec, ", ".join(CODECS)))
+
+    server = LVAPPServer(int(port), PT_TYPES, PT_TYPES_HANDLERS, codec)
 
     rest_server = RUNTIME.components[RESTServer.__module__]
     rest_server.add_handler_class(TenantWTPHandler, server)
     rest_server.add_handler_class(WTPHandler, server)
     rest_server.add_handler_class(LVAPHandler, server)
     rest_server.add_handler_class(TenantLVAPHandler, server)
+    rest_server.add_handler_class(ProbesHandler, server)
 
-    server.log.info("LVAP Server available at %u", server.port)
+    server.log.info("LVAP Server available at %u (%s codec)", server.port,
+                    server.codec)
     return server
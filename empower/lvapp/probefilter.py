@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Probe request pipeline.
+
+A station probing on every channel is reported by every WTP within range.
+The ProbeFilter keeps the state shared by all the WTP connections:
+
+  - the list of tenants offering a network at each WTP, cached until the
+    runtime generation changes (i.e. tenants or WTPs are added/removed);
+  - the probes received in the last window seconds, indexed by station and
+    SSID, so that the same probe reported by many WTPs is processed once.
+"""
+
+import time
+
+from collections import OrderedDict
+
+from empower.core.tenant import T_TYPE_SHARED
+
+from empower.main import RUNTIME
+
+# probes from the same station for the same SSID received within this
+# interval (in seconds) are processed only once
+DEFAULT_WINDOW = 0.1
+
+
+class ProbeCounter:
+    """A counter reporting also the rate over the last second.
+
+    Attributes:
+        total: the number of events
+        rate: the number of events in the last complete second
+    """
+
+    def __init__(self):
+
+        self.total = 0
+        self.__second = 0
+        self.__count = 0
+        self.__last = 0
+
+    def __roll(self, now):
+        """Move to the current second."""
+
+        second = int(now)
+
+        if second == self.__second:
+            return
+
+        self.__last = self.__count if second == self.__second + 1 else 0
+        self.__second = second
+        self.__count = 0
+
+    def inc(self, now=None):
+        """Count one event."""
+
+        self.__roll(now if now is not None else time.time())
+
+        self.total += 1
+        self.__count += 1
+
+    @property
+    def rate(self):
+        """Return the number of events in the last complete second."""
+
+        self.__roll(time.time())
+
+        return self.__last
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'total': self.total,
+                'rate': self.rate}
+
+
+class ProbeFilter:
+    """Probe request filter.
+
+    Attributes:
+        window: the deduplication window (s)
+        received: the probes received
+        handled: the probes processed
+        suppressed: the probes dropped as duplicates
+        commits: the LVAP updates sent to the WTPs
+        unchanged: the LVAP updates skipped since the networks did not change
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+
+        self.window = window
+
+        self.received = ProbeCounter()
+        self.handled = ProbeCounter()
+        self.suppressed = ProbeCounter()
+        self.commits = ProbeCounter()
+        self.unchanged = ProbeCounter()
+
+        self.__tenants = {}
+        self.__recent = OrderedDict()
+
+    def tenants(self, wtp):
+        """Return the tenants offering a network at the specified WTP."""
+
+        cached = self.__tenants.get(wtp.addr)
+
+        if cached and cached[0] == RUNTIME.generation:
+            return cached[1]
+
+        tenants = [tenant for tenant in RUNTIME.tenants.values()
+                   if tenant.bssid_type != T_TYPE_SHARED and
+                   wtp.addr in tenant.wtps]
+
+        self.__tenants[wtp.addr] = (RUNTIME.generation, tenants)
+
+        return tenants
+
+    def networks(self, wtp, sta):
+        """Return the (bssid, ssid) pairs available to sta at wtp."""
+
+        return [(tenant.generate_bssid(sta), tenant.tenant_name)
+                for tenant in self.tenants(wtp)]
+
+    def is_duplicate(self, sta, ssid):
+        """Return True if the same probe was received in the last window."""
+
+        now = time.time()
+
+        self.received.inc(now)
+
+        # entries are ordered by expiry time
+        while self.__recent:
+            key = next(iter(self.__recent))
+            if self.__recent[key] > now:
+                break
+            del self.__recent[key]
+
+        key = (sta, ssid)
+
+        if key in self.__recent:
+            self.suppressed.inc(now)
+            return True
+
+        self.__recent[key] = now + self.window
+        self.handled.inc(now)
+
+        return False
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'window': self.window,
+                'pending': len(self.__recent),
+                'cached_wtps': len(self.__tenants),
+                'received': self.received,
+                'handled': self.handled,
+                'suppressed': self.suppressed,
+                'commits': self.commits,
+                'unchanged': self.unchanged}
@@ -211,7 +211,7 @@ class RSSI(ModuleTrigger):
         self.wtps.append(wtp)
 
         msg = ADD_RSSI_TRIGGER.build(req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def remove_rssi_from_wtp(self, wtp):
         """Remove RSSI to WTP."""
@@ -234,7 +234,7 @@ class RSSI(ModuleTrigger):
         self.wtps.remove(wtp)
 
         msg = DEL_RSSI_TRIGGER.build(req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def handle_response(self, response):
         """ Handle an incoming RSSI_TRIGGER message.
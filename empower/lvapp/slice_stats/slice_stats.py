@@ -184,7 +184,7 @@ class SliceStats(ModulePeriodic):
                               ssid=tenant.tenant_name.to_raw())
 
         msg = SLICE_STATS_REQUEST.build(stats_req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def handle_response(self, response):
         """Handle an incoming STATS_RESPONSE message.
@@ -211,6 +211,10 @@ class SliceStats(ModulePeriodic):
 
         slc.wifi['wtps'][wtp_addr]['blocks'][block] = self.slice_stats
 
+        # save time series
+        self.save_series((self.block.hwaddr, self.block.channel,
+                          self.block.band, self.dscp), self.slice_stats)
+
         # call callback
         self.handle_callback(self)
 
@@ -17,6 +17,8 @@
 
 """Summary triggers module."""
 
+from functools import lru_cache
+
 from construct import Container
 from construct import Struct
 from construct import SBInt8
@@ -32,6 +34,12 @@ from construct import BitStruct
 from construct import Padding
 from construct import Bit
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from empower.core.codec import compile_parser
 from empower.core.app import EmpowerApp
 from empower.datatypes.etheraddress import EtherAddress
 from empower.lvapp import PT_VERSION
@@ -87,6 +95,146 @@ DEL_SUMMARY = Struct("del_summary", UBInt8("version"),
                      UBInt32("seq"),
                      UBInt32("module_id"))
 
+# frames are decoded as a structured array when NumPy is available
+SUMMARY_TRIGGER_CODEC = compile_parser(SUMMARY_TRIGGER, columnar=True)
+
+# the mcs bit in the raw flags field
+FLAG_MCS = 0x0200
+
+FRAME_TYPES = {0x00: "MNGT",
+               0x04: "CTRL",
+               0x08: "DATA"}
+
+FRAME_SUBTYPES = {0x00: {0x00: "ASSOCREQ",
+                         0x10: "ASSOCRESP",
+                         0x20: "AUTHREQ",
+                         0x30: "AUTHRESP",
+                         0x40: "PROBEREQ",
+                         0x50: "PROBERESP",
+                         0x80: "BEACON",
+                         0x90: "ATIM",
+                         0xA0: "DISASSOC",
+                         0xB0: "AUTH",
+                         0xC0: "DEAUTH",
+                         0xD0: "ACTION"},
+                  0x08: {0x00: "DATA",
+                         0x40: "DATA",
+                         0x80: "QOS",
+                         0xC0: "QOSNULL"}}
+
+
+@lru_cache(maxsize=None)
+def frame_names(code):
+    """Return the (type, subtype) names of a (type << 8 | subtype) code."""
+
+    ftype, subtype = code >> 8, code & 0xFF
+
+    pt_type = FRAME_TYPES.get(ftype, "DATA (%s)" % ftype)
+
+    if ftype == 0x00:
+        default = "MNGT (%s)" % subtype
+    else:
+        default = "UNKN (%s)" % subtype
+
+    pt_subtype = FRAME_SUBTYPES.get(ftype, {}).get(subtype, default)
+
+    return pt_type, pt_subtype
+
+
+class SummaryFrames:
+    """Columnar summary frames.
+
+    The list of dictionaries is built only when to_list() is called.
+
+    Attributes:
+        columns: the frame columns indexed by name (ra, ta, tsft, seq,
+            rssi, rate, mcs, type, subtype, length). Columns are NumPy
+            arrays if the frames were decoded as a structured array, lists
+            otherwise.
+    """
+
+    def __init__(self, frames):
+
+        if numpy is not None and isinstance(frames, numpy.ndarray):
+            self.columns = self.__from_array(frames)
+        else:
+            self.columns = self.__from_list(frames)
+
+    def __len__(self):
+        return len(self.columns['tsft'])
+
+    @classmethod
+    def __from_array(cls, frames):
+        """Build the columns from a structured array."""
+
+        mcs = (frames['flags'] & FLAG_MCS) != 0
+        rate = numpy.where(mcs, frames['rate'], frames['rate'] / 2.0)
+
+        codes = (frames['type'].astype(numpy.uint16) << 8) | frames['subtype']
+        uniques, inverse = numpy.unique(codes, return_inverse=True)
+        names = numpy.array([frame_names(int(code)) for code in uniques],
+                            dtype=object).reshape(-1, 2)
+
+        return {'ra': frames['ra'],
+                'ta': frames['ta'],
+                'tsft': frames['tsft'],
+                'seq': frames['seq'],
+                'rssi': frames['rssi'],
+                'rate': rate,
+                'mcs': mcs,
+                'type': names[inverse, 0],
+                'subtype': names[inverse, 1],
+                'length': frames['length']}
+
+    @classmethod
+    def __from_list(cls, frames):
+        """Build the columns from a list of sequences."""
+
+        mcs = [bool(recv[3].mcs) for recv in frames]
+        names = [frame_names(recv[7] << 8 | recv[8]) for recv in frames]
+
+        return {'ra': [recv[0] for recv in frames],
+                'ta': [recv[1] for recv in frames],
+                'tsft': [recv[2] for recv in frames],
+                'seq': [recv[4] for recv in frames],
+                'rssi': [recv[5] for recv in frames],
+                'rate': [recv[6] if flag else recv[6] / 2.0
+                         for recv, flag in zip(frames, mcs)],
+                'mcs': mcs,
+                'type': [name[0] for name in names],
+                'subtype': [name[1] for name in names],
+                'length': [recv[9] for recv in frames]}
+
+    def to_list(self):
+        """Return the frames as a list of dictionaries."""
+
+        columns = {}
+
+        for name, column in self.columns.items():
+            if name in ('ra', 'ta'):
+                columns[name] = [EtherAddress(bytes(addr)) for addr in column]
+            elif isinstance(column, list):
+                columns[name] = column
+            else:
+                columns[name] = column.tolist()
+
+        frames = []
+
+        for idx, mcs in enumerate(columns['mcs']):
+            frames.append({'ra': columns['ra'][idx],
+                           'ta': columns['ta'][idx],
+                           'tsft': columns['tsft'][idx],
+                           'seq': columns['seq'][idx],
+                           'rssi': columns['rssi'][idx],
+                           'rate': int(columns['rate'][idx]) if mcs
+                                   else columns['rate'][idx],
+                           'rtype': "HT" if mcs else "LE",
+                           'type': columns['type'][idx],
+                           'subtype': columns['subtype'][idx],
+                           'length': columns['length'][idx]})
+
+        return frames
+
 
 class Summary(ModuleScheduled):
     """ Summary object. """
@@ -105,7 +253,8 @@ class Summary(ModuleScheduled):
         self._period = 2000
 
         # data structures
-        self.frames = []
+        self.columns = None
+        self._frames = None
 
     def __eq__(self, other):
 
@@ -197,6 +346,15 @@ class Summary(ModuleScheduled):
             raise ValueError("Invalid limit value (%u)" % value)
         self._limit = value
 
+    @property
+    def frames(self):
+        """Return the last frames as a list of dictionaries."""
+
+        if self._frames is None:
+            self._frames = self.columns.to_list() if self.columns else []
+
+        return self._frames
+
     def to_dict(self):
         """ Return a JSON-serializable dictionary representing the Summary """
 
@@ -247,7 +405,7 @@ class Summary(ModuleScheduled):
                       self.MODULE_NAME, self.block, self.module_id)
 
         msg = ADD_SUMMARY.build(req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def handle_response(self, response):
         """Handle an incoming response message.
@@ -257,87 +415,8 @@ class Summary(ModuleScheduled):
             None
         """
 
-        self.frames = []
-
-        for recv in response.frames:
-
-            if recv[3].mcs:
-                rate = int(recv[6])
-            else:
-                rate = float(recv[6]) / 2
-
-            if recv[3].mcs:
-                rtype = "HT"
-            else:
-                rtype = "LE"
-
-            if recv[7] == 0x00:
-                pt_type = "MNGT"
-            elif recv[7] == 0x04:
-                pt_type = "CTRL"
-            elif recv[7] == 0x08:
-                pt_type = "DATA"
-            else:
-                pt_type = "DATA (%s)" % recv[7]
-
-            if pt_type == "MNGT":
-
-                if recv[8] == 0x00:
-                    pt_subtype = "ASSOCREQ"
-                elif recv[8] == 0x10:
-                    pt_subtype = "ASSOCRESP"
-                elif recv[8] == 0x20:
-                    pt_subtype = "AUTHREQ"
-                elif recv[8] == 0x30:
-                    pt_subtype = "AUTHRESP"
-                elif recv[8] == 0x40:
-                    pt_subtype = "PROBEREQ"
-                elif recv[8] == 0x50:
-                    pt_subtype = "PROBERESP"
-                elif recv[8] == 0x80:
-                    pt_subtype = "BEACON"
-                elif recv[8] == 0x90:
-                    pt_subtype = "ATIM"
-                elif recv[8] == 0xA0:
-                    pt_subtype = "DISASSOC"
-                elif recv[8] == 0xb0:
-                    pt_subtype = "AUTH"
-                elif recv[8] == 0xc0:
-                    pt_subtype = "DEAUTH"
-                elif recv[8] == 0xd0:
-                    pt_subtype = "ACTION"
-                else:
-                    pt_subtype = "MNGT (%s)" % recv[8]
-
-            elif pt_type == "CTRL":
-
-                pt_subtype = "UNKN (%s)" % recv[8]
-
-            elif pt_type == "DATA":
-
-                if recv[8] == 0x00:
-                    pt_subtype = "DATA"
-                elif recv[8] == 0x40:
-                    pt_subtype = "DATA"
-                elif recv[8] == 0x80:
-                    pt_subtype = "QOS"
-                elif recv[8] == 0xC0:
-                    pt_subtype = "QOSNULL"
-                else:
-                    pt_subtype = "UNKN (%s)" % recv[8]
-
-            frame = {'ra': EtherAddress(recv[0]),
-                     'ta': EtherAddress(recv[1]),
-                     'tsft': recv[2],
-                     'seq': recv[4],
-                     'rssi': recv[5],
-                     'rate': rate,
-                     'rtype': rtype,
-                     'type': pt_type,
-                     'subtype': pt_subtype,
-                     'length': recv[9]}
-
-            self.frames.append(frame)
+        self.columns = SummaryFrames(response.frames)
+        self._frames = None
 
         self.handle_callback(self)
 
@@ -367,4 +446,4 @@ setattr(EmpowerApp, Summary.MODULE_NAME, bound_summary)
 def launch():
     """ Initialize the module. """
 
-    return SummaryWorker(Summary, PT_SUMMARY, SUMMARY_TRIGGER)
+    return SummaryWorker(Summary, PT_SUMMARY, SUMMARY_TRIGGER_CODEC)
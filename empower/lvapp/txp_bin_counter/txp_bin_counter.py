@@ -32,6 +32,7 @@ from empower.core.module import ModulePeriodic
 from empower.core.app import EmpowerApp
 from empower.core.resourcepool import ResourceBlock
 from empower.lvapp import PT_VERSION
+from empower.lvapp.common.bins import BinClassifier
 
 from empower.main import RUNTIME
 
@@ -78,6 +79,7 @@ class TXPBinCounter(ModulePeriodic):
         # parameters
         self._mcast = EtherAddress('ff:ff:ff:ff:ff:ff')
         self._bins = [8192]
+        self._classifier = BinClassifier(self._bins)
         self._block = None
 
         # data structures
@@ -128,6 +130,8 @@ class TXPBinCounter(ModulePeriodic):
                 raise ValueError("bins values must be positive")
 
             self._bins = bins
+            self._classifier = BinClassifier(bins)
+            return
 
         raise ValueError("empty bins")
 
@@ -188,13 +192,13 @@ class TXPBinCounter(ModulePeriodic):
 
         return out
 
-    def run_once(self):
-        """ Send out stats request. """
+    def poll(self):
+        """ Return stats request. """
 
         if self.tenant_id not in RUNTIME.tenants:
             self.log.info("Tenant %s not found", self.tenant_id)
             self.unload()
-            return
+            return None
 
         tenant = RUNTIME.tenants[self.tenant_id]
         wtp = self.block.radio
@@ -202,12 +206,12 @@ class TXPBinCounter(ModulePeriodic):
         if wtp.addr not in tenant.wtps:
             self.log.info("WTP %s not found", wtp.addr)
             self.unload()
-            return
+            return None
 
         if not wtp.connection or wtp.connection.stream.closed():
             self.log.info("WTP %s not connected", wtp.addr)
             self.unload()
-            return
+            return None
 
         stats_req = Container(version=PT_VERSION,
                               type=PT_TXP_BIN_COUNTER_REQUEST,
@@ -225,12 +229,13 @@ class TXPBinCounter(ModulePeriodic):
                       self.module_id)
 
         msg = TXP_BIN_COUNTER_REQUEST.build(stats_req)
-        wtp.connection.stream.write(msg)
+
+        return (wtp.connection, msg)
 
     def fill_bytes_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -239,25 +244,12 @@ class TXPBinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if not entry:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + size * count
-                    break
-
-        return out
+        return self._classifier.classify(data)[0]
 
     def fill_packets_samples(self, data):
         """ Compute samples.
 
-        Samples are in the following format (after ordering):
+        Samples are in the following format:
 
         [[60, 3], [66, 2], [74, 1], [98, 40], [167, 2], [209, 2], [1466, 1762]]
 
@@ -266,20 +258,7 @@ class TXPBinCounter(ModulePeriodic):
 
         """
 
-        samples = sorted(data, key=lambda entry: entry[0])
-        out = [0] * len(self.bins)
-
-        for entry in samples:
-            if not entry:
-                continue
-            size = entry[0]
-            count = entry[1]
-            for i in range(0, len(self.bins)):
-                if size <= self.bins[i]:
-                    out[i] = out[i] + count
-                    break
-
-        return out
+        return self._classifier.classify(data)[1]
 
     def handle_response(self, response):
         """Handle an incoming STATS_RESPONSE message.
@@ -290,8 +269,8 @@ class TXPBinCounter(ModulePeriodic):
         """
 
         # update this object
-        self.tx_bytes = self.fill_bytes_samples(response.stats)
-        self.tx_packets = self.fill_packets_samples(response.stats)
+        self.tx_bytes, self.tx_packets = \
+            self._classifier.classify(response.stats)
 
         # call callback
         self.handle_callback(self)
@@ -324,4 +303,4 @@ def launch():
     """ Initialize the module. """
 
     return TXPBinCounterWorker(TXPBinCounter, PT_TXP_BIN_COUNTER_RESPONSE,
-                               TXP_BIN_COUNTER_RESPONSE)
+                               TXP_BIN_COUNTER_RESPONSE, batched=True)
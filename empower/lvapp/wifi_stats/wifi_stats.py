@@ -26,6 +26,12 @@ from construct import Container
 from construct import Struct
 from construct import Array
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from empower.core.codec import compile_parser
 from empower.lvapp.lvappserver import ModuleLVAPPWorker
 from empower.core.app import EmpowerApp
 from empower.datatypes.etheraddress import EtherAddress
@@ -61,6 +67,87 @@ WIFI_STATS_RESPONSE = Struct("wifi_stats_response", UBInt8("version"),
                              UBInt16("nb_entries"),
                              Array(lambda ctx: ctx.nb_entries, ENTRY_TYPE))
 
+# entries are decoded as a structured array when NumPy is available
+WIFI_STATS_RESPONSE_CODEC = compile_parser(WIFI_STATS_RESPONSE, columnar=True)
+
+# number of samples per stats type (tx, rx, ed)
+NB_SAMPLES = 100
+
+# samples are reported in 1/180 units
+SAMPLE_SCALE = 180.0
+
+
+class WiFiStatsSamples:
+    """Columnar Wi-Fi stats samples.
+
+    The dictionary representation is built only when to_dict() is called.
+
+    Attributes:
+        columns: the (types, timestamps, samples) columns indexed by stats
+            type (tx, rx, ed). Columns are NumPy arrays if the entries were
+            decoded as a structured array, lists otherwise.
+    """
+
+    TYPES = ('tx', 'rx', 'ed')
+
+    def __init__(self, entries):
+
+        self.columns = {}
+
+        for idx, stats_type in enumerate(self.TYPES):
+
+            chunk = entries[idx * NB_SAMPLES:(idx + 1) * NB_SAMPLES]
+
+            if numpy is not None and isinstance(chunk, numpy.ndarray):
+                self.columns[stats_type] = \
+                    (chunk['type'], chunk['timestamp'],
+                     chunk['sample'] / SAMPLE_SCALE)
+            else:
+                self.columns[stats_type] = \
+                    ([entry[0] for entry in chunk],
+                     [entry[1] for entry in chunk],
+                     [entry[2] / SAMPLE_SCALE for entry in chunk])
+
+    def last(self, stats_type):
+        """Return the most recent timestamp (None if there are no samples)."""
+
+        timestamps = self.columns[stats_type][1]
+
+        if not len(timestamps):
+            return None
+
+        return int(max(timestamps))
+
+    def average(self, stats_type, since):
+        """Return the average of the samples newer than since."""
+
+        _, timestamps, samples = self.columns[stats_type]
+
+        if isinstance(samples, list):
+            newer = [sample for timestamp, sample in zip(timestamps, samples)
+                     if timestamp > since]
+            return sum(newer) / len(newer) if newer else 0
+
+        newer = samples[timestamps > since]
+        return float(newer.mean()) if len(newer) else 0
+
+    def to_dict(self):
+        """ Return a JSON-serializable dictionary. """
+
+        out = {}
+
+        for stats_type, columns in self.columns.items():
+
+            if not isinstance(columns[0], list):
+                columns = [column.tolist() for column in columns]
+
+            out[stats_type] = [{'type': entry[0],
+                                'timestamp': entry[1],
+                                'sample': entry[2]}
+                               for entry in zip(*columns)]
+
+        return out
+
 
 class WiFiStats(ModulePeriodic):
     """Wi-Fi Stats."""
@@ -76,7 +163,7 @@ class WiFiStats(ModulePeriodic):
         self._block = None
 
         # data structures
-        self.wifi_stats = {}
+        self.samples = None
         self.tx_per_second = 0
         self.rx_per_second = 0
         self.ed_per_second = 0
@@ -133,6 +220,12 @@ class WiFiStats(ModulePeriodic):
 
             raise ValueError("Invalid block")
 
+    @property
+    def wifi_stats(self):
+        """Return the last samples as a dictionary."""
+
+        return self.samples.to_dict() if self.samples else {}
+
     def to_dict(self):
         """ Return a JSON-serializable dictionary. """
 
@@ -177,7 +270,7 @@ class WiFiStats(ModulePeriodic):
                       self.MODULE_NAME, self.block, self.module_id)
 
         msg = WIFI_STATS_REQUEST.build(req)
-        wtp.connection.stream.write(msg)
+        wtp.connection.write(msg)
 
     def handle_response(self, response):
         """Handle an incoming poller response message.
@@ -188,71 +281,29 @@ class WiFiStats(ModulePeriodic):
         """
 
         # update this object
-        self.wifi_stats.clear()
-
-        tran = response.entries[0:100]
-        recv = response.entries[100:200]
-        edet = response.entries[200:300]
-
-        self.wifi_stats['tx'] = []
-        for entry in tran:
-            value = {'type': entry[0],
-                     'timestamp': entry[1],
-                     'sample': entry[2] / 180.0, }
-            self.wifi_stats['tx'].append(value)
-
-        self.wifi_stats['rx'] = []
-        for entry in recv:
-            value = {'type': entry[0],
-                     'timestamp': entry[1],
-                     'sample': entry[2] / 180.0, }
-            self.wifi_stats['rx'].append(value)
-
-        self.wifi_stats['ed'] = []
-        for entry in edet:
-            value = {'type': entry[0],
-                     'timestamp': entry[1],
-                     'sample': entry[2] / 180.0, }
-            self.wifi_stats['ed'].append(value)
-
-        if 'tx' in self.last:
-            self.tx_per_second = \
-                self.update_stats(self.wifi_stats['tx'], 'tx')
-        if 'rx' in self.last:
-            self.rx_per_second = \
-                self.update_stats(self.wifi_stats['rx'], 'rx')
-        if 'ed' in self.last:
-            self.ed_per_second = \
-                self.update_stats(self.wifi_stats['ed'], 'ed')
-
-        self.last['tx'] = \
-            max([sample['timestamp'] for sample in self.wifi_stats['tx']])
-        self.last['rx'] = \
-            max([sample['timestamp'] for sample in self.wifi_stats['rx']])
-        self.last['ed'] = \
-            max([sample['timestamp'] for sample in self.wifi_stats['ed']])
-
-        # update wifi_stats module
-        self.block.wifi_stats = self.wifi_stats
+        self.samples = WiFiStatsSamples(response.entries)
 
-        # call callback
-        self.handle_callback(self)
+        for stats_type in self.samples.TYPES:
 
-    def update_stats(self, stats, stats_type):
-        """Update stats."""
+            if self.last.get(stats_type) is not None:
+                setattr(self, '%s_per_second' % stats_type,
+                        self.samples.average(stats_type,
+                                             self.last[stats_type]))
 
-        avg_sec = 0
-        nb_samples = 0
+            self.last[stats_type] = self.samples.last(stats_type)
 
-        for _, sample in enumerate(stats):
-            if sample['timestamp'] > self.last[stats_type]:
-                avg_sec += sample['sample']
-                nb_samples += 1
+        # update wifi_stats module
+        self.block.wifi_stats = self.samples
 
-        if nb_samples == 0:
-            return 0
+        # save time series
+        self.save_series((self.block.hwaddr, self.block.channel,
+                          self.block.band),
+                         {'tx_per_second': self.tx_per_second,
+                          'rx_per_second': self.rx_per_second,
+                          'ed_per_second': self.ed_per_second})
 
-        return avg_sec / nb_samples
+        # call callback
+        self.handle_callback(self)
 
 
 class WiFiStatsWorker(ModuleLVAPPWorker):
@@ -281,4 +332,4 @@ def launch():
     """ Initialize the module. """
 
     return WiFiStatsWorker(WiFiStats, PT_WIFI_STATS_RESPONSE,
-                           WIFI_STATS_RESPONSE)
+                           WIFI_STATS_RESPONSE_CODEC)
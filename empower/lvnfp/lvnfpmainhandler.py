@@ -43,6 +43,10 @@ from empower.core.lvnf import LVNF
 from empower.core.lvnf import PROCESS_RUNNING
 from empower.core.image import Image
 from empower.core.utils import get_xid
+from empower.core.metrics import METRICS
+from empower.core.eventbus import EVENT_BUS
+from empower.core.eventbus import EV_CPP_UP
+from empower.core.eventbus import EV_CPP_DOWN
 
 from empower.main import RUNTIME
 
@@ -77,14 +81,23 @@ class LVNFPMainHandler(tornado.websocket.WebSocketHandler):
     def on_message(self, message):
         """Handle incoming message."""
 
+        # the decision to time a message is taken after parsing it
+        start = time.perf_counter() if METRICS.sampling else None
+
         try:
             msg = json.loads(message)
-            self.handle_message(msg)
+            self.handle_message(msg, start)
         except ValueError:
             LOG.error("Invalid input: %s", message)
 
-    def handle_message(self, msg):
-        """Handle incoming message."""
+    def handle_message(self, msg, start=None):
+        """Handle incoming message.
+
+        Args:
+            msg: the message
+            start: the perf_counter() value before parsing the message, if
+                the metrics are enabled
+        """
 
         msg_type = msg['type']
 
@@ -92,6 +105,10 @@ class LVNFPMainHandler(tornado.websocket.WebSocketHandler):
             LOG.error("Unknown message type %s", msg_type)
             return
 
+        parsed = None
+        if start is not None and METRICS.sample("lvnfp", msg_type):
+            parsed = time.perf_counter()
+
         addr = EtherAddress(msg['cpp'])
 
         try:
@@ -118,15 +135,22 @@ class LVNFPMainHandler(tornado.websocket.WebSocketHandler):
             LOG.info("CPP %s not ready", addr)
             return
 
-        handler_name = "_handle_%s" % msg_type
+        handler = getattr(self, "_handle_%s" % msg_type, None)
+        handlers = self.server.pt_types_handlers.get(msg_type, [])
 
-        if hasattr(self, handler_name):
-            handler = getattr(self, handler_name)
+        if parsed is not None:
+            fanout = METRICS.dispatch(handler, handlers, msg)
+            METRICS.record("lvnfp", msg_type, addr, start, parsed, fanout)
+            return
+
+        if METRICS.sampling:
+            METRICS.record("lvnfp", msg_type, addr)
+
+        if handler:
             handler(msg)
 
-        if msg_type in self.server.pt_types_handlers:
-            for handler in self.server.pt_types_handlers[msg_type]:
-                handler(msg)
+        for chained in handlers:
+            chained(msg)
 
     def send_bye_message_to_self(self):
         """Send bye message to self."""
@@ -142,9 +166,7 @@ class LVNFPMainHandler(tornado.websocket.WebSocketHandler):
     def _handle_bye(self, _):
         """Handle bye message."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.cpp_down(self.cpp)
+        EVENT_BUS.publish(EV_CPP_DOWN, None, self.cpp)
 
     def send_register_message_to_self(self):
         """Send register message to self."""
@@ -160,9 +182,7 @@ class LVNFPMainHandler(tornado.websocket.WebSocketHandler):
     def _handle_register(self, _):
         """Handle register message."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.cpp_up(self.cpp)
+        EVENT_BUS.publish(EV_CPP_UP, None, self.cpp)
 
     def on_close(self):
         """ Handle PNFDev disconnection """
@@ -26,6 +26,9 @@ from empower.restserver.restserver import RESTServer
 from empower.core.pnfpserver import BaseTenantPNFDevHandler
 from empower.core.pnfpserver import BasePNFDevHandler
 from empower.core.module import ModuleWorker
+from empower.core.eventbus import EVENT_BUS
+from empower.core.eventbus import EV_LVNF_JOIN
+from empower.core.eventbus import EV_LVNF_LEAVE
 from empower.persistence.persistence import TblCPP
 from empower.lvnfp import PT_BYE
 from empower.lvnfp import PT_TYPES
@@ -110,9 +113,7 @@ class LVNFPServer(PNFPServer, tornado.web.Application):
     def send_lvnf_leave_message_to_self(self, lvnf):
         """Send an LVNF_LEAVE message to self."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.lvnf_leave(lvnf)
+        EVENT_BUS.publish(EV_LVNF_LEAVE, lvnf.tenant.tenant_id, lvnf)
 
         for handler in self.pt_types_handlers[PT_LVNF_LEAVE]:
             handler(lvnf)
@@ -120,9 +121,7 @@ class LVNFPServer(PNFPServer, tornado.web.Application):
     def send_lvnf_join_message_to_self(self, lvnf):
         """Send an LVNF_JOIN message to self."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.lvnf_join(lvnf)
+        EVENT_BUS.publish(EV_LVNF_JOIN, lvnf.tenant.tenant_id, lvnf)
 
         for handler in self.pt_types_handlers[PT_LVNF_JOIN]:
             handler(lvnf)
@@ -28,7 +28,13 @@ import inspect
 import types
 import tornado.ioloop
 
+import empower.logger
 from empower.core.core import EmpowerRuntime
+from empower.core.metrics import METRICS
+from empower.core.startup import STARTUP
+from empower.core.startup import SLICES
+from empower.persistence.writebehind import MODE_SYNC
+from empower.persistence.writebehind import MODES
 
 RUNTIME = None
 
@@ -72,10 +78,13 @@ class EmpowerOptions(Options):
 
     def __init__(self):
         self.log_config = None
+        self.log_queue = True
         self.ctrl_adv = False
         self.ctrl_ip = ip_address("192.168.100.158")
         self.ctrl_port = 5533
         self.ctrl_adv_iface = "wlp2s0"
+        self.debug = False
+        self.persistence = MODE_SYNC
 
     def _set_ctrl_port(self, given_name, name, value):
         self.ctrl_port = int(value)
@@ -86,6 +95,31 @@ class EmpowerOptions(Options):
     def _set_ctrl_adv(self, given_name, name, value):
         self.ctrl_adv = value
 
+    def _set_persistence(self, given_name, name, value):
+        if value not in MODES:
+            logging.error("Invalid value for %s: %s", given_name, value)
+            sys.exit(1)
+        self.persistence = value
+
+    def _set_log_queue(self, given_name, name, value):
+        self.log_queue = str(value).lower() not in ("false", "no", "0")
+
+    def _set_log_sampling(self, given_name, name, value):
+        try:
+            for entry in value.split(","):
+                msg_type, rate = entry.split(":")
+                empower.logger.SAMPLER.set_rate(msg_type, rate)
+        except (AttributeError, ValueError):
+            logging.error("Invalid value for %s: %s", given_name, value)
+            sys.exit(1)
+
+    def _set_metrics_sampling(self, given_name, name, value):
+        try:
+            METRICS.set_sampling(value)
+        except (TypeError, ValueError):
+            logging.error("Invalid value for %s: %s", given_name, value)
+            sys.exit(1)
+
     def _set_log_config(self, given_name, name, value):
         if value is True:
             log_p = os.path.dirname(os.path.realpath(__file__))
@@ -115,9 +149,20 @@ _HELP_TEXT = """Start the controller with:
 Notable options include:
   --help                Print this help message
   --log-config=<file>   Use log config file (default is ./logging.cfg)
+  --log-queue=<bool>    Write logs from a background thread (default is true)
+  --log-sampling=<type>:<n>[,<type>:<n>]
+                        Log one every n messages of the given type (default
+                        is 100 for hello and statistics messages)
+  --metrics-sampling=<n>
+                        Time one every n messages of each type and export
+                        the metrics at /api/v1/metrics (default is 0, i.e.
+                        disabled)
   --ctrl-adv            Advertise controller (bool, default is false)
   --ctrl-ip=<ip>        Controller address (ip, default is 192.168.100.158)
   --ctrl-port=<port>    Controller port (int, default is 5533)
+  --debug               Check runtime consistency (bool, default is false)
+  --persistence=<mode>  DB durability mode: sync, batched or wal (default is
+                        sync)
 
 C1, C2, etc. are component names (e.g., Python modules). The supported options
 are up to the module.
@@ -164,7 +209,8 @@ def _parse_args(argv, default=None):
 def _do_launch(components, components_order):
     """Parse arguments and launch controller."""
 
-    modules = _do_imports(n.split(':')[0] for n in components_order)
+    with STARTUP.phase("import components"):
+        modules = _do_imports(n.split(':')[0] for n in components_order)
 
     if modules is False:
         logging.error("No modules to import!")
@@ -189,11 +235,12 @@ def _do_launch(components, components_order):
 
         try:
 
-            if 'tenant_id' in params:
-                params['tenant_id'] = UUID(params['tenant_id'])
-                RUNTIME.register_app(name, func, params)
-            else:
-                RUNTIME.register(name, func, params)
+            with STARTUP.phase("launch %s" % name):
+                if 'tenant_id' in params:
+                    params['tenant_id'] = UUID(params['tenant_id'])
+                    RUNTIME.register_app(name, func, params)
+                else:
+                    RUNTIME.register(name, func, params)
 
         except TypeError as ex:
             logging.error("Error calling %s in %s: %s", launch, name, ex)
@@ -268,6 +315,9 @@ def _setup_logging():
         logging.config.fileConfig(_OPTIONS.log_config,
                                   disable_existing_loggers=False)
 
+    if _OPTIONS.log_queue:
+        empower.logger.start_queue()
+
 
 def _pre_startup():
     """Perform pre-startup operation.
@@ -286,7 +336,10 @@ def _post_startup():
     smoothly in this method then the tornado loop is started.
     """
 
-    pass
+    # slices loaded at startup are not needed anymore
+    SLICES.clear()
+
+    STARTUP.done()
 
 
 def main(argv=None):
@@ -300,7 +353,9 @@ def main(argv=None):
     # Set the runtime after logging has been configured. This must be done
     # here since the components loader requires this symbol to be defined.
     global RUNTIME
-    RUNTIME = EmpowerRuntime(_OPTIONS)
+
+    with STARTUP.phase("runtime"):
+        RUNTIME = EmpowerRuntime(_OPTIONS)
 
     # launch components
     if _do_launch(components, components_order):
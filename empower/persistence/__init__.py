@@ -21,12 +21,17 @@ from sqlalchemy import create_engine, event
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from empower.settings import CONFIGDB_ENGINE
+from empower.persistence.writebehind import WriteBehindQueue
+from empower.persistence.writebehind import MODE_WAL
 
 ENGINE = create_engine(CONFIGDB_ENGINE, pool_recycle=6000)
 
 
 def on_connect(conn, record):
     conn.execute('pragma foreign_keys=ON')
+    if PERSISTENCE.mode == MODE_WAL:
+        conn.execute('pragma journal_mode=WAL')
+        conn.execute('pragma synchronous=NORMAL')
 
 
 event.listen(ENGINE, 'connect', on_connect)
@@ -35,3 +40,5 @@ SESSION_FACTORY = sessionmaker(autoflush=True,
                                bind=ENGINE,
                                expire_on_commit=False)
 Session = scoped_session(SESSION_FACTORY)
+
+PERSISTENCE = WriteBehindQueue(Session)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2018 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""EmPOWER write-behind persistence queue.
+
+The in-memory runtime is authoritative: the database is only read at
+startup and mutations are submitted to the queue as groups of operations,
+each operation being a function taking a session. The insert, upsert,
+update and delete helpers build the most common operations.
+
+The following durability modes are supported:
+    sync: each group is committed immediately by the caller (default)
+    batched: groups are committed in a single transaction by a background
+        thread at most delay seconds after being submitted
+    wal: as batched, but the SQLite write-ahead log is used and commits
+        are not synced to disk (the database can lose the last commits
+        on power loss but cannot be corrupted)
+
+In the batched modes, if a transaction fails its groups are retried one by
+one and the failing ones are logged and dropped. flush() waits until all
+the submitted groups have been committed, it must be called before
+reading state that may have been modified through the queue.
+"""
+
+import time
+import atexit
+import threading
+
+from collections import deque
+from functools import partial
+
+import empower.logger
+
+MODE_SYNC = "sync"
+MODE_BATCHED = "batched"
+MODE_WAL = "wal"
+
+MODES = [MODE_SYNC, MODE_BATCHED, MODE_WAL]
+
+# maximum time (in seconds) a group waits before being committed
+DEFAULT_DELAY = 0.1
+
+# maximum number of groups committed in a single transaction
+DEFAULT_BATCH = 256
+
+
+def _insert(table, columns, session):
+    session.add(table(**columns))
+
+
+def _upsert(table, columns, session):
+    session.merge(table(**columns))
+
+
+def _update(table, keys, values, session):
+    row = session.query(table).filter_by(**keys).first()
+    if not row:
+        raise KeyError(keys)
+    for key, value in values.items():
+        setattr(row, key, value)
+
+
+def _delete(table, keys, session):
+    row = session.query(table).filter_by(**keys).first()
+    if row:
+        session.delete(row)
+
+
+def insert(table, **columns):
+    """Return an operation adding a new row."""
+
+    return partial(_insert, table, columns)
+
+
+def upsert(table, **columns):
+    """Return an operation adding or replacing a row (by primary key)."""
+
+    return partial(_upsert, table, columns)
+
+
+def update(table, keys, **values):
+    """Return an operation updating the row matching keys."""
+
+    return partial(_update, table, keys, values)
+
+
+def delete(table, **keys):
+    """Return an operation deleting the row matching keys (if any)."""
+
+    return partial(_delete, table, keys)
+
+
+class WriteBehindQueue:
+    """Write-behind persistence queue.
+
+    Attributes:
+        mode: the durability mode
+        delay: the maximum time (s) a group waits before being committed
+        batch: the maximum number of groups per transaction
+        submitted: the number of groups submitted
+        committed: the number of groups committed
+        failed: the number of groups dropped because of an error
+        commits: the number of transactions committed
+    """
+
+    def __init__(self, session, delay=DEFAULT_DELAY, batch=DEFAULT_BATCH):
+
+        self.mode = MODE_SYNC
+        self.delay = delay
+        self.batch = batch
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.commits = 0
+        self.log = empower.logger.get_logger()
+
+        self.__session = session
+        self.__queue = deque()
+        self.__cond = threading.Condition()
+        self.__busy = False
+        self.__flushing = 0
+        self.__thread = None
+
+    def set_mode(self, mode):
+        """Set the durability mode."""
+
+        if mode not in MODES:
+            raise ValueError("Invalid mode %s" % mode)
+
+        self.stop()
+        self.mode = mode
+
+        if mode == MODE_SYNC:
+            return
+
+        self.__thread = threading.Thread(target=self.__run,
+                                         name="persistence",
+                                         daemon=True)
+        self.__thread.start()
+
+        atexit.register(self.stop)
+
+    def submit(self, *ops):
+        """Submit a group of operations.
+
+        In sync mode the group is committed before returning and the
+        database errors are raised to the caller (after a rollback).
+        """
+
+        self.submitted += 1
+
+        if self.mode == MODE_SYNC:
+
+            session = self.__session()
+
+            try:
+                for op in ops:
+                    op(session)
+                    session.flush()
+                session.commit()
+            except Exception:
+                session.rollback()
+                self.failed += 1
+                raise
+
+            self.committed += 1
+            self.commits += 1
+
+            return
+
+        with self.__cond:
+            self.__queue.append((time.time(), ops))
+            self.__cond.notify()
+
+    def flush(self):
+        """Wait until all the submitted groups have been committed."""
+
+        if not self.__thread:
+            return
+
+        with self.__cond:
+            self.__flushing += 1
+            self.__cond.notify_all()
+            while self.__queue or self.__busy:
+                self.__cond.wait()
+            self.__flushing -= 1
+
+        # rows cached by the caller's session may be stale
+        self.__session.expire_all()
+
+    def stop(self):
+        """Flush the queue and stop the background thread."""
+
+        if not self.__thread:
+            return
+
+        self.flush()
+
+        thread = self.__thread
+        self.__thread = None
+
+        with self.__cond:
+            self.__cond.notify_all()
+
+        thread.join()
+
+        atexit.unregister(self.stop)
+
+    def __run(self):
+        """Commit the submitted groups (background thread)."""
+
+        thread = threading.current_thread()
+
+        while True:
+
+            with self.__cond:
+
+                while self.__thread is thread and not self.__queue:
+                    self.__cond.wait()
+
+                if not self.__queue:
+                    return
+
+                # wait for more groups unless the oldest one is due
+                due = self.__queue[0][0] + self.delay
+                if time.time() < due and len(self.__queue) < self.batch \
+                   and not self.__flushing:
+                    self.__cond.wait(due - time.time())
+
+                groups = []
+                while self.__queue and len(groups) < self.batch:
+                    groups.append(self.__queue.popleft()[1])
+
+                self.__busy = True
+
+            try:
+                self.__commit(groups)
+            finally:
+                with self.__cond:
+                    self.__busy = False
+                    self.__cond.notify_all()
+
+    def __commit(self, groups):
+        """Commit groups in a single transaction."""
+
+        session = self.__session.session_factory()
+
+        try:
+
+            try:
+                for ops in groups:
+                    for op in ops:
+                        op(session)
+                        session.flush()
+                session.commit()
+                self.committed += len(groups)
+                self.commits += 1
+                return
+            except Exception:
+                session.rollback()
+                if len(groups) == 1:
+                    raise
+
+            # retry the groups one by one
+            for ops in groups:
+                self.__commit([ops])
+
+        except Exception as ex:
+            self.failed += 1
+            self.log.error("Unable to persist %s: %s", groups[0], ex)
+
+        finally:
+            session.close()
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'mode': self.mode,
+                'delay': self.delay,
+                'batch': self.batch,
+                'queued': len(self.__queue),
+                'submitted': self.submitted,
+                'committed': self.committed,
+                'failed': self.failed,
+                'commits': self.commits}
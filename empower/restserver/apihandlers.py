@@ -18,7 +18,6 @@
 """Empower common API Handlers."""
 
 import json
-import base64
 import re
 
 from uuid import UUID
@@ -27,11 +26,14 @@ import tornado.web
 import tornado.httpserver
 
 from empower.core.account import ROLE_ADMIN, ROLE_USER
-from empower.core.jsonserializer import EmpowerEncoder
+from empower.core.jsonserializer import dumps
 from empower.main import RUNTIME
 
 import empower.logger
 
+ACCOUNTS_PATTERN = re.compile("/api/v1/accounts/([a-zA-Z0-9:-]*)/?")
+TENANTS_PATTERN = re.compile("/api/v1/tenants/([a-zA-Z0-9-]*)/?")
+
 
 class EmpowerAPIHandler(tornado.web.RequestHandler):
     """ Base class for all the REST call. """
@@ -59,11 +61,41 @@ class EmpowerAPIHandler(tornado.web.RequestHandler):
 
         self.finish(json.dumps(out))
 
+    def is_compact(self):
+        """Return True if a compact reply has been requested.
+
+        A compact reply can be requested either with the compact query
+        argument (e.g. ?compact=true) or with an Accept header having the
+        compact parameter or indent set to 0 (e.g. application/json;
+        indent=0).
+        """
+
+        compact = self.get_query_argument("compact", None)
+
+        if compact is not None:
+            return compact.lower() not in ("0", "false", "no")
+
+        accept = self.request.headers.get("Accept", "")
+
+        for media in accept.split(","):
+            params = [p.strip().lower() for p in media.split(";")[1:]]
+            if "compact" in params or "compact=true" in params or \
+               "indent=0" in params:
+                return True
+
+        return False
+
+    def on_finish(self):
+        """Record the request latency."""
+
+        self.application.add_latency(self.__class__.__name__,
+                                     self.request.method,
+                                     1000.0 * self.request.request_time())
+
     def write_as_json(self, value):
         """Return reply as a json document."""
 
-        self.write(json.dumps(value, sort_keys=True, indent=4,
-                              cls=EmpowerEncoder))
+        self.write(dumps(value, compact=self.is_compact()))
 
     def prepare(self):
         """Prepare to handler reply."""
@@ -80,17 +112,13 @@ class EmpowerAPIHandler(tornado.web.RequestHandler):
             self.send_error(401)
             return
 
-        auth_bytes = bytes(auth_header[6:], 'utf-8')
-        auth_decoded = base64.b64decode(auth_bytes).decode()
-        username, password = auth_decoded.split(':', 2)
+        self.account = RUNTIME.authenticate(auth_header)
 
         # account does not exists
-        if not RUNTIME.check_permission(username, password):
+        if not self.account:
             self.send_error(401)
             return
 
-        self.account = RUNTIME.get_account(username)
-
         if self.account.role in self.RIGHTS[self.request.method]:
 
             if self.account.role == ROLE_ADMIN:
@@ -98,8 +126,7 @@ class EmpowerAPIHandler(tornado.web.RequestHandler):
 
             if self.request.uri.startswith("/api/v1/accounts"):
 
-                pattern = re.compile("/api/v1/accounts/([a-zA-Z0-9:-]*)/?")
-                match = pattern.match(self.request.uri)
+                match = ACCOUNTS_PATTERN.match(self.request.uri)
 
                 if match and match.group(1):
                     if match.group(1) in RUNTIME.accounts:
@@ -113,14 +140,15 @@ class EmpowerAPIHandler(tornado.web.RequestHandler):
 
             if self.request.uri.startswith("/api/v1/tenants"):
 
-                pattern = re.compile("/api/v1/tenants/([a-zA-Z0-9-]*)/?")
-                match = pattern.match(self.request.uri)
+                match = TENANTS_PATTERN.match(self.request.uri)
 
                 if match and match.group(1):
-                    tenant_id = UUID(match.group(1))
-                    if tenant_id in RUNTIME.tenants:
-                        tenant = RUNTIME.tenants[tenant_id]
-                        if self.account.username == tenant.owner:
+                    tenant_id = match.group(1)
+                    if tenant_id not in RUNTIME.tenant_owners:
+                        tenant_id = str(UUID(tenant_id))
+                    if tenant_id in RUNTIME.tenant_owners:
+                        owner = RUNTIME.tenant_owners[tenant_id]
+                        if self.account.username == owner:
                             return
                         self.send_error(401)
                         return
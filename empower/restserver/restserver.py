@@ -30,6 +30,14 @@ from empower.core.account import ROLE_ADMIN, ROLE_USER
 from empower.restserver.apihandlers import EmpowerAPIHandler
 from empower.restserver.apihandlers import EmpowerAPIHandlerUsers
 from empower.core.module import ModuleWorker
+from empower.core.timerwheel import TIMER_WHEEL
+from empower.core.histogram import Histogram
+from empower.core.callbacks import CALLBACKS
+from empower.core.eventbus import EVENT_BUS
+from empower.core.metrics import METRICS
+from empower.core.timeseries import TIME_SERIES
+from empower.core.timeseries import TIER_RAW
+from empower.persistence import PERSISTENCE
 from empower.main import RUNTIME
 from empower.core.tenant import T_TYPE_UNIQUE
 from empower.datatypes.ssid import SSID
@@ -576,12 +584,12 @@ class TenantHandler(EmpowerAPIHandler):
 
         tenant_id = UUID(args[0]) if args else None
 
-        RUNTIME.add_tenant(kwargs['owner'],
-                           kwargs['desc'],
-                           kwargs['tenant_name'],
-                           bssid_type,
-                           tenant_id,
-                           plmn_id)
+        tenant_id = RUNTIME.add_tenant(kwargs['owner'],
+                                       kwargs['desc'],
+                                       kwargs['tenant_name'],
+                                       bssid_type,
+                                       tenant_id,
+                                       plmn_id)
 
         self.set_header("Location", "/api/v1/tenants/%s" % tenant_id)
 
@@ -1308,7 +1316,7 @@ class TrafficRuleHandler(EmpowerAPIHandler):
 
             for rule in tenant.traffic_rules.values():
 
-                rule['tenant_id'] = tenant.tenant_id
+                rule = dict(rule, tenant_id=tenant.tenant_id)
                 traffic_rules.append(rule)
 
         return traffic_rules
@@ -1337,6 +1345,233 @@ class SliceHandler(EmpowerAPIHandler):
         return slices
 
 
+class TimerWheelHandler(EmpowerAPIHandler):
+    """Timer wheel handler. Used to view the timer wheel metrics."""
+
+    HANDLERS = [r"/api/v1/timers/?"]
+
+    @validate()
+    def get(self, *args, **kwargs):
+        """Show the timer wheel status and the per-period lag metrics.
+
+        Args:
+            None
+
+        Example URLs:
+            GET /api/v1/timers
+        """
+
+        return TIMER_WHEEL
+
+
+class PersistenceHandler(EmpowerAPIHandler):
+    """Persistence handler. Used to view and flush the persistence queue."""
+
+    HANDLERS = [r"/api/v1/persistence/?"]
+
+    @validate()
+    def get(self, *args, **kwargs):
+        """Show the persistence queue status.
+
+        Args:
+            None
+
+        Example URLs:
+            GET /api/v1/persistence
+        """
+
+        return PERSISTENCE
+
+    @validate(returncode=204)
+    def put(self, *args, **kwargs):
+        """Flush the persistence queue.
+
+        Args:
+            None
+
+        Example URLs:
+            PUT /api/v1/persistence
+        """
+
+        PERSISTENCE.flush()
+
+
+class CallbacksHandler(EmpowerAPIHandler):
+    """Callbacks handler. Used to view the remote callbacks delivery."""
+
+    HANDLERS = [r"/api/v1/callbacks/?"]
+
+    @validate()
+    def get(self, *args, **kwargs):
+        """Show the remote callbacks endpoints and their metrics.
+
+        Args:
+            None
+
+        Example URLs:
+            GET /api/v1/callbacks
+        """
+
+        return CALLBACKS
+
+
+class EventsHandler(EmpowerAPIHandler):
+    """Events handler. Used to view the event bus subscribers and latency."""
+
+    HANDLERS = [r"/api/v1/events/?"]
+
+    @validate()
+    def get(self, *args, **kwargs):
+        """Show the number of subscribers and the dispatch latency (ms) of
+        each event.
+
+        Args:
+            None
+
+        Example URLs:
+            GET /api/v1/events
+        """
+
+        return EVENT_BUS
+
+
+class LatencyHandler(EmpowerAPIHandler):
+    """Latency handler. Used to view the REST requests latency."""
+
+    HANDLERS = [r"/api/v1/latency/?"]
+
+    @validate()
+    def get(self, *args, **kwargs):
+        """Show the latency histograms (ms) per handler and method.
+
+        Args:
+            None
+
+        Example URLs:
+            GET /api/v1/latency
+        """
+
+        return self.application.latency
+
+
+class MetricsHandler(EmpowerAPIHandler):
+    """Metrics handler. Used to export the controller metrics."""
+
+    HANDLERS = [r"/api/v1/metrics/?"]
+
+    def get(self, *args, **kwargs):
+        """Export the controller metrics in the Prometheus text format.
+
+        Args:
+            None
+
+        Example URLs:
+            GET /api/v1/metrics
+        """
+
+        modules = {}
+
+        for component in RUNTIME.components.values():
+            if isinstance(component, ModuleWorker) and component.module:
+                name = component.module.MODULE_NAME
+                modules[name] = modules.get(name, 0) + len(component.modules)
+
+        gauges = [
+            ("empower_lvaps", "LVAPs.", [([], len(RUNTIME.lvaps))]),
+            ("empower_ues", "UEs.", [([], len(RUNTIME.ues))]),
+            ("empower_modules", "Modules.",
+             [([("module", name)], count)
+              for name, count in sorted(modules.items())]),
+            ("empower_tenants", "Tenants.", [([], len(RUNTIME.tenants))]),
+            ("empower_wtps", "WTPs.", [([], len(RUNTIME.wtps))]),
+            ("empower_vbses", "VBSes.", [([], len(RUNTIME.vbses))]),
+            ("empower_cpps", "CPPs.", [([], len(RUNTIME.cpps))])]
+
+        histograms = [
+            ("empower_rest_request_seconds", "REST requests latency.",
+             [([("handler", name), ("method", method)], histogram)
+              for name, methods in sorted(self.application.latency.items())
+              for method, histogram in sorted(methods.items())])]
+
+        self.set_header('Content-Type', 'text/plain; version=0.0.4')
+        self.write(METRICS.to_prometheus(gauges, histograms))
+
+    @validate(returncode=204,
+              input_schema={
+                  "version" : {"type": float, "mandatory": True},
+                  "sampling" : {"type": int, "mandatory": True}
+              })
+    def put(self, *args, **kwargs):
+        """Set the metrics sampling.
+
+        Args:
+            None
+
+        Request:
+            version: protocol version (1.0)
+            sampling: one message out of sampling is timed, 0 disables
+                the metrics
+
+        Example URLs:
+            PUT /api/v1/metrics
+        """
+
+        METRICS.set_sampling(kwargs['sampling'])
+
+
+class TenantTimeSeriesHandler(EmpowerAPIHandlerUsers):
+    """Tenant time series handler. Used to query the modules statistics."""
+
+    HANDLERS = [r"/api/v1/tenants/([a-zA-Z0-9-]*)/timeseries/?"]
+
+    @validate(min_args=1, max_args=1)
+    def get(self, *args, **kwargs):
+        """Query the time series of a tenant.
+
+        Without the entity and metric arguments the list of series is
+        returned. Otherwise the samples of the matching series are returned
+        (or their aggregate if agg is specified).
+
+        Args:
+            tenant_id: the tenant id
+            entity: the entity, e.g. an LVAP address (optional)
+            metric: the metric, e.g. best_prob (optional)
+            start: the range start as unix time (optional)
+            end: the range end as unix time (optional)
+            tier: one of raw, 10s, 1m (optional, default raw)
+            agg: one of avg, min, max, sum, count, last (optional)
+
+        Example URLs:
+
+            GET /api/v1/tenants/52313ecb-9d00-4b7d-b873-b55d3d9ada26/
+              timeseries
+            GET /api/v1/tenants/52313ecb-9d00-4b7d-b873-b55d3d9ada26/
+              timeseries?entity=00:18:DE:CC:D3:40&tier=10s
+            GET /api/v1/tenants/52313ecb-9d00-4b7d-b873-b55d3d9ada26/
+              timeseries?metric=best_prob&start=1500000000&agg=avg
+        """
+
+        tenant_id = UUID(args[0])
+
+        if tenant_id not in RUNTIME.tenants:
+            raise KeyError(tenant_id)
+
+        entity = self.get_argument("entity", None)
+        metric = self.get_argument("metric", None)
+        start = self.get_argument("start", None)
+        end = self.get_argument("end", None)
+        tier = self.get_argument("tier", TIER_RAW)
+        agg = self.get_argument("agg", None)
+
+        if entity is None and metric is None and agg is None:
+            return TIME_SERIES.to_dict(tenant_id)
+
+        return TIME_SERIES.query(tenant_id, entity=entity, metric=metric,
+                                 start=float(start) if start else None,
+                                 end=float(end) if end else None,
+                                 tier=tier, agg=agg)
+
+
 class ModuleHandler(EmpowerAPIHandlerUsers):
     """Tenat traffic rule queue handler."""
 
@@ -1536,7 +1771,12 @@ class DocHandler(EmpowerAPIHandlerUsers):
 
 
 class RESTServer(tornado.web.Application):
-    """Exposes the REST API."""
+    """Exposes the REST API.
+
+    Attributes:
+        latency: the requests latency Histograms indexed by handler name
+            and then by method
+    """
 
     parms = {
         "template_path": settings.TEMPLATE_PATH,
@@ -1552,6 +1792,7 @@ class RESTServer(tornado.web.Application):
         self.cert = cert
         self.key = key
         self.handlers = []
+        self.latency = {}
         self.log = empower.logger.get_logger()
 
         tornado.web.Application.__init__(self, [], **self.parms)
@@ -1573,7 +1814,10 @@ class RESTServer(tornado.web.Application):
                            TenantSliceHandler, TenantEndpointHandler,
                            TenantEndpointNextHandler, IndexHandler,
                            TenantEndpointPortHandler, TenantTrafficRuleHandler,
-                           TrafficRuleHandler, SliceHandler, DocHandler]
+                           TrafficRuleHandler, SliceHandler, DocHandler,
+                           TimerWheelHandler, LatencyHandler,
+                           PersistenceHandler, TenantTimeSeriesHandler,
+                           CallbacksHandler, EventsHandler, MetricsHandler]
 
         for handler_class in handler_classes:
             self.add_handler_class(handler_class, http_server)
@@ -1586,6 +1830,17 @@ class RESTServer(tornado.web.Application):
         for url in handler_class.HANDLERS:
             self.add_handler((url, handler_class, dict(server=server)))
 
+    def add_latency(self, name, method, value):
+        """Record the latency (ms) of a request."""
+
+        if name not in self.latency:
+            self.latency[name] = {}
+
+        if method not in self.latency[name]:
+            self.latency[name][method] = Histogram()
+
+        self.latency[name][method].add(value)
+
     def add_handler(self, handler):
         """Add a new handler to the REST server."""
 
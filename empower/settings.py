@@ -29,6 +29,9 @@ TEMPLATE_PATH = os.path.join(DIRNAME, 'templates')
 CONFIGDB_PATH = "%s/deploy/empower.db" % (ROOT_PATH,)
 CONFIGDB_ENGINE = "sqlite:///%s" % (CONFIGDB_PATH,)
 
+# Component manifests cache
+MANIFEST_CACHE_PATH = "%s/deploy/manifests.json" % (ROOT_PATH,)
+
 # import base64
 # import uuid
 # COOKIE_SECRET = base64.b64encode(uuid.uuid4().bytes + uuid.uuid4().bytes)
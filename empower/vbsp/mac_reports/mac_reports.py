@@ -196,6 +196,9 @@ class MACReports(ModuleTrigger):
 
         self.cell.mac_reports = self.results
 
+        # save time series
+        self.save_series((self.cell.vbs.addr, self.cell.pci), self.results)
+
         # call callback
         self.handle_callback(self)
 
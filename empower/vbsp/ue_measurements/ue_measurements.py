@@ -238,6 +238,10 @@ class UEMeasurements(ModulePeriodic):
                 "rsrq": entry.rsrq
             }
 
+            # save time series
+            self.save_series((self.ue.ue_id, entry.pci),
+                             {'rsrp': entry.rsrp, 'rsrq': entry.rsrq})
+
             # check if this measurement refers to a cell that is in this tenant
             earfcn = self.measurements[entry.meas_id]["earfcn"]
 
@@ -19,13 +19,16 @@
 
 import uuid
 import time
-import tornado.ioloop
 
 from construct import Container
 
 from empower.datatypes.plmnid import PLMNID
 from empower.datatypes.dscp import DSCP
 from empower.datatypes.etheraddress import EtherAddress
+from empower.core.timerwheel import PeriodicTimer
+from empower.core.framing import OutputBuffer
+from empower.core.reconciler import Reconciler
+from empower.core.metrics import METRICS
 from empower.vbsp import HEADER
 from empower.vbsp import PT_VERSION
 from empower.vbsp import PT_BYE
@@ -67,6 +70,9 @@ from empower.core.utils import get_xid
 from empower.core.cellpool import Cell
 from empower.core.ue import UE
 from empower.core.ue import UE_REPORT_STATES
+from empower.core.eventbus import EVENT_BUS
+from empower.core.eventbus import EV_VBS_UP
+from empower.core.eventbus import EV_VBS_DOWN
 
 from empower.main import RUNTIME
 
@@ -83,6 +89,9 @@ class VBSPConnection:
 
     Attributes:
         stream: The stream object used to talk with the ENB.
+        output: The output buffer coalescing the messages sent to the ENB.
+        reconciler: The reconciler pushing the slices missing on the ENB
+            cells after the status replies have been collected.
         address: The connection source address, i.e. the ENB IP address.
         server: Pointer to the server object.
         vbs: Pointer to a VBS object.
@@ -91,14 +100,16 @@ class VBSPConnection:
     def __init__(self, stream, addr, server):
         self.stream = stream
         self.stream.set_nodelay(True)
+        self.output = OutputBuffer(self.stream)
+        self.reconciler = Reconciler(self.reconcile)
         self.addr = addr
         self.server = server
         self.vbs = None
         self.stream.set_close_callback(self._on_disconnect)
         self.__buffer = b''
         self._hb_interval_ms = 500
-        self._hb_worker = tornado.ioloop.PeriodicCallback(self._heartbeat_cb,
-                                                          self._hb_interval_ms)
+        self._hb_worker = PeriodicTimer(self._heartbeat_cb,
+                                        self._hb_interval_ms)
         self._hb_worker.start()
         self._wait()
         self.log = empower.logger.get_logger()
@@ -108,6 +119,15 @@ class VBSPConnection:
 
         return self.addr
 
+    def write(self, data, flush=False):
+        """Write an encoded message to the VBS.
+
+        Messages are coalesced and written at the end of the current IOLoop
+        iteration unless flush is True.
+        """
+
+        self.output.write(data, flush)
+
     def _heartbeat_cb(self):
         """ Check if vbs connection is still active. Disconnect if no hellos
         have been received from the vbs for twice the hello period. """
@@ -164,9 +184,16 @@ class VBSPConnection:
 
         if self.server.pt_types[msg_type]:
 
-            msg = self.server.pt_types[msg_type].parse(self.__buffer[offset:])
             msg_name = self.server.pt_types[msg_type].name
 
+            start = None
+            if METRICS.sampling and METRICS.sample("vbsp", msg_name):
+                start = time.perf_counter()
+
+            msg = self.server.pt_types[msg_type].parse(self.__buffer[offset:])
+
+            parsed = time.perf_counter() if start is not None else None
+
             addr = EtherAddress(hdr.enbid[2:8])
 
             try:
@@ -191,18 +218,27 @@ class VBSPConnection:
                               msg_name, addr, hdr.seq)
                 return
 
-            self.log.info("Got %s message from %s seq %u xid %u",
-                          msg_name, self.vbs.addr, hdr.seq, hdr.xid)
+            if empower.logger.SAMPLER.sample(msg_name):
+                self.log.info("Got %s message from %s seq %u xid %u",
+                              msg_name, self.vbs.addr, hdr.seq, hdr.xid)
 
-            handler_name = "_handle_%s" % msg_name
+            handler = getattr(self, "_handle_%s" % msg_name, None)
+            handlers = self.server.pt_types_handlers.get(msg_type, [])
 
-            if hasattr(self, handler_name):
-                handler = getattr(self, handler_name)
+            if start is not None:
+                fanout = METRICS.dispatch(handler, handlers,
+                                          vbs, hdr, event, msg)
+                METRICS.record("vbsp", msg_name, addr, start, parsed, fanout)
+                return
+
+            if METRICS.sampling:
+                METRICS.record("vbsp", msg_name, addr)
+
+            if handler:
                 handler(vbs, hdr, event, msg)
 
-            if msg_type in self.server.pt_types_handlers:
-                for handler in self.server.pt_types_handlers[msg_type]:
-                    handler(vbs, hdr, event, msg)
+            for chained in handlers:
+                chained(vbs, hdr, event, msg)
 
     def _wait(self):
         """ Wait for incoming packets on signalling channel """
@@ -213,6 +249,9 @@ class VBSPConnection:
     def _on_disconnect(self):
         """ Handle VBS disconnection """
 
+        self._hb_worker.stop()
+        self.reconciler.stop()
+
         if not self.vbs:
             return
 
@@ -234,9 +273,7 @@ class VBSPConnection:
     def send_bye_message_to_self(self):
         """Send a unsollicited BYE message to senf."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.vbs_down(self.vbs)
+        EVENT_BUS.publish(EV_VBS_DOWN, None, self.vbs)
 
         for handler in self.server.pt_types_handlers[PT_BYE]:
             handler(self.vbs)
@@ -244,9 +281,7 @@ class VBSPConnection:
     def send_register_message_to_self(self):
         """Send a unsollicited REGISTER message to senf."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.vbs_up(self.vbs)
+        EVENT_BUS.publish(EV_VBS_UP, None, self.vbs)
 
         for handler in self.server.pt_types_handlers[PT_REGISTER]:
             handler(self.vbs)
@@ -266,8 +301,9 @@ class VBSPConnection:
         msg.action = action
         msg.opcode = opcode
 
-        self.log.info("Sending %s to %s", parser.name, self.vbs)
-        self.stream.write(parser.build(msg))
+        if empower.logger.SAMPLER.sample(parser.name):
+            self.log.info("Sending %s to %s", parser.name, self.vbs)
+        self.write(parser.build(msg))
 
         return msg.xid
 
@@ -327,11 +363,30 @@ class VBSPConnection:
         # activate UE reports
         self.send_ue_reports_request()
 
+        # send slices once the status replies have been received
+        self.reconciler.start()
+
+    def reconcile(self):
+        """Push the slices missing on the VBS cells."""
+
+        if not self.vbs or not self.vbs.is_online() or self.stream.closed():
+            return
+
+        sent = self.reconciler.sent
+
         # send slices
         self.update_slices()
 
+        self.log.info("VBS %s reconciled (%u objects reported, %u sent)",
+                      self.vbs.addr, len(self.reconciler.reported),
+                      self.reconciler.sent - sent)
+
     def update_slices(self):
-        """Update active Slices."""
+        """Update active Slices.
+
+        Slices reported by a cell with the same properties are not sent,
+        slices not reported are added and the others are set.
+        """
 
         for tenant in RUNTIME.tenants.values():
 
@@ -348,20 +403,22 @@ class VBSPConnection:
                 if not slc.lte['vbses'] or \
                     (slc.lte['vbses'] and self.vbs.addr in slc.lte['vbses']):
 
+                    value = self.slice_properties(slc)
+
                     for cell in self.vbs.cells.values():
 
-                        if self.vbs.addr not in slc.lte['vbses'] or \
-                            not slc.lte['vbses'][self.vbs.addr]['cells']:
+                        key = ("slice", cell.pci, tenant.plmn_id, slc.dscp)
+
+                        if not self.reconciler.outdated(key, value):
+                            continue
 
-                            self.vbs.connection. \
-                                send_add_set_ran_mac_slice_request(cell,
-                                                                   slc,
-                                                                   EP_OPERATION_ADD)
+                        if key in self.reconciler.reported:
+                            opcode = EP_OPERATION_SET
                         else:
-                            self.vbs.connection.\
-                                send_add_set_ran_mac_slice_request(cell,
-                                                                   slc,
-                                                                   EP_OPERATION_SET)
+                            opcode = EP_OPERATION_ADD
+
+                        self.send_add_set_ran_mac_slice_request(cell, slc,
+                                                                opcode)
 
     def _handle_ue_report_response(self, vbs, hdr, event, msg):
         """Handle an incoming UE_REPORT message.
@@ -407,8 +464,7 @@ class VBSPConnection:
                     ue = UE(ue_id, option.rnti, option.imsi, option.timsi,
                             cell, tenant)
 
-                    RUNTIME.ues[ue.ue_id] = ue
-                    tenant.ues[ue.ue_id] = ue
+                    RUNTIME.add_ue(ue)
 
                     self.server.send_ue_join_message_to_self(ue)
 
@@ -489,6 +545,12 @@ class VBSPConnection:
             # self.send_del_slice(valid[0], ssid, dscp)
             return
 
+        # while reconciling the reported state does not override the
+        # desired one
+        if self.reconciler.is_pending():
+            self.__report_slice(hdr.cellid, plmn_id, dscp, msg)
+            return
+
         slc = tenant.slices[dscp]
 
         if vbs.addr not in slc.lte['vbses']:
@@ -523,6 +585,34 @@ class VBSPConnection:
 
         self.log.info("Slice %s updated", slc)
 
+    def __report_slice(self, cellid, plmn_id, dscp, msg):
+        """Record a slice reported by a cell."""
+
+        sched_id = None
+        rbgs = None
+        rntis = []
+
+        for raw_cap in msg.options:
+
+            if raw_cap.type not in RAN_MAC_SLICE_TYPES:
+                continue
+
+            option = RAN_MAC_SLICE_TYPES[raw_cap.type].parse(raw_cap.data)
+
+            if raw_cap.type == EP_RAN_MAC_SLICE_SCHED_ID:
+                sched_id = option.sched_id
+
+            if raw_cap.type == EP_RAN_MAC_SLICE_RBGS:
+                rbgs = option.rbgs
+
+            if raw_cap.type == EP_RAN_MAC_SLICE_RNTI_LIST:
+                rntis = option.rntis
+
+        key = ("slice", cellid, plmn_id, dscp)
+        value = (sched_id, rbgs, tuple(rntis))
+
+        self.reconciler.report(key, value)
+
     def send_caps_request(self):
         """Send a CAPS_REQUEST message.
         Args:
@@ -600,15 +690,8 @@ class VBSPConnection:
                           RAN_MAC_SLICE_REQUEST,
                           cellid=cell_id)
 
-    def send_add_set_ran_mac_slice_request(self, cell, slc, opcode):
-        """Send an SET_RAN_MAC_SLICE_REQUEST message.
-        Args:
-            None
-        Returns:
-            None
-        Raises:
-            None
-        """
+    def slice_properties(self, slc):
+        """Return the (sched_id, rbgs, rntis) of a slice on this VBS."""
 
         sched_id = slc.lte['static-properties']['sched_id']
         rbgs = slc.lte['static-properties']['rbgs']
@@ -633,6 +716,20 @@ class VBSPConnection:
                 if 'rntis' in runtime:
                     rntis = runtime['rntis']
 
+        return sched_id, rbgs, tuple(rntis)
+
+    def send_add_set_ran_mac_slice_request(self, cell, slc, opcode):
+        """Send an SET_RAN_MAC_SLICE_REQUEST message.
+        Args:
+            None
+        Returns:
+            None
+        Raises:
+            None
+        """
+
+        sched_id, rbgs, rntis = self.slice_properties(slc)
+
         msg = Container(plmn_id=slc.tenant.plmn_id.to_raw(),
                         dscp=slc.dscp.to_raw(),
                         padding=b'\x00\x00\x00',
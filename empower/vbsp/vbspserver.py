@@ -24,6 +24,9 @@ from empower.core.pnfpserver import BasePNFDevHandler
 from empower.restserver.restserver import RESTServer
 from empower.core.pnfpserver import PNFPServer
 from empower.core.module import ModuleWorker
+from empower.core.eventbus import EVENT_BUS
+from empower.core.eventbus import EV_UE_JOIN
+from empower.core.eventbus import EV_UE_LEAVE
 from empower.vbsp.vbspconnection import VBSPConnection
 from empower.persistence.persistence import TblVBS
 from empower.core.vbs import VBS
@@ -106,9 +109,7 @@ class VBSPServer(PNFPServer, TCPServer):
     def send_ue_leave_message_to_self(self, ue):
         """Send an UE_LEAVE message to self."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.ue_leave(ue)
+        EVENT_BUS.publish(EV_UE_LEAVE, ue.tenant.tenant_id, ue)
 
         for handler in self.pt_types_handlers[PT_UE_LEAVE]:
             handler(ue)
@@ -116,9 +117,7 @@ class VBSPServer(PNFPServer, TCPServer):
     def send_ue_join_message_to_self(self, ue):
         """Send an UE_JOIN message to self."""
 
-        for tenant in RUNTIME.tenants.values():
-            for app in tenant.components.values():
-                app.ue_join(ue)
+        EVENT_BUS.publish(EV_UE_JOIN, ue.tenant.tenant_id, ue)
 
         for handler in self.pt_types_handlers[PT_UE_JOIN]:
             handler(ue)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""BSSID map tests."""
+
+import unittest
+import uuid
+
+from empower.core.bssidmap import BSSIDMap
+from empower.core.tenant import T_TYPE_SHARED
+from empower.core.tenant import T_TYPE_UNIQUE
+from empower.core.tenant import Tenant
+from empower.core.vap import VAP
+from empower.datatypes.etheraddress import EtherAddress
+from empower.datatypes.ssid import SSID
+
+STA = EtherAddress("00:24:D7:7B:B0:7C")
+OTHER = EtherAddress("00:24:D7:7B:B0:7D")
+HWADDR = EtherAddress("00:0D:B9:30:3E:05")
+
+
+def tenant(name, bssid_type, tenant_id=None):
+    """Build a tenant."""
+
+    return Tenant(tenant_id or uuid.uuid4(), SSID(name), "root", name,
+                  bssid_type)
+
+
+class TestBSSIDMap(unittest.TestCase):
+    """BSSIDMap tests."""
+
+    def setUp(self):
+
+        self.bssids = BSSIDMap()
+
+        self.unique = tenant("unique", T_TYPE_UNIQUE)
+        self.shared = tenant("shared", T_TYPE_SHARED)
+        self.vap = VAP(self.shared.generate_bssid(HWADDR), HWADDR,
+                       self.shared)
+
+        self.bssids.add_tenant(self.unique)
+        self.bssids.add_tenant(self.shared)
+        self.bssids.add_vap(self.vap)
+
+    def test_generate_bssid(self):
+        """BSSIDs are unicast and keep the station part of the address."""
+
+        bssid = self.unique.generate_bssid(STA)
+
+        self.assertFalse(bssid.to_raw()[0] & 0x01)
+        self.assertEqual(bssid.to_str()[9:], STA.to_str()[9:])
+        self.assertEqual(bssid.to_raw()[1:3],
+                         self.unique.tenant_id.bytes[1:3])
+
+    def test_unique(self):
+        """Unique tenants are found only through the station BSSID."""
+
+        bssid = self.unique.generate_bssid(STA)
+
+        self.assertEqual(self.bssids.find(bssid, STA), [(self.unique, None)])
+        self.assertEqual(self.bssids.find(bssid, OTHER), [])
+
+    def test_shared(self):
+        """Shared tenants are found through their VAPs."""
+
+        self.assertEqual(self.bssids.find(self.vap.bssid, STA),
+                         [(self.shared, self.vap)])
+        self.assertEqual(self.bssids.tenants,
+                         {self.unique.bssid_base:
+                          {self.unique.tenant_id: self.unique}})
+
+    def test_collision(self):
+        """Unique tenants sharing the tenant part are all returned."""
+
+        tenant_id = uuid.UUID(bytes=self.unique.tenant_id.bytes[0:6] +
+                              bytes(10))
+        twin = tenant("twin", T_TYPE_UNIQUE, tenant_id)
+        self.bssids.add_tenant(twin)
+
+        found = self.bssids.find(self.unique.generate_bssid(STA), STA)
+
+        self.assertEqual(set(t.tenant_id for t, _ in found),
+                         {self.unique.tenant_id, twin.tenant_id})
+
+    def test_remove(self):
+        """Removed tenants and VAPs are no longer found."""
+
+        bssid = self.unique.generate_bssid(STA)
+
+        self.bssids.remove_tenant(self.unique)
+        self.bssids.remove_vap(self.vap)
+
+        self.assertEqual(self.bssids.find(bssid, STA), [])
+        self.assertEqual(self.bssids.find(self.vap.bssid, STA), [])
+        self.assertEqual(self.bssids.tenants, {})
+        self.assertEqual(self.bssids.vaps, {})
+
+        # removing twice is harmless
+        self.bssids.remove_tenant(self.unique)
+        self.bssids.remove_vap(self.vap)
+
+    def test_stale_vap(self):
+        """Removing a replaced VAP keeps the new one."""
+
+        vap = VAP(self.vap.bssid, HWADDR, self.shared)
+        self.bssids.add_vap(vap)
+        self.bssids.remove_vap(self.vap)
+
+        self.assertEqual(self.bssids.find(vap.bssid, STA),
+                         [(self.shared, vap)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Remote callbacks tests."""
+
+import threading
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from xmlrpc.server import SimpleXMLRPCServer
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from empower.core.callbacks import Endpoint
+
+
+class State:
+    """A module-like object whose state changes between events."""
+
+    def __init__(self):
+        self.value = 0
+
+    def to_dict(self):
+        """Return JSON-serializable representation of the object."""
+
+        return {'v': self.value}
+
+
+class TestEndpoint(unittest.TestCase):
+    """Endpoint tests."""
+
+    def setUp(self):
+
+        self.received = []
+
+        self.server = SimpleXMLRPCServer(("127.0.0.1", 0), logRequests=False,
+                                         allow_none=True)
+        self.server.register_function(self.received.append, "event")
+        self.server.register_multicall_functions()
+
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+        self.executor = ThreadPoolExecutor(1)
+
+        url = "http://127.0.0.1:%u/" % self.server.server_address[1]
+        self.endpoint = Endpoint(url, "event", self.executor)
+
+    def tearDown(self):
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.executor.shutdown()
+
+    def wait_delivered(self, count):
+        """Run the IOLoop until count events have been handled."""
+
+        @gen.coroutine
+        def wait():
+            for _ in range(200):
+                if self.endpoint.delivered + self.endpoint.failed >= count:
+                    return
+                yield gen.sleep(0.01)
+
+        IOLoop.current().run_sync(wait)
+
+    def test_snapshot(self):
+        """Unkeyed events deliver the state they were queued with."""
+
+        state = State()
+
+        state.value = 1
+        self.endpoint.put(state)
+        state.value = 2
+        self.endpoint.put(state)
+
+        self.wait_delivered(2)
+
+        self.assertEqual(self.received, ['{"v":1}', '{"v":2}'])
+        self.assertEqual(self.endpoint.batches, 1)
+
+    def test_merge(self):
+        """Keyed events deliver only the most recent state."""
+
+        state = State()
+
+        state.value = 1
+        self.endpoint.put(state, key=1)
+        state.value = 2
+        self.endpoint.put(state, key=1)
+        state.value = 3
+
+        self.wait_delivered(1)
+
+        self.assertEqual(self.received, ['{"v":3}'])
+        self.assertEqual(self.endpoint.merged, 1)
+
+    def test_inflight(self):
+        """Events queued while a batch is in flight keep their state."""
+
+        state = State()
+
+        state.value = 1
+        self.endpoint.put(state)
+
+        @gen.coroutine
+        def queue():
+            # the first batch is flushed at the next IOLoop iteration
+            yield gen.moment
+            state.value = 2
+            self.endpoint.put(state)
+            state.value = 3
+            self.endpoint.put(state)
+
+        IOLoop.current().run_sync(queue)
+
+        self.wait_delivered(3)
+
+        self.assertEqual(self.received, ['{"v":1}', '{"v":2}', '{"v":3}'])
+
+
+if __name__ == '__main__':
+    unittest.main()
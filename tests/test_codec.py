@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Codec tests."""
+
+import unittest
+
+from construct import Array
+from construct import Container
+from construct import Sequence
+from construct import Struct
+from construct import UBInt8
+from construct import UBInt16
+from construct import UBInt32
+
+from empower.core.codec import CODEC_CONSTRUCT
+from empower.core.codec import Codec
+from empower.core.codec import compile_parser
+from empower.core.codec import compile_pt_types
+from empower.core.codec import numpy
+from empower.core.framing import FrameBuffer
+from empower.lvapp import CAPS_RESPONSE
+from empower.lvapp import HELLO
+from empower.lvapp import PT_TYPES
+from empower.lvapp import SET_TRANSMISSION_POLICY
+from empower.lvapp import STATUS_LVAP
+from empower.lvapp import WIFI_NWID_MAXSIZE
+
+ENTRY = Sequence("entries",
+                 UBInt8("type"),
+                 UBInt32("timestamp"),
+                 UBInt32("sample"))
+
+RESPONSE = Struct("response", UBInt8("version"),
+                  UBInt8("type"),
+                  UBInt32("length"),
+                  UBInt32("seq"),
+                  UBInt16("nb_entries"),
+                  Array(lambda ctx: ctx.nb_entries, ENTRY))
+
+HDR_SIZE = 6
+LENGTH_OFFSET = 2
+
+
+def ssid(name):
+    """Return a padded SSID."""
+
+    return name.ljust(WIFI_NWID_MAXSIZE + 1, b'\0')
+
+
+MESSAGES = [
+    (HELLO, Container(version=0, type=0x04, length=20, seq=1,
+                      wtp=b'\x01' * 6, period=5000)),
+    (STATUS_LVAP, Container(version=0, type=0x13, length=0, seq=2,
+                            flags=Container(set_mask=1, associated=0,
+                                            authenticated=1),
+                            assoc_id=3, wtp=b'\x01' * 6, sta=b'\x02' * 6,
+                            encap=b'\x00' * 6, hwaddr=b'\x03' * 6,
+                            channel=6, band=1, supported_band=1,
+                            bssid=b'\x04' * 6, ssid=ssid(b'EmPOWER'),
+                            networks=[Container(bssid=b'\x05' * 6,
+                                                ssid=ssid(b'a')),
+                                      Container(bssid=b'\x06' * 6,
+                                                ssid=ssid(b'b'))])),
+    (CAPS_RESPONSE, Container(version=0, type=0x17, length=0, seq=3,
+                              wtp=b'\x01' * 6, dpid=b'\x00' * 8,
+                              nb_resources_elements=2, nb_ports_elements=1,
+                              blocks=[[b'\x03' * 6, 6, 1],
+                                      [b'\x04' * 6, 36, 2]],
+                              ports=[[b'\x05' * 6, 1,
+                                      b'eth0'.ljust(10, b'\0')]])),
+    (SET_TRANSMISSION_POLICY,
+     Container(version=0, type=0x14, length=0, seq=4,
+               flags=Container(no_ack=1), hwaddr=b'\x03' * 6, channel=6,
+               band=1, sta=b'\x02' * 6, rts_cts=2436, tx_mcast=0,
+               ur_mcast_count=3, nb_mcses=3, nb_ht_mcses=0,
+               mcs=[6, 12, 54], ht_mcs=[])),
+]
+
+
+class TestCodec(unittest.TestCase):
+    """Codec tests."""
+
+    def test_parse(self):
+        """Codecs parse what construct builds."""
+
+        for parser, msg in MESSAGES:
+            codec = compile_parser(parser)
+            raw = parser.build(msg)
+            self.assertIsInstance(codec, Codec)
+            self.assertEqual(codec.parse(raw), parser.parse(raw))
+            self.assertEqual(codec.parse(memoryview(raw)), parser.parse(raw))
+
+    def test_build(self):
+        """Codecs build what construct builds."""
+
+        for parser, msg in MESSAGES:
+            codec = compile_parser(parser)
+            raw = parser.build(msg)
+            self.assertEqual(codec.build(msg), raw)
+            self.assertEqual(codec.build(codec.parse(raw)), raw)
+
+    def test_record(self):
+        """Records support attribute and item access."""
+
+        raw = STATUS_LVAP.build(MESSAGES[1][1])
+        msg = compile_parser(STATUS_LVAP).parse(raw)
+
+        self.assertEqual(msg.seq, 2)
+        self.assertEqual(msg['seq'], 2)
+        self.assertEqual(msg.flags.authenticated, 1)
+        self.assertEqual(msg.networks[1]['bssid'], b'\x06' * 6)
+        self.assertIn('ssid', msg)
+
+        with self.assertRaises(KeyError):
+            msg['missing']
+
+    def test_array_count(self):
+        """Arrays whose length does not match their counter are rejected."""
+
+        msg = Container(**MESSAGES[3][1])
+        msg.nb_mcses = 2
+
+        with self.assertRaises(ValueError):
+            compile_parser(SET_TRANSMISSION_POLICY).build(msg)
+
+    def test_pt_types(self):
+        """Every LVAPP message is compiled, construct keeps the originals."""
+
+        compiled = compile_pt_types(PT_TYPES)
+
+        for pt_type, parser in PT_TYPES.items():
+            if parser is None:
+                self.assertIsNone(compiled[pt_type])
+            else:
+                self.assertIsInstance(compiled[pt_type], Codec)
+
+        self.assertEqual(compile_pt_types(PT_TYPES, CODEC_CONSTRUCT),
+                         PT_TYPES)
+
+        with self.assertRaises(ValueError):
+            compile_pt_types(PT_TYPES, "invalid")
+
+
+def build_response(seq, entries):
+    """Build a RESPONSE message."""
+
+    msg = dict(version=0, type=0x38, length=0, seq=seq,
+               nb_entries=len(entries), entries=entries)
+    msg['length'] = len(RESPONSE.build(msg))
+
+    return RESPONSE.build(msg)
+
+
+@unittest.skipIf(numpy is None, "NumPy not available")
+class TestColumnar(unittest.TestCase):
+    """Columnar decoding tests."""
+
+    def setUp(self):
+        self.codec = compile_parser(RESPONSE, columnar=True)
+
+    def test_parse(self):
+        """Columnar arrays match the construct parser."""
+
+        entries = [[i % 3, 1000 + i, 180 * i] for i in range(10)]
+        msg = build_response(1, entries)
+
+        out = self.codec.parse(msg)
+
+        self.assertEqual(out.nb_entries, 10)
+        self.assertEqual([list(entry) for entry in out.entries.tolist()],
+                         RESPONSE.parse(msg).entries)
+
+    def test_outlive_frame(self):
+        """Decoded arrays do not pin the FrameBuffer."""
+
+        framer = FrameBuffer(HDR_SIZE, LENGTH_OFFSET)
+        kept = []
+
+        first = build_response(1, [[0, 1, 2], [1, 3, 4]])
+        second = build_response(2, [[2, 5, 6]])
+
+        # the second frame is split across two chunks
+        framer.feed(first + second[:5])
+
+        for frame in framer.split():
+            kept.append(self.codec.parse(frame))
+
+        framer.feed(second[5:])
+
+        for frame in framer.split():
+            kept.append(self.codec.parse(frame))
+
+        framer.feed(first)
+
+        self.assertEqual(len(framer), len(first))
+        self.assertEqual([out.seq for out in kept], [1, 2])
+        self.assertEqual(kept[0].entries.tolist(), [(0, 1, 2), (1, 3, 4)])
+        self.assertEqual(kept[1].entries.tolist(), [(2, 5, 6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Framing tests."""
+
+import struct
+import unittest
+
+from empower.core.framing import FrameBuffer
+
+HDR_SIZE = 6
+LENGTH_OFFSET = 2
+
+
+def frame(payload, msg_type=0x01):
+    """Build a frame with a (version, type, length) header."""
+
+    return struct.pack("!BBI", 0, msg_type, HDR_SIZE + len(payload)) + \
+        payload
+
+
+def split(framer):
+    """Return the frames in the buffer as bytes."""
+
+    return [bytes(data) for data in framer.split()]
+
+
+class TestFrameBuffer(unittest.TestCase):
+    """FrameBuffer tests."""
+
+    def setUp(self):
+        self.framer = FrameBuffer(HDR_SIZE, LENGTH_OFFSET, max_frame_size=64)
+
+    def test_many_frames(self):
+        """All the complete frames of a chunk are returned in order."""
+
+        frames = [frame(b"a"), frame(b""), frame(b"bcd")]
+
+        self.framer.feed(b"".join(frames))
+
+        self.assertEqual(split(self.framer), frames)
+        self.assertEqual(len(self.framer), 0)
+        self.assertEqual(self.framer.frames, 3)
+
+    def test_partial(self):
+        """Partial headers and payloads are kept until complete."""
+
+        data = frame(b"hello") + frame(b"world")
+
+        out = []
+
+        for i in range(0, len(data), 4):
+            self.framer.feed(data[i:i + 4])
+            out += split(self.framer)
+
+        self.assertEqual(out, [frame(b"hello"), frame(b"world")])
+        self.assertEqual(len(self.framer), 0)
+        self.assertEqual(self.framer.bytes, len(data))
+
+    def test_trailing(self):
+        """A trailing partial frame is kept in the buffer."""
+
+        self.framer.feed(frame(b"x") + frame(b"yz")[:7])
+
+        self.assertEqual(split(self.framer), [frame(b"x")])
+        self.assertEqual(len(self.framer), 7)
+
+        self.framer.feed(b"z")
+
+        self.assertEqual(split(self.framer), [frame(b"yz")])
+
+    def test_released(self):
+        """Frames are released when the caller moves to the next one."""
+
+        self.framer.feed(frame(b"a") + frame(b"b"))
+
+        views = list(self.framer.split())
+
+        with self.assertRaises(ValueError):
+            bytes(views[0])
+
+        self.framer.feed(frame(b"c"))
+
+        self.assertEqual(split(self.framer), [frame(b"c")])
+
+    def test_close(self):
+        """Closing the generator consumes only the frames returned."""
+
+        self.framer.feed(frame(b"a") + frame(b"b"))
+
+        frames = self.framer.split()
+        self.assertEqual(bytes(next(frames)), frame(b"a"))
+        frames.close()
+
+        self.assertEqual(split(self.framer), [frame(b"b")])
+
+    def test_invalid_length(self):
+        """Lengths shorter than the header or too long are rejected."""
+
+        for length in (HDR_SIZE - 1, 65):
+
+            framer = FrameBuffer(HDR_SIZE, LENGTH_OFFSET, max_frame_size=64)
+            framer.feed(struct.pack("!BBI", 0, 1, length))
+
+            with self.assertRaises(ValueError):
+                split(framer)
+
+
+if __name__ == '__main__':
+    unittest.main()
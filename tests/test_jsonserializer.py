@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""JSON serializer tests."""
+
+import unittest
+
+import empower.core.jsonserializer as jsonserializer
+
+from empower.core.jsonserializer import dumps
+from empower.core.jsonserializer import numpy
+from empower.datatypes.etheraddress import EtherAddress
+
+VALUE = {'b': [1, 2.5, None], 'a': EtherAddress("00:0D:B9:30:3E:04")}
+
+
+class TestDumps(unittest.TestCase):
+    """dumps() tests."""
+
+    def setUp(self):
+        self.orjson = jsonserializer.orjson
+
+    def tearDown(self):
+        jsonserializer.orjson = self.orjson
+
+    def dumps_json(self, value, compact=False):
+        """Serialize value with the json backend."""
+
+        jsonserializer.orjson = None
+        return dumps(value, compact)
+
+    @unittest.skipIf(jsonserializer.orjson is None, "orjson not available")
+    def test_same_layout(self):
+        """Both backends produce the same document."""
+
+        for compact in (False, True):
+            self.assertEqual(dumps(VALUE, compact),
+                             self.dumps_json(VALUE, compact))
+
+    def test_indent(self):
+        """Documents are sorted and indented."""
+
+        self.assertEqual(self.dumps_json({'b': 1, 'a': 2}),
+                         b'{\n  "a": 2,\n  "b": 1\n}')
+
+    @unittest.skipIf(numpy is None, "NumPy not available")
+    def test_numpy(self):
+        """NumPy scalars and arrays are encoded by the json backend."""
+
+        value = {'x': numpy.int64(3), 'y': numpy.arange(3, dtype='u1')}
+
+        self.assertEqual(self.dumps_json(value, True),
+                         b'{"x":3,"y":[0,1,2]}')
+
+
+if __name__ == '__main__':
+    unittest.main()
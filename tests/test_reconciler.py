@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Reconciler tests."""
+
+import unittest
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from empower.core.reconciler import Reconciler
+
+TIMEOUT = 50
+
+
+class TestReconciler(unittest.TestCase):
+    """Reconciler tests."""
+
+    def setUp(self):
+
+        self.calls = []
+        self.reconciler = Reconciler(self.reconcile, TIMEOUT)
+
+    def tearDown(self):
+
+        self.reconciler.stop()
+
+    def reconcile(self):
+        """Record the state of the window when the callback is invoked."""
+
+        self.calls.append(self.reconciler.is_pending())
+
+    def wait(self, timeout):
+        """Run the IOLoop for timeout ms."""
+
+        IOLoop.current().run_sync(lambda: gen.sleep(timeout / 1000.0))
+
+    def test_expire(self):
+        """The callback is invoked once when the window expires."""
+
+        self.reconciler.start()
+        self.assertTrue(self.reconciler.is_pending())
+
+        self.wait(TIMEOUT / 2)
+        self.assertEqual(self.calls, [])
+
+        self.wait(2 * TIMEOUT)
+        self.assertEqual(self.calls, [False])
+        self.assertEqual(self.reconciler.runs, 1)
+        self.assertFalse(self.reconciler.is_pending())
+
+    def test_stop(self):
+        """A stopped window does not reconcile."""
+
+        self.reconciler.start()
+        self.reconciler.stop()
+
+        self.wait(2 * TIMEOUT)
+
+        self.assertEqual(self.calls, [])
+        self.assertFalse(self.reconciler.is_pending())
+
+    def test_restart(self):
+        """Restarting the window drops the reported objects."""
+
+        self.reconciler.start()
+        self.reconciler.report(("vap", 1), (1, 2))
+        self.reconciler.start()
+
+        self.assertEqual(self.reconciler.reported, {})
+
+        self.wait(2 * TIMEOUT)
+        self.assertEqual(self.calls, [False])
+
+    def test_outdated(self):
+        """Only missing and changed objects are pushed."""
+
+        self.reconciler.report(("slice", 1), (True, 1500))
+        self.reconciler.report(("slice", 2), (True, 1500))
+
+        self.assertFalse(self.reconciler.outdated(("slice", 1), (True, 1500)))
+        self.assertTrue(self.reconciler.outdated(("slice", 2), (False, 1500)))
+        self.assertTrue(self.reconciler.outdated(("slice", 3), (True, 1500)))
+
+        self.assertEqual(self.reconciler.unchanged, 1)
+        self.assertEqual(self.reconciler.sent, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Timer wheel tests."""
+
+import time
+import unittest
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from empower.core.timerwheel import OneShotTimer
+from empower.core.timerwheel import PeriodicTimer
+from empower.core.timerwheel import TimerWheel
+from empower.core.timerwheel import WHEEL_SIZE
+
+
+def wait(timeout):
+    """Run the IOLoop for timeout ms."""
+
+    IOLoop.current().run_sync(lambda: gen.sleep(timeout / 1000.0))
+
+
+class TestTimerWheel(unittest.TestCase):
+    """TimerWheel tests."""
+
+    def setUp(self):
+
+        self.wheel = TimerWheel(resolution=5)
+        self.runs = {}
+
+    def callback(self, name):
+        """Return a callback counting its runs."""
+
+        self.runs[name] = 0
+
+        def run():
+            self.runs[name] += 1
+
+        return run
+
+    def timer(self, name, callback_time, jitter=False):
+        """Start a periodic timer on the test wheel."""
+
+        timer = PeriodicTimer(self.callback(name), callback_time, jitter,
+                              self.wheel)
+        timer.start()
+
+        return timer
+
+    def test_periodic(self):
+        """Timers run once per period until stopped."""
+
+        timer = self.timer("a", 20)
+
+        wait(110)
+        self.assertTrue(3 <= self.runs["a"] <= 6, self.runs["a"])
+
+        timer.stop()
+        runs = self.runs["a"]
+
+        wait(50)
+        self.assertEqual(self.runs["a"], runs)
+        self.assertFalse(timer.is_running())
+        self.assertEqual(len(self.wheel), 0)
+        self.assertEqual(self.wheel.groups, {})
+
+    def test_restart(self):
+        """Stopped timers can be started again."""
+
+        timer = self.timer("a", 20)
+        timer.stop()
+        timer.start()
+
+        wait(50)
+        self.assertTrue(self.runs["a"] >= 1)
+        self.assertEqual(len(self.wheel), 1)
+
+        timer.stop()
+
+    def test_groups(self):
+        """Timers with the same period and phase share a group."""
+
+        timers = [self.timer("a", 20), self.timer("b", 20),
+                  self.timer("c", 40)]
+
+        self.assertEqual(len(self.wheel), 3)
+        self.assertEqual(len(self.wheel.groups), 2)
+        self.assertEqual(self.wheel.stats[20].timers, 2)
+
+        wait(90)
+        self.assertEqual(self.runs["a"], self.runs["b"])
+        self.assertTrue(self.runs["c"] < self.runs["a"])
+
+        for timer in timers:
+            timer.stop()
+
+    def test_jitter(self):
+        """Jittered timers are spread over the phases of their period."""
+
+        timers = [self.timer(str(i), 1000, True) for i in range(64)]
+
+        self.assertTrue(len(self.wheel.groups) > 1)
+
+        for timer in timers:
+            timer.stop()
+
+        self.assertEqual(self.wheel.groups, {})
+
+    def test_cascade(self):
+        """Timers beyond the first level are cascaded down."""
+
+        callback_time = 5 * (WHEEL_SIZE + 20)
+        timer = self.timer("a", callback_time)
+
+        wait(callback_time - 100)
+        self.assertEqual(self.runs["a"], 0)
+
+        wait(200)
+        self.assertEqual(self.runs["a"], 1)
+
+        timer.stop()
+
+    def test_oneshot(self):
+        """One-shot timers run once, one period after being started."""
+
+        timer = OneShotTimer(self.callback("a"), 30, self.wheel)
+
+        wait(10)
+        timer.start()
+        self.assertTrue(timer.is_running())
+
+        wait(15)
+        self.assertEqual(self.runs["a"], 0)
+
+        wait(60)
+        self.assertEqual(self.runs["a"], 1)
+        self.assertFalse(timer.is_running())
+        self.assertEqual(len(self.wheel), 0)
+
+        timer.start()
+
+        wait(60)
+        self.assertEqual(self.runs["a"], 2)
+
+    def test_budget(self):
+        """Callbacks exceeding the budget are deferred to the next ticks."""
+
+        self.wheel.budget = 0.0
+
+        def slow():
+            time.sleep(0.002)
+
+        timers = [PeriodicTimer(slow, 1000, False, self.wheel)
+                  for _ in range(3)]
+
+        for timer in timers:
+            timer.start()
+
+        wait(1100)
+
+        stats = self.wheel.stats[1000]
+
+        self.assertEqual(stats.runs, 3)
+        self.assertTrue(stats.deferred > 0)
+        self.assertTrue(self.wheel.overruns > 0)
+
+        for timer in timers:
+            timer.stop()
+
+    def test_invalid(self):
+        """Non-positive and too long periods are rejected."""
+
+        with self.assertRaises(ValueError):
+            PeriodicTimer(lambda: None, 0, wheel=self.wheel)
+
+        with self.assertRaises(ValueError):
+            self.timer("a", 5 * WHEEL_SIZE ** 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
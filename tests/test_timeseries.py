@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Time-series store tests."""
+
+import unittest
+
+from empower.core.timeseries import RingBuffer
+from empower.core.timeseries import TimeSeriesStore
+
+
+class TestRingBuffer(unittest.TestCase):
+    """RingBuffer tests."""
+
+    def test_grow_and_wrap(self):
+        """Rows are kept in order while growing and after wrapping."""
+
+        ring = RingBuffer(40)
+
+        for i in range(100):
+            ring.append(float(i), float(i))
+            self.assertEqual(len(ring), min(i + 1, 40))
+
+        tss, values = ring.range()
+
+        self.assertEqual(list(tss), [float(i) for i in range(60, 100)])
+        self.assertEqual(list(values[0]), list(tss))
+        self.assertEqual(ring.last, 99.0)
+
+
+class TestTimeSeriesStore(unittest.TestCase):
+    """TimeSeriesStore tests."""
+
+    def test_remove_entity(self):
+        """Removing an entity removes its sub-entities in every tenant."""
+
+        store = TimeSeriesStore()
+
+        store.add(1, "ue", {'a': 1}, 0)
+        store.add(1, ("ue", 5), {'rsrp': 1}, 0)
+        store.add(2, ("ue", 6), {'rsrp': 1}, 0)
+        store.add(1, "ue2", {'a': 1}, 0)
+
+        store.remove(None, "ue")
+
+        self.assertEqual(list(store.series[1]), [("ue2", "a")])
+        self.assertEqual(store.series[2], {})
+
+    def test_remove_sub_entity(self):
+        """Removing a sub-entity keeps its parent and siblings."""
+
+        store = TimeSeriesStore()
+
+        store.add(1, "ue", {'a': 1}, 0)
+        store.add(1, ("ue", 5), {'rsrp': 1}, 0)
+        store.add(1, ("ue", 6), {'rsrp': 1}, 0)
+        store.add(1, ("ue", 50), {'rsrp': 1}, 0)
+
+        store.remove(1, ("ue", 5))
+
+        self.assertEqual(sorted(store.series[1]),
+                         [("ue", "a"), ("ue/50", "rsrp"), ("ue/6", "rsrp")])
+        self.assertEqual(store.roots[1]["ue"], set(store.series[1]))
+
+        store.remove(1, "ue")
+
+        self.assertEqual(store.series[1], {})
+        self.assertEqual(store.roots[1], {})
+
+    def test_remove_keys(self):
+        """Only the keys created by an add are returned and removed."""
+
+        store = TimeSeriesStore()
+
+        keys = store.add(1, ("aa", 6, 1), {'x': 1, 'y': None}, 0)
+        self.assertEqual(keys, [("aa/6/1", "x")])
+        self.assertEqual(store.add(1, ("aa", 6, 1), {'x': 2}, 1), [])
+
+        store.remove_keys(1, keys)
+
+        self.assertEqual(store.series[1], {})
+        self.assertEqual(store.roots[1], {})
+
+    def test_max_series(self):
+        """New series beyond the limit are dropped."""
+
+        store = TimeSeriesStore(max_series=2)
+
+        store.add(1, "a", {'x': 1, 'y': 1, 'z': 1}, 0)
+
+        self.assertEqual(len(store.series[1]), 2)
+        self.assertEqual(store.dropped, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2016 Roberto Riggio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Write-behind persistence queue tests."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import Column
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import sessionmaker
+
+from empower.persistence.writebehind import MODE_BATCHED
+from empower.persistence.writebehind import MODE_SYNC
+from empower.persistence.writebehind import WriteBehindQueue
+from empower.persistence.writebehind import delete
+from empower.persistence.writebehind import insert
+from empower.persistence.writebehind import update
+from empower.persistence.writebehind import upsert
+
+Base = declarative_base()
+
+
+class TblItem(Base):
+    """A test table."""
+
+    __tablename__ = 'item'
+
+    item_id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    """WriteBehindQueue tests."""
+
+    def setUp(self):
+
+        self.path = tempfile.mkdtemp()
+        engine = create_engine("sqlite:///%s" %
+                               os.path.join(self.path, "test.db"))
+        Base.metadata.create_all(engine)
+
+        self.session = scoped_session(sessionmaker(bind=engine))
+        self.queue = WriteBehindQueue(self.session, delay=0.05)
+
+    def tearDown(self):
+
+        self.queue.stop()
+        self.session.remove()
+        shutil.rmtree(self.path)
+
+    def rows(self):
+        """Return the rows as a dictionary."""
+
+        return {row.item_id: row.name
+                for row in self.session.query(TblItem).all()}
+
+    def test_sync(self):
+        """In sync mode groups are committed by submit."""
+
+        self.queue.submit(insert(TblItem, item_id=1, name="a"),
+                          insert(TblItem, item_id=2, name="b"))
+        self.queue.submit(update(TblItem, {'item_id': 1}, name="c"))
+        self.queue.submit(delete(TblItem, item_id=2),
+                          delete(TblItem, item_id=3))
+
+        self.assertEqual(self.rows(), {1: "c"})
+        self.assertEqual(self.queue.commits, 3)
+
+    def test_sync_error(self):
+        """In sync mode errors are raised and the group is rolled back."""
+
+        self.queue.submit(insert(TblItem, item_id=1, name="a"))
+
+        with self.assertRaises(IntegrityError):
+            self.queue.submit(insert(TblItem, item_id=2, name="b"),
+                              insert(TblItem, item_id=1, name="c"))
+
+        with self.assertRaises(KeyError):
+            self.queue.submit(update(TblItem, {'item_id': 3}, name="d"))
+
+        self.assertEqual(self.rows(), {1: "a"})
+        self.assertEqual(self.queue.failed, 2)
+
+    def test_batched(self):
+        """In batched mode groups are committed together."""
+
+        self.queue.set_mode(MODE_BATCHED)
+
+        for i in range(20):
+            self.queue.submit(insert(TblItem, item_id=i, name=str(i)))
+
+        self.queue.submit(upsert(TblItem, item_id=0, name="x"))
+
+        self.queue.flush()
+
+        self.assertEqual(len(self.rows()), 20)
+        self.assertEqual(self.rows()[0], "x")
+        self.assertEqual(self.queue.committed, 21)
+        self.assertTrue(self.queue.commits < 21)
+
+    def test_batched_error(self):
+        """A failing group does not prevent the others from committing."""
+
+        self.queue.set_mode(MODE_BATCHED)
+
+        self.queue.submit(insert(TblItem, item_id=1, name="a"))
+        self.queue.submit(insert(TblItem, item_id=1, name="b"))
+        self.queue.submit(update(TblItem, {'item_id': 5}, name="c"))
+        self.queue.submit(insert(TblItem, item_id=2, name="d"))
+
+        self.queue.flush()
+
+        self.assertEqual(self.rows(), {1: "a", 2: "d"})
+        self.assertEqual(self.queue.committed, 2)
+        self.assertEqual(self.queue.failed, 2)
+
+    def test_stop(self):
+        """Stopping the queue commits the pending groups."""
+
+        self.queue.set_mode(MODE_BATCHED)
+        self.queue.submit(insert(TblItem, item_id=1, name="a"))
+        self.queue.set_mode(MODE_SYNC)
+
+        self.assertEqual(self.rows(), {1: "a"})
+        self.assertEqual(self.queue.to_dict()['queued'], 0)
+
+    def test_invalid_mode(self):
+        """Unknown modes are rejected."""
+
+        with self.assertRaises(ValueError):
+            self.queue.set_mode("invalid")
+
+
+if __name__ == '__main__':
+    unittest.main()